@@ -1,6 +1,6 @@
 {
     'name': 'E Fatura',
-    'version': '18.0.1.0.0',
+    'version': '18.0.1.5.0',
     'category': 'Accounting',
     'summary': 'E-Devlet Ürünleri',
     'description': """
@@ -29,7 +29,9 @@ Features:
         'views/invoice_xml_preview_wizard_views.xml',
         'views/account_tax_group_views.xml',
         'views/res_partner_views.xml',
+        'views/einvoice_send_queue_views.xml',
         'security/ir.model.access.csv',
+        'data/ir_cron_data.xml',
     ],
     'demo': [],
     'installable': True,
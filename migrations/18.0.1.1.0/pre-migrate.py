@@ -0,0 +1,25 @@
+def migrate(cr, version):
+    """Drop duplicated taxpayer rows before the (tax_no, alias) unique index is created.
+
+    The most recently written row of every (tax_no, alias) pair is kept.
+    """
+    if not version:
+        return
+    cr.execute(
+        """
+        DELETE FROM einvoice_company_import
+         WHERE id IN (
+            SELECT id
+              FROM (
+                SELECT id,
+                       row_number() OVER (
+                           PARTITION BY tax_no, COALESCE(alias, '')
+                           ORDER BY write_date DESC NULLS LAST, id DESC
+                       ) AS row_number
+                  FROM einvoice_company_import
+                 WHERE tax_no IS NOT NULL
+              ) ranked
+             WHERE ranked.row_number > 1
+         )
+        """
+    )
@@ -0,0 +1,9 @@
+def migrate(cr, version):
+    """Drop the stored base64 copy of the integration XSLT.
+
+    The stylesheet is read from the xslt_file attachment and cached in memory
+    instead; Odoo keeps columns of removed fields, so drop it explicitly.
+    """
+    if not version:
+        return
+    cr.execute("ALTER TABLE edevlet_integration DROP COLUMN IF EXISTS xslt_base64")
@@ -0,0 +1,25 @@
+def migrate(cr, version):
+    """Drop duplicated receiving detail rows before the uuid unique index is created.
+
+    The most recently written row of every uuid is kept.
+    """
+    if not version:
+        return
+    cr.execute(
+        """
+        DELETE FROM einvoice_receiving_detail
+         WHERE id IN (
+            SELECT id
+              FROM (
+                SELECT id,
+                       row_number() OVER (
+                           PARTITION BY uuid
+                           ORDER BY write_date DESC NULLS LAST, id DESC
+                       ) AS row_number
+                  FROM einvoice_receiving_detail
+                 WHERE uuid IS NOT NULL
+              ) ranked
+             WHERE ranked.row_number > 1
+         )
+        """
+    )
@@ -0,0 +1,71 @@
+import importlib
+import logging
+import os
+
+from odoo.tools.sql import column_exists
+
+_logger = logging.getLogger(__name__)
+
+# migrations/<version>/pre-migrate.py inside the addon directory.
+MODULE_NAME = os.path.basename(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+ubl_codelist = importlib.import_module(f'odoo.addons.{MODULE_NAME}.ubl_codelist')
+
+# Profiles that are not in the GİB ProfileIDType list; both are export profiles.
+PROFILE_TYPE_MAPPING = {
+    'BEDELSIZIHRACAT': 'IHRACAT',
+    'MIKROIHRACAT': 'IHRACAT',
+}
+
+
+def _migrate_profile_types(cr):
+    if not column_exists(cr, 'account_move', 'profile_type'):
+        return
+    for old, new in PROFILE_TYPE_MAPPING.items():
+        cr.execute("UPDATE account_move SET profile_type = %s WHERE profile_type = %s", (new, old))
+        if cr.rowcount:
+            _logger.info('Moved %s invoices from profile %s to %s', cr.rowcount, old, new)
+
+
+def _code_mapping(codes, values):
+    """Map the free text ``values`` to a code of ``codes``, or None."""
+    mapping = {}
+    for value in values:
+        code = value.strip()
+        if code not in codes and code.isdigit():
+            # Tax type codes are zero padded (``15`` stands for ``0015``).
+            code = code.zfill(4)
+        mapping[value] = code if code in codes else None
+    return mapping
+
+
+def _migrate_tax_group_codes(cr, column, codes):
+    if not column_exists(cr, 'account_tax_group', column):
+        # Added in this very update, there is nothing stored to migrate.
+        return
+    cr.execute(f"SELECT DISTINCT {column} FROM account_tax_group WHERE {column} IS NOT NULL")
+    for value, code in _code_mapping(codes, [row[0] for row in cr.fetchall()]).items():
+        if code == value:
+            continue
+        if code is None:
+            _logger.warning('Clearing unknown %s %r of the tax groups', column, value)
+        cr.execute(f"UPDATE account_tax_group SET {column} = %s WHERE {column} = %s", (code, value))
+
+
+def migrate(cr, version):
+    """Bring stored codes in line with the GİB code lists before they become selections.
+
+    Invoices on a profile GİB does not know move to ``IHRACAT``. The tax group
+    codes used to be free text: values matching a code (after trimming and
+    zero padding) are normalized, any other value is cleared and logged.
+    """
+    if not version:
+        return
+    _migrate_profile_types(cr)
+    _migrate_tax_group_codes(
+        cr,
+        'tax_code',
+        ubl_codelist.get_codes(ubl_codelist.TAX_TYPE) | ubl_codelist.get_codes(ubl_codelist.WITHHOLDING_TAX_TYPE),
+    )
+    _migrate_tax_group_codes(
+        cr, 'tax_exemption_reason_code', ubl_codelist.get_codes(ubl_codelist.TAX_EXEMPTION_REASON_CODE)
+    )
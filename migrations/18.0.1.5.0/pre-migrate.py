@@ -0,0 +1,21 @@
+from odoo.tools.sql import column_exists
+
+
+def migrate(cr, version):
+    """Drop the record offset of the taxpayer import.
+
+    Resumed imports now skip the rows written since the run started instead
+    of a position in the list. Unfinished imports have no run start yet, so
+    they go through the whole list again and count from zero.
+    """
+    if not version or not column_exists(cr, 'edevlet_integration', 'taxpayer_import_state'):
+        # Before 18.0.1.3.0 there is no background import to reset.
+        return
+    cr.execute("ALTER TABLE edevlet_integration DROP COLUMN IF EXISTS taxpayer_import_offset")
+    cr.execute(
+        """
+        UPDATE edevlet_integration
+           SET taxpayer_import_count = 0
+         WHERE taxpayer_import_state IN ('queued', 'running', 'failed')
+        """
+    )
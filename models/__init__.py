@@ -4,3 +4,5 @@ from . import account_move
 from . import invoice_xml_preview_wizard
 from . import account_tax_group
 from . import res_partner
+from . import einvoice_send_queue
+from . import ir_attachment
@@ -1,49 +1,35 @@
 import base64
-import copy
+import tempfile
 import uuid
+import zipfile
 import xml.etree.ElementTree as ET
 
+from lxml import etree
+
 from odoo import api, fields, models, _
 from odoo.exceptions import ValidationError
+from odoo.tools import str2bool
 from odoo.tools.misc import file_path
 
+from .. import ubl_codelist, ubl_renderer, ubl_validation
+
 PROFILE_TYPES = [
     ('TICARIFATURA', 'TICARIFATURA'),
     ('IHRACAT', 'IHRACAT'),
     ('TEMELFATURA', 'TEMELFATURA'),
     ('YOLCUBERABERFATURA', 'YOLCUBERABERFATURA'),
-    ('BEDELSIZIHRACAT', 'BEDELSIZIHRACAT'),
     ('KAMU', 'KAMU'),
     ('ENERJI', 'ENERJI'),
     ('ILAC_TIBBICIHAZ', 'ILAC_TIBBICIHAZ'),
-    ('MIKROIHRACAT', 'MIKROIHRACAT'),
 ]
 
-INVOICE_TYPE_CODES = [
-    ('SATIS', 'SATIS'),
-    ('IADE', 'IADE'),
-    ('IHRACKAYITLI', 'IHRACKAYITLI'),
-    ('KONAKLAMAVERGISI', 'KONAKLAMAVERGISI'),
-    ('SGK', 'SGK'),
-    ('TEVKIFATIADE', 'TEVKIFATIADE'),
-    ('SARJ', 'SARJ'),
-    ('SARJANLIK', 'SARJANLIK'),
-    ('TEKNOLOJIDESTEK', 'TEKNOLOJIDESTEK'),
-]
+# Invoice types the schematron accepts on a document with a WithholdingTaxTotal.
+WITHHOLDING_INVOICE_TYPE_CODES = ('TEVKIFAT', 'YTBTEVKIFAT', 'IADE', 'YTBIADE', 'SGK', 'SARJ', 'SARJANLIK')
 
-UBL_XML_NAMESPACES = {
-    '': 'urn:oasis:names:specification:ubl:schema:xsd:Invoice-2',
-    'cbc': 'urn:oasis:names:specification:ubl:schema:xsd:CommonBasicComponents-2',
-    'cac': 'urn:oasis:names:specification:ubl:schema:xsd:CommonAggregateComponents-2',
-    'ext': 'urn:oasis:names:specification:ubl:schema:xsd:CommonExtensionComponents-2',
-    'xades': 'http://uri.etsi.org/01903/v1.3.2#',
-    'udt': 'urn:un:unece:uncefact:data:specification:UnqualifiedDataTypesSchemaModule:2',
-    'ccts': 'urn:un:unece:uncefact:documentation:2',
-    'ubltr': 'urn:oasis:names:specification:ubl:schema:xsd:TurkishCustomizationExtensionComponents',
-    'qdt': 'urn:oasis:names:specification:ubl:schema:xsd:QualifiedDatatypes-2',
-    'ds': 'http://www.w3.org/2000/09/xmldsig#',
-    'xsi': 'http://www.w3.org/2001/XMLSchema-instance',
-}
+RENDER_WORKERS_PARAM = 'edevlet.xml_render_workers'
+SEND_ON_POST_PARAM = 'edevlet.send_on_post'
+UBL_XSD_PATH_PARAM = 'edevlet.ubl_invoice_xsd_path'
+MAX_REPORTED_VALIDATION_ISSUES = 10
 
 
 class AccountMove(models.Model):
@@ -57,7 +43,7 @@ class AccountMove(models.Model):
         default='TICARIFATURA',
     )
     invoice_type_code = fields.Selection(
-        INVOICE_TYPE_CODES,
+        selection=lambda self: ubl_codelist.selection(ubl_codelist.INVOICE_TYPE_CODE),
         string='Invoice Type Code',
         default='SATIS',
     )
@@ -74,34 +60,149 @@ class AccountMove(models.Model):
             if move.move_type in ('out_invoice', 'out_refund') and not move.invoice_type_code:
                 raise ValidationError(_('Invoice Type Code is required for customer invoices.'))
 
+    def _post(self, soft=True):
+        self.filtered(lambda move: move.move_type in self._XML_ALLOWED_MOVE_TYPES)._check_withholding_invoice_type()
+        posted = super()._post(soft=soft)
+        send_on_post = self.env['ir.config_parameter'].sudo().get_param(SEND_ON_POST_PARAM, 'False')
+        if str2bool(send_on_post, default=False):
+            self.env['einvoice.send.queue'].sudo()._enqueue_moves(posted)
+        return posted
+
+    def _check_withholding_invoice_type(self):
+        """Reject invoices with tevkifat (negative) taxes whose type cannot carry a WithholdingTaxTotal."""
+        for move in self:
+            if move.invoice_type_code in WITHHOLDING_INVOICE_TYPE_CODES:
+                continue
+            taxes = move.invoice_line_ids.tax_ids.flatten_taxes_hierarchy()
+            if any(tax.amount < 0 for tax in taxes):
+                raise ValidationError(
+                    _("%(name)s: Uyumsuz fatura tipi: '%(code)s'. Tevkifatlı vergi varken fatura tipi %(codes)s olabilir.") % {
+                        'name': move.display_name,
+                        'code': move.invoice_type_code,
+                        'codes': ', '.join(WITHHOLDING_INVOICE_TYPE_CODES),
+                    }
+                )
+
+    def action_enqueue_einvoice(self):
+        moves = self.filtered(lambda move: move.move_type in self._XML_ALLOWED_MOVE_TYPES)
+        if not moves:
+            raise ValidationError(_('Invoice XML actions are only available for customer sales invoices and credit notes.'))
+        entries = self.env['einvoice.send.queue'].sudo()._enqueue_moves(moves)
+        return {
+            'type': 'ir.actions.client',
+            'tag': 'display_notification',
+            'params': {
+                'title': _('E-Fatura Gönderim Kuyruğu'),
+                'message': _('%s adet fatura gönderim kuyruğuna eklendi.') % len(entries),
+                'type': 'success',
+                'sticky': False,
+            },
+        }
+
     def action_download_invoice_xml(self):
         self.ensure_one()
         self._check_xml_supported_move_type()
-        xml_content = self._generate_invoice_xml_content()
-        attachment = self.env['ir.attachment'].create({
-            'name': f"{self.name or 'invoice'}.xml",
-            'type': 'binary',
-            'datas': base64.b64encode(xml_content),
-            'mimetype': 'application/xml',
-            'res_model': self._name,
-            'res_id': self.id,
-        })
+        with tempfile.TemporaryFile() as xml_file:
+            self._write_invoice_xml(xml_file)
+            attachment = self.env['ir.attachment']._create_from_file(xml_file, {
+                'name': f"{self.name or 'invoice'}.xml",
+                'mimetype': 'application/xml',
+                'res_model': self._name,
+                'res_id': self.id,
+            })
+        return {
+            'type': 'ir.actions.act_url',
+            'url': f"/web/content/{attachment.id}?download=true",
+            'target': 'self',
+        }
+
+    def action_download_invoice_xml_zip(self):
+        moves = self.filtered(lambda move: move.move_type in self._XML_ALLOWED_MOVE_TYPES)
+        if not moves:
+            raise ValidationError(_('Invoice XML actions are only available for customer sales invoices and credit notes.'))
+
+        moves._prefetch_invoice_xml_data()
+        integrations = {}
+        snapshots = []
+        file_names = []
+        used_names = set()
+        for move in moves:
+            if move.company_id not in integrations:
+                integrations[move.company_id] = move._get_edevlet_integration()
+            snapshots.append(move._prepare_invoice_xml_snapshot(integration=integrations[move.company_id]))
+            file_name = f"{move.name or f'invoice-{move.id}'}".replace('/', '_')
+            if file_name in used_names:
+                file_name = f'{file_name}-{move.id}'
+            used_names.add(file_name)
+            file_names.append(f'{file_name}.xml')
+
+        workers = self._get_xml_render_workers()
+        with tempfile.TemporaryFile() as zip_buffer:
+            with zipfile.ZipFile(zip_buffer, 'w', compression=zipfile.ZIP_DEFLATED) as archive:
+                try:
+                    if workers > 1:
+                        for file_name, xml_content in zip(file_names, ubl_renderer.render_invoices(snapshots, workers=workers)):
+                            archive.writestr(file_name, xml_content)
+                    else:
+                        for file_name, snapshot in zip(file_names, snapshots):
+                            with archive.open(file_name, 'w') as member:
+                                ubl_renderer.write_invoice(snapshot, member)
+                except ET.ParseError as error:
+                    raise ValidationError(_('Sample XML file is not valid.')) from error
+                except ubl_renderer.RenderWorkerError as error:
+                    raise ValidationError(_('XML dosyaları oluşturulamadı: %s') % error) from error
+            attachment = self.env['ir.attachment']._create_from_file(zip_buffer, {
+                'name': f"e-fatura-xml-{fields.Date.to_string(fields.Date.context_today(self))}.zip",
+                'mimetype': 'application/zip',
+            })
         return {
             'type': 'ir.actions.act_url',
             'url': f"/web/content/{attachment.id}?download=true",
             'target': 'self',
         }
 
+    @api.model
+    def _get_xml_render_workers(self):
+        """Number of worker processes used to render XML batches; 0 or 1 renders in-process."""
+        value = self.env['ir.config_parameter'].sudo().get_param(RENDER_WORKERS_PARAM, '0')
+        try:
+            return max(int(value), 0)
+        except (TypeError, ValueError):
+            return 0
+
+    def _prefetch_invoice_xml_data(self):
+        """Load everything the UBL generation reads for the whole recordset in batched queries."""
+        lines = self.invoice_line_ids
+        lines.mapped('tax_ids.tax_group_id')
+        lines.mapped('tax_ids.children_tax_ids.tax_group_id')
+        lines.product_id.mapped('display_name')
+        lines.product_uom_id.mapped('name')
+        partners = self.partner_id.commercial_partner_id | self.company_id.partner_id
+        partners.mapped('state_id.name')
+        partners.mapped('country_id.name')
+        (self.invoice_user_id | self.create_uid).mapped('name')
+        (self.currency_id | self.company_id.currency_id).mapped('decimal_places')
+
     def action_preview_invoice_xml(self):
         self.ensure_one()
         self._check_xml_supported_move_type()
-        xml_content = self._generate_invoice_xml_content()
-        wizard = self.env['invoice.xml.preview.wizard'].create({
-            'preview_html': self.env['invoice.xml.preview.wizard'].build_preview_html(
-                xml_content,
-                self._get_invoice_xslt_bytes(),
-            ),
-        })
+        integration = self._get_edevlet_integration()
+        snapshot = self._prepare_invoice_xml_snapshot(integration=integration)
+        content_hash = ubl_renderer.snapshot_fingerprint(snapshot)
+        Wizard = self.env['invoice.xml.preview.wizard']
+        previews = Wizard.search([('move_id', '=', self.id), ('create_uid', '=', self.env.uid)])
+        wizard = previews.filtered(lambda preview: preview.content_hash == content_hash)[:1]
+        (previews - wizard).unlink()
+        if not wizard:
+            wizard = Wizard.create({
+                'move_id': self.id,
+                'content_hash': content_hash,
+                'preview_html': Wizard.build_preview_html(
+                    self._build_invoice_xml_tree(snapshot=snapshot),
+                    self._get_invoice_xslt_bytes(integration=integration),
+                    cache_key=(self.env.cr.dbname, integration.id) if integration else None,
+                ),
+            })
         return {
             'name': _('Fatura XML Önizleme'),
             'type': 'ir.actions.act_window',
@@ -111,12 +212,80 @@ class AccountMove(models.Model):
             'target': 'new',
         }
 
+    def action_validate_invoice_xml(self):
+        moves = self.filtered(lambda move: move.move_type in self._XML_ALLOWED_MOVE_TYPES)
+        if not moves:
+            raise ValidationError(_('Invoice XML actions are only available for customer sales invoices and credit notes.'))
+        invalid_moves = {move: issues for move, issues in moves._validate_invoice_xml().items() if issues}
+        if invalid_moves:
+            raise ValidationError('\n\n'.join(
+                _('%(name)s XML doğrulaması başarısız:\n%(issues)s') % {
+                    'name': move.display_name,
+                    'issues': '\n'.join(f'- {issue.message}' for issue in issues[:MAX_REPORTED_VALIDATION_ISSUES]),
+                }
+                for move, issues in invalid_moves.items()
+            ))
+        return {
+            'type': 'ir.actions.client',
+            'tag': 'display_notification',
+            'params': {
+                'title': _('XML Doğrulama'),
+                'message': _('%s adet fatura XML doğrulamasından geçti.') % len(moves),
+                'type': 'success',
+                'sticky': False,
+            },
+        }
+
+    def _validate_invoice_xml(self):
+        """Check the generated UBL of every move against the GİB schematron in one batch.
+
+        Returns a dict mapping each move to its list of ``ValidationIssue``.
+        """
+        self._prefetch_invoice_xml_data()
+        integrations = {}
+        trees = []
+        for move in self:
+            if move.company_id not in integrations:
+                integrations[move.company_id] = move._get_edevlet_integration()
+            trees.append(move._build_invoice_xml_tree(integration=integrations[move.company_id]))
+        issues = ubl_validation.validate_documents(trees, xsd_path=self._get_ubl_xsd_path())
+        return dict(zip(self, issues))
+
+    @api.model
+    def _get_ubl_xsd_path(self):
+        """Optional UBL-TR Invoice XSD checked along with the schematron; the GİB package ships none."""
+        return self.env['ir.config_parameter'].sudo().get_param(UBL_XSD_PATH_PARAM) or None
+
     def _check_xml_supported_move_type(self):
         self.ensure_one()
         if self.move_type not in self._XML_ALLOWED_MOVE_TYPES:
             raise ValidationError(_('Invoice XML actions are only available for customer sales invoices and credit notes.'))
 
-    def _generate_invoice_xml_content(self):
+    def _generate_invoice_xml_content(self, integration=None):
+        snapshot = self._prepare_invoice_xml_snapshot(integration=integration)
+        try:
+            return ubl_renderer.render_invoice(snapshot)
+        except ET.ParseError as error:
+            raise ValidationError(_('Sample XML file is not valid.')) from error
+
+    def _build_invoice_xml_tree(self, integration=None, snapshot=None):
+        """Return the invoice as an lxml tree, for in-memory XSLT transforms."""
+        if snapshot is None:
+            snapshot = self._prepare_invoice_xml_snapshot(integration=integration)
+        try:
+            return ubl_renderer.build_invoice_tree(snapshot, backend='lxml')
+        except etree.XMLSyntaxError as error:
+            raise ValidationError(_('Sample XML file is not valid.')) from error
+
+    def _write_invoice_xml(self, stream, integration=None, document_uuid=None):
+        """Stream the UBL XML of the invoice into the binary file object ``stream``."""
+        snapshot = self._prepare_invoice_xml_snapshot(integration=integration, document_uuid=document_uuid)
+        try:
+            ubl_renderer.write_invoice(snapshot, stream)
+        except ET.ParseError as error:
+            raise ValidationError(_('Sample XML file is not valid.')) from error
+
+    def _get_invoice_template_path(self):
         module_path = __name__.split('.')
         module_name = (
             module_path[2]
@@ -126,86 +295,211 @@ class AccountMove(models.Model):
         xml_path = file_path(f"{module_name}/ornek_xml.xml")
         if not xml_path:
             raise ValidationError(_('Sample XML file could not be found.'))
-        try:
-            tree = ET.parse(xml_path)
-        except ET.ParseError as error:
-            raise ValidationError(_('Sample XML file is not valid.')) from error
-        root = tree.getroot()
-        nsmap = UBL_XML_NAMESPACES
-        self._register_xml_namespaces(nsmap)
+        return xml_path
 
+    def _prepare_invoice_xml_snapshot(self, integration=None, document_uuid=None):
+        """Extract everything the UBL renderer needs as plain, picklable data.
+
+        Amounts that the XML prints with currency precision are rounded here so
+        the renderer never needs the currency record. ``document_uuid`` keeps
+        the UUID of a document that is sent (and possibly re-sent) stable.
+        """
+        self.ensure_one()
         currency = self.currency_id or self.company_id.currency_id
         currency_code = currency and currency.name or 'TRY'
+        currency_digits = currency.decimal_places if currency and currency.decimal_places is not None else 2
         issue_date = self.invoice_date or fields.Date.context_today(self)
         issue_time_dt = fields.Datetime.context_timestamp(self, fields.Datetime.now())
-        issue_time = issue_time_dt.strftime('%H:%M:%S') if hasattr(issue_time_dt, 'strftime') else '00:00:00'
-        uuid_value = str(uuid.uuid4())
+        has_time = hasattr(issue_time_dt, 'strftime')
+
+        def round_amount(amount):
+            amount = amount if amount not in (None, False) else 0.0
+            return currency.round(amount) if currency else amount
 
         # Sadece section ve note satırlarını filtrele, ürün satırlarını al
         invoice_lines = self.invoice_line_ids.filtered(
             lambda line: line.display_type not in ('line_section', 'line_note')
         )
+        tax_metadata = {}
+        lines = [self._prepare_ubl_line_values(line, round_amount, tax_metadata) for line in invoice_lines]
+        discount_total = sum(line.discount_amount for line in lines)
 
-        self._set_xml_text(root, 'cbc:ID', self.name or '', nsmap)
-        self._set_xml_text(root, 'cbc:ProfileID', self.profile_type or 'TICARIFATURA', nsmap)
-        self._set_xml_text(root, 'cbc:InvoiceTypeCode', self.invoice_type_code or 'SATIS', nsmap)
-        self._set_xml_text(root, 'cbc:DocumentCurrencyCode', currency_code, nsmap)
-        self._set_xml_text(root, 'cbc:PaymentCurrencyCode', currency_code, nsmap)
-        self._set_xml_text(root, 'cbc:UUID', uuid_value, nsmap)
-        self._set_xml_text(root, 'cbc:IssueDate', fields.Date.to_string(issue_date), nsmap)
-        self._set_xml_text(root, 'cbc:IssueTime', issue_time, nsmap)
-        self._set_xml_text(root, 'cbc:LineCountNumeric', str(len(invoice_lines)), nsmap)
-        
-        if self.invoice_origin:
-            order_ref = root.find('cac:OrderReference', nsmap)
-            self._set_xml_text(order_ref, 'cbc:ID', self.invoice_origin, nsmap)
-            self._set_xml_text(order_ref, 'cbc:IssueDate', fields.Date.to_string(issue_date), nsmap)
-        else:
-            order_ref = root.find('cac:OrderReference', nsmap)
-            if order_ref is not None:
-                root.remove(order_ref)
-        note_nodes = root.findall('cbc:Note', nsmap)
-        if note_nodes:
-            issue_time_note = issue_time_dt.strftime('%H:%M') if hasattr(issue_time_dt, 'strftime') else ''
-            note_nodes[0].text = issue_time_note
-            if len(note_nodes) > 1:
-                note_nodes[1].text = issue_date.strftime('%d-%m-%Y') if hasattr(issue_date, 'strftime') else ''
-            if len(note_nodes) > 2:
-                note_nodes[2].text = self.invoice_user_id.name or self.create_uid.name or ''
-            if len(note_nodes) > 3:
-                for extra_node in note_nodes[3:]:
-                    root.remove(extra_node)
-
-        amount_in_words = self._get_amount_in_words(currency)
-        if amount_in_words:
-            for doc_ref in root.findall('cac:AdditionalDocumentReference', nsmap):
-                doc_type = doc_ref.find('cbc:DocumentType', nsmap)
-                if doc_type is None or not doc_type.text:
-                    continue
-                doc_type_value = doc_type.text.strip()
-                if doc_type_value in ('TR_NET_STR', 'TOTAL_NET_STR'):
-                    self._set_xml_text(doc_ref, 'cbc:ID', amount_in_words, nsmap)
-                    self._set_xml_text(doc_ref, 'cbc:IssueDate', fields.Date.to_string(issue_date), nsmap)
-                elif doc_type_value == 'PAYABLEAMOUNT':
-                    self._set_xml_text(doc_ref, 'cbc:ID', self._float_to_str(self.amount_total, digits=2), nsmap)
-                    self._set_xml_text(doc_ref, 'cbc:IssueDate', fields.Date.to_string(issue_date), nsmap)
-
-        self._populate_party_block(
-            root.find('cac:AccountingSupplierParty', nsmap),
-            self.company_id.partner_id,
-            nsmap,
+        integration = integration or self._get_edevlet_integration()
+        xslt_base64 = self._get_invoice_xslt_base64(integration=integration)
+        issue_date_str = fields.Date.to_string(issue_date)
+        snapshot = {
+            'template_path': self._get_invoice_template_path(),
+            'currency_code': currency_code,
+            'currency_digits': currency_digits,
+            'name': self.name or '',
+            'profile_type': self.profile_type or 'TICARIFATURA',
+            'invoice_type_code': self.invoice_type_code or 'SATIS',
+            'uuid': document_uuid or str(uuid.uuid4()),
+            'issue_date': issue_date_str,
+            'issue_date_note': issue_date.strftime('%d-%m-%Y') if hasattr(issue_date, 'strftime') else '',
+            'issue_time': issue_time_dt.strftime('%H:%M:%S') if has_time else '00:00:00',
+            'issue_time_note': issue_time_dt.strftime('%H:%M') if has_time else '',
+            'user_name': self.invoice_user_id.name or self.create_uid.name or '',
+            'invoice_origin': self.invoice_origin,
+            'amount_in_words': self._get_amount_in_words(currency),
+            'amount_total_raw': self.amount_total,
+            'totals': {
+                'amount_tax': round_amount(self.amount_tax),
+                'amount_untaxed': round_amount(self.amount_untaxed),
+                'amount_total': round_amount(self.amount_total),
+                'discount_total': round_amount(discount_total),
+            },
+            'supplier': self._prepare_ubl_party_values(self.company_id.partner_id),
+            'customer': self._prepare_ubl_party_values(self.partner_id.commercial_partner_id),
+            'lines': lines,
+            'default_tax': self._extract_tax_metadata(False),
+            'xslt': {
+                'key': integration.id if integration else False,
+                'invoice_number': self.name or f'DRAFT-{self.id}',
+                'issue_date': issue_date_str,
+                'content': xslt_base64,
+                'file_name': integration.xslt_file_name if integration else False,
+            },
+        }
+        self._check_ubl_codes(snapshot)
+        return snapshot
+
+    def _check_ubl_codes(self, snapshot):
+        """Reject codes missing from the GİB code lists before they reach the XML."""
+        codes = [
+            (ubl_codelist.PROFILE_ID, _('Profil'), snapshot['profile_type']),
+            (ubl_codelist.INVOICE_TYPE_CODE, _('Fatura tipi'), snapshot['invoice_type_code']),
+            (ubl_codelist.CURRENCY_CODE, _('Para birimi'), snapshot['currency_code']),
+        ]
+        for line in snapshot['lines']:
+            codes.append((ubl_codelist.UNIT_CODE, _('Birim'), line.unit_code))
+            for tax in line.taxes:
+                codes.append((ubl_codelist.TAX_TYPE, _('Vergi kodu'), tax.code))
+                if tax.exemption_reason_code:
+                    codes.append((
+                        ubl_codelist.TAX_EXEMPTION_REASON_CODE, _('Muafiyet sebebi kodu'), tax.exemption_reason_code,
+                    ))
+            for tax in line.withholding_taxes:
+                codes.append((ubl_codelist.WITHHOLDING_TAX_TYPE, _('Tevkifat kodu'), tax.code))
+        invalid = dict.fromkeys(
+            f'- {label}: {code}' for codelist, label, code in codes
+            if not ubl_codelist.is_valid_code(codelist, code)
         )
-        self._populate_party_block(
-            root.find('cac:AccountingCustomerParty', nsmap),
-            self.partner_id.commercial_partner_id,
-            nsmap,
+        if invalid:
+            raise ValidationError(
+                _('%(name)s faturasında GİB kod listesinde bulunmayan kodlar var:\n%(codes)s') % {
+                    'name': self.display_name,
+                    'codes': '\n'.join(invalid),
+                }
+            )
+
+    def _prepare_ubl_party_values(self, partner):
+        if not partner:
+            return None
+        return {
+            'website': partner.website or '',
+            'tax_id': partner.vergi_no or partner.vat or '',
+            'tax_scheme': 'VKN' if partner.is_company else 'TCKN',
+            'name': partner.name or '',
+            'street': partner.street or '',
+            'building_number': partner.bina_numarasi or '',
+            'city': partner.city or '',
+            'zip': partner.zip or '',
+            'region': partner.state_id.name if partner.state_id else '',
+            'country': partner.country_id.name if partner.country_id else '',
+            'tax_office': partner.vergi_dairesi or '',
+            'phone': partner.phone or partner.mobile or '',
+            'email': partner.email or '',
+        }
+
+    def _prepare_ubl_line_values(self, line, round_amount, tax_metadata):
+        """Build the line snapshot; ``tax_metadata`` caches the TaxCategory values per tax."""
+        quantity = line.quantity or 0.0
+        price_unit = line.price_unit or 0.0
+        base_amount = price_unit * quantity
+        subtotal_amount = line.price_subtotal or 0.0
+        discount_amount = base_amount - subtotal_amount
+        if hasattr(line, 'discount') and line.discount:
+            discount_amount = max(discount_amount, base_amount * (line.discount / 100.0))
+        if hasattr(line, 'discount_fixed') and line.discount_fixed:
+            discount_amount = max(discount_amount, line.discount_fixed * (quantity or 1.0))
+        if discount_amount < 0:
+            discount_amount = 0.0
+
+        taxes, withholding_taxes = self._prepare_ubl_line_taxes(line, round_amount, tax_metadata)
+
+        # Ürün açıklaması ve adı
+        product = line.product_id
+        product_name = (product.name or product.display_name or '') if product else ''
+        return ubl_renderer.InvoiceLineSnapshot(
+            # Note alanına ürün açıklamasını ekle
+            note=line.name or (product.name if product else ''),
+            quantity=line.quantity,
+            unit_code=self._get_line_unit_code(line),
+            price_subtotal=round_amount(line.price_subtotal),
+            base_amount=base_amount,
+            discount_amount=discount_amount,
+            taxes=taxes,
+            withholding_taxes=withholding_taxes,
+            # Description: satır açıklaması veya ürün adı
+            description=line.name or product_name or 'Ürün',
+            # Name: ürün adı veya satır adı
+            item_name=product_name or line.name or 'Ürün',
+            price_unit=line.price_unit,
         )
 
-        self._populate_invoice_lines(root, invoice_lines, currency, currency_code, nsmap)
-        self._update_totals(root, currency, currency_code, invoice_lines, nsmap)
-        self._apply_xslt_attachment(root, nsmap)
+    def _prepare_ubl_line_taxes(self, line, round_amount, tax_metadata):
+        """Return the ``TaxSnapshot`` tuples of the taxes and the withholdings of ``line``.
+
+        Every tax of the line is kept (group taxes are expanded by
+        ``compute_all``). Negative taxes are how tevkifat is set up in Odoo
+        (e.g. -14% next to a 20% KDV for 7/10): they are reported in the
+        WithholdingTaxTotal with the KDV of the line as taxable amount and the
+        withheld share of it (70) as percent. A line without taxes gets a
+        single zero KDV subtotal.
+        """
+        if not line.tax_ids:
+            default_tax = self._get_ubl_tax_metadata(False, tax_metadata)
+            return (ubl_renderer.TaxSnapshot(*default_tax, round_amount(line.price_subtotal), 0.0),), ()
+
+        # The line's own untaxed subtotal already has every discount (percent
+        # or fixed) applied and price-included taxes removed.
+        tax_results = line.tax_ids.compute_all(
+            line.price_subtotal,
+            currency=line.currency_id,
+            quantity=1.0,
+            product=line.product_id,
+            partner=self.partner_id,
+            is_refund=self.move_type in ('out_refund', 'in_refund'),
+            handle_price_include=False,
+        )['taxes']
+        taxes = []
+        withholdings = []
+        for tax_result in tax_results:
+            metadata = self._get_ubl_tax_metadata(tax_result['id'], tax_metadata)
+            if tax_result['amount'] < 0:
+                withholdings.append((metadata, round_amount(-tax_result['amount'])))
+            else:
+                taxes.append(ubl_renderer.TaxSnapshot(
+                    *metadata, round_amount(tax_result['base']), round_amount(tax_result['amount']),
+                ))
+        # Tevkifat is always a share of the KDV (0015) of the line.
+        vat_taxes = [tax for tax in taxes if tax.code == '0015']
+        vat_amount = round_amount(sum(tax.amount for tax in vat_taxes))
+        vat_percent = vat_taxes[0].percent if vat_taxes else 0.0
+        withholding_taxes = tuple(
+            ubl_renderer.TaxSnapshot(
+                round(abs(metadata[0]) / vat_percent * 100) if vat_percent else 0, *metadata[1:], vat_amount, amount,
+            )
+            for metadata, amount in withholdings
+        )
+        return tuple(taxes), withholding_taxes
 
-        return ET.tostring(root, encoding='utf-8', xml_declaration=True)
+    def _get_ubl_tax_metadata(self, tax_id, tax_metadata):
+        if tax_id not in tax_metadata:
+            tax = self.env['account.tax'].browse(tax_id) if tax_id else False
+            tax_metadata[tax_id] = self._extract_tax_metadata(tax)
+        return tax_metadata[tax_id]
 
     def _get_edevlet_integration(self):
         self.ensure_one()
@@ -217,277 +511,20 @@ class AccountMove(models.Model):
             integration = Integration.search([], limit=1)
         return integration
 
-    def _apply_xslt_attachment(self, root, nsmap):
-        integration = self._get_edevlet_integration()
-        xslt_base64 = self._get_invoice_xslt_base64(integration=integration)
-        issue_date = self.invoice_date or fields.Date.context_today(self)
-        for doc_ref in root.findall('cac:AdditionalDocumentReference', nsmap):
-            doc_type = doc_ref.find('cbc:DocumentType', nsmap)
-            if doc_type is None or not doc_type.text:
-                continue
-            if doc_type.text.strip().upper() != 'XSLT':
-                continue
-            # ID ve IssueDate alanlarını doldur
-            invoice_number = self.name or f'DRAFT-{self.id}'
-            self._set_xml_text(doc_ref, 'cbc:ID', invoice_number, nsmap)
-            self._set_xml_text(doc_ref, 'cbc:IssueDate', fields.Date.to_string(issue_date), nsmap)
-            # Base64 içeriğini ekle
-            embedded = doc_ref.find('cac:Attachment/cbc:EmbeddedDocumentBinaryObject', nsmap)
-            if embedded is None:
-                continue
-            if xslt_base64:
-                embedded.text = xslt_base64
-                if integration and integration.xslt_file_name:
-                    embedded.set('filename', integration.xslt_file_name)
-
     def _get_invoice_xslt_base64(self, integration=None):
         integration = integration or self._get_edevlet_integration()
-        xslt_base64 = None
-        if integration and integration.xslt_base64:
-            xslt_base64 = integration.xslt_base64
-            if isinstance(xslt_base64, bytes):
-                xslt_base64 = xslt_base64.decode()
-        return xslt_base64
-
-    def _get_invoice_xslt_bytes(self):
-        xslt_base64 = self._get_invoice_xslt_base64()
+        return integration._get_xslt_base64() if integration else None
+
+    def _get_invoice_xslt_bytes(self, integration=None):
+        xslt_base64 = self._get_invoice_xslt_base64(integration=integration)
         if not xslt_base64:
             return b''
         return base64.b64decode(xslt_base64)
 
-    def _populate_party_block(self, party_record, partner, nsmap):
-        if party_record is None or not partner:
-            return
-        party = party_record.find('cac:Party', nsmap)
-        if party is None:
-            party = party_record
-        self._set_xml_text(party, 'cbc:WebsiteURI', partner.website or '', nsmap)
-
-        identification = party.find('cac:PartyIdentification', nsmap)
-        if identification is not None:
-            tax_id = partner.vergi_no or partner.vat or ''
-            id_node = identification.find('cbc:ID', nsmap)
-            if id_node is not None:
-                id_node.text = tax_id
-                if tax_id:
-                    scheme = 'VKN' if partner.is_company else 'TCKN'
-                    id_node.set('schemeID', scheme)
-
-        self._set_xml_text(party, 'cac:PartyName/cbc:Name', partner.name or '', nsmap)
-
-        address = party.find('cac:PostalAddress', nsmap)
-        if address is not None:
-            self._set_xml_text(address, 'cbc:StreetName', partner.street or '', nsmap)
-            self._set_xml_text(address, 'cbc:BuildingNumber', partner.bina_numarasi or '', nsmap)
-            self._set_xml_text(address, 'cbc:CitySubdivisionName', partner.city or '', nsmap)
-            self._set_xml_text(address, 'cbc:CityName', partner.city or '', nsmap)
-            self._set_xml_text(address, 'cbc:PostalZone', partner.zip or '', nsmap)
-            region = partner.state_id.name if partner.state_id else ''
-            self._set_xml_text(address, 'cbc:Region', region, nsmap)
-            country_el = address.find('cac:Country', nsmap)
-            self._set_xml_text(country_el, 'cbc:Name', partner.country_id.name if partner.country_id else '', nsmap)
-
-        tax_scheme = party.find('cac:PartyTaxScheme/cac:TaxScheme', nsmap)
-        self._set_xml_text(tax_scheme, 'cbc:Name', partner.vergi_dairesi or '', nsmap)
-
-        contact = party.find('cac:Contact', nsmap)
-        if contact is not None:
-            phone = partner.phone or partner.mobile or ''
-            self._set_xml_text(contact, 'cbc:Telephone', phone, nsmap)
-            self._set_xml_text(contact, 'cbc:ElectronicMail', partner.email or '', nsmap)
-
-    def _populate_invoice_lines(self, root, invoice_lines, currency, currency_code, nsmap):
-        template = root.find('cac:InvoiceLine', nsmap)
-        if template is not None:
-            template = copy.deepcopy(template)
-        else:
-            template = self._build_invoice_line_template(currency_code)
-        
-        # İlk olarak mevcut satırları temizle
-        for existing in root.findall('cac:InvoiceLine', nsmap):
-            root.remove(existing)
-
-        if not invoice_lines:
-            return
-
-        # Satırları LegalMonetaryTotal'dan sonra ekle (UBL standart sırasına göre)
-        monetary_total = root.find('cac:LegalMonetaryTotal', nsmap)
-        insert_position = None
-        if monetary_total is not None:
-            insert_position = list(root).index(monetary_total) + 1
-        
-        for index, line in enumerate(invoice_lines, start=1):
-            line_element = copy.deepcopy(template)
-            self._fill_invoice_line(line_element, line, index, currency, currency_code, nsmap)
-            
-            if insert_position is not None:
-                # Her satır eklendiğinde pozisyonu artır
-                root.insert(insert_position + index - 1, line_element)
-            else:
-                root.append(line_element)
-
-    def _build_invoice_line_template(self, currency_code):
-        nsmap = UBL_XML_NAMESPACES
-        line_el = ET.Element(f"{{{nsmap['cac']}}}InvoiceLine")
-        ET.SubElement(line_el, f"{{{nsmap['cbc']}}}ID")
-        ET.SubElement(line_el, f"{{{nsmap['cbc']}}}Note")
-        ET.SubElement(line_el, f"{{{nsmap['cbc']}}}InvoicedQuantity", unitCode='C62')
-        ET.SubElement(line_el, f"{{{nsmap['cbc']}}}LineExtensionAmount", currencyID=currency_code)
-        allowance_charge = ET.SubElement(line_el, f"{{{nsmap['cac']}}}AllowanceCharge")
-        ET.SubElement(allowance_charge, f"{{{nsmap['cbc']}}}ChargeIndicator")
-        ET.SubElement(allowance_charge, f"{{{nsmap['cbc']}}}MultiplierFactorNumeric")
-        ET.SubElement(allowance_charge, f"{{{nsmap['cbc']}}}Amount", currencyID=currency_code)
-        ET.SubElement(allowance_charge, f"{{{nsmap['cbc']}}}BaseAmount", currencyID=currency_code)
-        tax_total = ET.SubElement(line_el, f"{{{nsmap['cac']}}}TaxTotal")
-        ET.SubElement(tax_total, f"{{{nsmap['cbc']}}}TaxAmount", currencyID=currency_code)
-        tax_subtotal = ET.SubElement(tax_total, f"{{{nsmap['cac']}}}TaxSubtotal")
-        ET.SubElement(tax_subtotal, f"{{{nsmap['cbc']}}}TaxableAmount", currencyID=currency_code)
-        ET.SubElement(tax_subtotal, f"{{{nsmap['cbc']}}}TaxAmount", currencyID=currency_code)
-        ET.SubElement(tax_subtotal, f"{{{nsmap['cbc']}}}CalculationSequenceNumeric")
-        ET.SubElement(tax_subtotal, f"{{{nsmap['cbc']}}}Percent")
-        tax_category = ET.SubElement(tax_subtotal, f"{{{nsmap['cac']}}}TaxCategory")
-        tax_scheme = ET.SubElement(tax_category, f"{{{nsmap['cac']}}}TaxScheme")
-        ET.SubElement(tax_scheme, f"{{{nsmap['cbc']}}}Name")
-        ET.SubElement(tax_scheme, f"{{{nsmap['cbc']}}}TaxTypeCode")
-        item = ET.SubElement(line_el, f"{{{nsmap['cac']}}}Item")
-        ET.SubElement(item, f"{{{nsmap['cbc']}}}Description")
-        ET.SubElement(item, f"{{{nsmap['cbc']}}}Name")
-        price = ET.SubElement(line_el, f"{{{nsmap['cac']}}}Price")
-        ET.SubElement(price, f"{{{nsmap['cbc']}}}PriceAmount", currencyID=currency_code)
-        return line_el
-
-    def _fill_invoice_line(self, node, line, index, currency, currency_code, nsmap):
-        self._set_xml_text(node, 'cbc:ID', str(index), nsmap)
-        # Note alanına ürün açıklamasını ekle
-        note_text = line.name or (line.product_id.name if line.product_id else '')
-        self._set_xml_text(node, 'cbc:Note', note_text, nsmap)
-
-        qty_node = node.find('cbc:InvoicedQuantity', nsmap)
-        if qty_node is not None:
-            qty_node.text = self._float_to_str(line.quantity, digits=4)
-            unit_code = self._get_line_unit_code(line)
-            qty_node.set('unitCode', unit_code)
-
-        self._set_amount_node(node, 'cbc:LineExtensionAmount', line.price_subtotal, currency, currency_code, nsmap)
-
-        base_amount = (line.price_unit or 0.0) * (line.quantity or 0.0)
-        subtotal_amount = line.price_subtotal or 0.0
-        discount_amount = base_amount - subtotal_amount
-        if hasattr(line, 'discount') and line.discount:
-            discount_amount = max(discount_amount, base_amount * (line.discount / 100.0))
-        if hasattr(line, 'discount_fixed') and line.discount_fixed:
-            discount_amount = max(discount_amount, line.discount_fixed * (line.quantity or 1.0))
-        if discount_amount < 0:
-            discount_amount = 0.0
-        for allowance_node in node.findall('cac:AllowanceCharge', nsmap):
-            node.remove(allowance_node)
-        if discount_amount > 0:
-            allowance_node = ET.Element(f"{{{nsmap['cac']}}}AllowanceCharge")
-            charge_indicator = ET.SubElement(allowance_node, f"{{{nsmap['cbc']}}}ChargeIndicator")
-            charge_indicator.text = 'false'
-            multiplier_node = ET.SubElement(allowance_node, f"{{{nsmap['cbc']}}}MultiplierFactorNumeric")
-            discount_ratio = (discount_amount / base_amount) if base_amount else 0.0
-            multiplier_node.text = self._float_to_str(discount_ratio, digits=4)
-            amount_node = ET.SubElement(allowance_node, f"{{{nsmap['cbc']}}}Amount", currencyID=currency_code)
-            currency_digits = currency.decimal_places if currency and currency.decimal_places is not None else 2
-            amount_node.text = self._float_to_str(discount_amount, digits=currency_digits)
-            base_node = ET.SubElement(allowance_node, f"{{{nsmap['cbc']}}}BaseAmount", currencyID=currency_code)
-            base_node.text = self._float_to_str(base_amount, digits=currency_digits)
-            line_extension = node.find('cbc:LineExtensionAmount', nsmap)
-            if line_extension is not None:
-                insert_index = list(node).index(line_extension) + 1
-                node.insert(insert_index, allowance_node)
-            else:
-                node.append(allowance_node)
-
-        tax_amount = getattr(line, 'price_tax', None)
-        if tax_amount is None:
-            tax_amount = line.price_total - line.price_subtotal
-        tax_total_node = node.find('cac:TaxTotal', nsmap)
-        if tax_total_node is not None:
-            self._set_amount_node(tax_total_node, 'cbc:TaxAmount', tax_amount, currency, currency_code, nsmap)
-            tax_subtotal = tax_total_node.find('cac:TaxSubtotal', nsmap)
-            if tax_subtotal is not None:
-                self._set_amount_node(tax_subtotal, 'cbc:TaxableAmount', line.price_subtotal, currency, currency_code, nsmap)
-                self._set_amount_node(tax_subtotal, 'cbc:TaxAmount', tax_amount, currency, currency_code, nsmap)
-                sequence_node = tax_subtotal.find('cbc:CalculationSequenceNumeric', nsmap)
-                if sequence_node is not None:
-                    sequence_node.text = str(index)
-                percent_value, tax_name, tax_code = self._extract_tax_metadata(line)
-                percent_node = tax_subtotal.find('cbc:Percent', nsmap)
-                if percent_node is not None:
-                    percent_node.text = self._float_to_str(percent_value or 0.0, digits=2)
-                tax_category = tax_subtotal.find('cac:TaxCategory', nsmap)
-                if tax_category is not None:
-                    tax_scheme = tax_category.find('cac:TaxScheme', nsmap)
-                    if tax_scheme is not None:
-                        self._set_xml_text(tax_scheme, 'cbc:Name', tax_name, nsmap)
-                        self._set_xml_text(tax_scheme, 'cbc:TaxTypeCode', tax_code, nsmap)
-
-        item = node.find('cac:Item', nsmap)
-        if item is not None:
-            # Ürün açıklaması ve adı
-            product_name = ''
-            if line.product_id:
-                product_name = line.product_id.name or line.product_id.display_name or ''
-            
-            # Description: satır açıklaması veya ürün adı
-            description = line.name or product_name or 'Ürün'
-            self._set_xml_text(item, 'cbc:Description', description, nsmap)
-            
-            # Name: ürün adı veya satır adı
-            item_name = product_name or line.name or 'Ürün'
-            self._set_xml_text(item, 'cbc:Name', item_name, nsmap)
-
-        price = node.find('cac:Price', nsmap)
-        if price is not None:
-            self._set_amount_node(price, 'cbc:PriceAmount', line.price_unit, currency, currency_code, nsmap, price_precision=5)
-
-    def _update_totals(self, root, currency, currency_code, invoice_lines, nsmap):
-        tax_total = root.find('cac:TaxTotal', nsmap)
-        if tax_total is not None:
-            self._set_amount_node(tax_total, 'cbc:TaxAmount', self.amount_tax, currency, currency_code, nsmap)
-            tax_subtotal = tax_total.find('cac:TaxSubtotal', nsmap)
-            if tax_subtotal is not None:
-                self._set_amount_node(tax_subtotal, 'cbc:TaxableAmount', self.amount_untaxed, currency, currency_code, nsmap)
-                self._set_amount_node(tax_subtotal, 'cbc:TaxAmount', self.amount_tax, currency, currency_code, nsmap)
-                tax_line = invoice_lines[:1]
-                tax_line = tax_line[0] if tax_line else False
-                percent_value, tax_name, tax_code = self._extract_tax_metadata(tax_line)
-                percent_node = tax_subtotal.find('cbc:Percent', nsmap)
-                if percent_node is not None:
-                    percent_node.text = self._float_to_str(percent_value or 0.0, digits=2)
-                tax_category = tax_subtotal.find('cac:TaxCategory', nsmap)
-                if tax_category is not None:
-                    tax_scheme = tax_category.find('cac:TaxScheme', nsmap)
-                    if tax_scheme is not None:
-                        self._set_xml_text(tax_scheme, 'cbc:Name', tax_name, nsmap)
-                        self._set_xml_text(tax_scheme, 'cbc:TaxTypeCode', tax_code, nsmap)
-
-        monetary_total = root.find('cac:LegalMonetaryTotal', nsmap)
-        if monetary_total is not None:
-            discount_total = 0.0
-            for line in invoice_lines:
-                base_amount = (line.price_unit or 0.0) * (line.quantity or 0.0)
-                subtotal_amount = line.price_subtotal or 0.0
-                discount_amount = base_amount - subtotal_amount
-                if hasattr(line, 'discount') and line.discount:
-                    discount_amount = max(discount_amount, base_amount * (line.discount / 100.0))
-                if hasattr(line, 'discount_fixed') and line.discount_fixed:
-                    discount_amount = max(discount_amount, line.discount_fixed * (line.quantity or 1.0))
-                if discount_amount > 0:
-                    discount_total += discount_amount
-            self._set_amount_node(monetary_total, 'cbc:LineExtensionAmount', self.amount_untaxed, currency, currency_code, nsmap)
-            self._set_amount_node(monetary_total, 'cbc:TaxExclusiveAmount', self.amount_untaxed, currency, currency_code, nsmap)
-            self._set_amount_node(monetary_total, 'cbc:TaxInclusiveAmount', self.amount_total, currency, currency_code, nsmap)
-            self._set_amount_node(monetary_total, 'cbc:AllowanceTotalAmount', discount_total, currency, currency_code, nsmap)
-            self._set_amount_node(monetary_total, 'cbc:PayableAmount', self.amount_total, currency, currency_code, nsmap)
-
-    def _extract_tax_metadata(self, line):
-        if not line:
-            return 0.0, 'KDV', '0015'
-        tax = line.tax_ids[:1]
-        tax = tax[0] if tax else None
+    def _extract_tax_metadata(self, tax):
+        """Return the TaxCategory values (percent, name, code, exemption code and reason) of ``tax``."""
+        if not tax:
+            return 0.0, 'KDV', '0015', False, False
         percent_value = tax.amount if tax and tax.amount_type == 'percent' else 0.0
         tax_group = tax.tax_group_id if tax else None
         tax_name = (
@@ -500,45 +537,15 @@ class AccountMove(models.Model):
             or getattr(tax, 'l10n_tr_code', False)
             or '0015'
         )
-        return percent_value, tax_name, tax_code
+        exemption_reason_code = getattr(tax_group, 'tax_exemption_reason_code', False)
+        exemption_reason = exemption_reason_code and getattr(tax_group, 'tax_exemption_reason', False)
+        return percent_value, tax_name, tax_code, exemption_reason_code, exemption_reason
 
     def _get_line_unit_code(self, line):
         if line.product_uom_id:
             return getattr(line.product_uom_id, 'l10n_tr_code', False) or 'C62'
         return 'C62'
 
-    def _set_amount_node(self, element, xpath, amount, currency, currency_code, nsmap, price_precision=None):
-        if element is None:
-            return
-        node = element.find(xpath, nsmap)
-        if node is None:
-            return
-        digits = price_precision or (currency.decimal_places if currency and currency.decimal_places is not None else 2)
-        amount_value = amount if amount not in (None, False) else 0.0
-        if price_precision is None and currency:
-            amount_value = currency.round(amount_value)
-        node.text = self._float_to_str(amount_value, digits=digits)
-        if currency_code:
-            node.set('currencyID', currency_code)
-
-    def _set_xml_text(self, element, xpath, value, nsmap):
-        if element is None:
-            return
-        target = element.find(xpath, nsmap) if xpath else element
-        if target is None:
-            return
-        if value in (None, False):
-            target.text = ''
-        else:
-            target.text = str(value)
-
-    def _float_to_str(self, value, digits=2):
-        return f"{float(value or 0):.{digits}f}"
-
-    def _register_xml_namespaces(self, nsmap):
-        for prefix, uri in nsmap.items():
-            ET.register_namespace(prefix, uri)
-
     def _get_amount_in_words(self, currency):
         if not currency:
             return ''
@@ -1,8 +1,23 @@
 from odoo import fields, models
 
+from .. import ubl_codelist
+
 
 class AccountTaxGroup(models.Model):
     _inherit = 'account.tax.group'
 
-    tax_code = fields.Char(string='Tax Code')
+    tax_code = fields.Selection(
+        selection=lambda self: (
+            ubl_codelist.selection(ubl_codelist.TAX_TYPE)
+            + ubl_codelist.selection(ubl_codelist.WITHHOLDING_TAX_TYPE)
+        ),
+        string='Tax Code',
+        help='GIB tax type code; withholding (tevkifat) taxes use the 6xx/8xx codes.',
+    )
     tax_code_name = fields.Char(string='Tax Code Name')
+    tax_exemption_reason_code = fields.Selection(
+        selection=lambda self: ubl_codelist.selection(ubl_codelist.TAX_EXEMPTION_REASON_CODE),
+        string='Tax Exemption Reason Code',
+        help='GIB exemption reason code (e.g. 301), written to the UBL TaxCategory of 0% VAT lines.',
+    )
+    tax_exemption_reason = fields.Char(string='Tax Exemption Reason')
@@ -1,17 +1,76 @@
-from datetime import date
+from collections import OrderedDict, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from datetime import date, timedelta
+import json
 import logging
-from urllib import request
-from urllib.error import URLError, HTTPError
-import xml.etree.ElementTree as ET
+import re
+import threading
+import time
+
+from psycopg2.extras import execute_values
+import urllib3
 
 from odoo import models, fields, api, _
 from odoo.exceptions import UserError
 
+from .. import soap_response, soap_transport, xslt_cache
+
 
 _logger = logging.getLogger(__name__)
 
 SOAP_ENV_NS = 'http://schemas.xmlsoap.org/soap/envelope/'
 TEMPURI_NS = 'http://tempuri.org/'
+TAXPAYER_IMPORT_BATCH_SIZE = 1000
+TAXPAYER_CACHE_TTL_PARAM = 'edevlet.taxpayer_cache_ttl_hours'
+TAXPAYER_CACHE_DEFAULT_TTL_HOURS = 24
+TAXPAYER_LRU_SIZE = 4096
+TAXPAYER_CHECK_WORKERS_PARAM = 'edevlet.taxpayer_check_workers'
+TAXPAYER_CHECK_DEFAULT_WORKERS = 4
+TAXPAYER_CHECK_RATE_PARAM = 'edevlet.taxpayer_check_rate'
+TAXPAYER_CHECK_DEFAULT_RATE = 5
+CHECK_CUSTOMER_TAX_ID_ACTION = 'http://tempuri.org/CheckCustomerTaxId'
+# Child tags of an EInvoiceCustomerResult record -> field name, resolved once.
+TAXPAYER_FIELD_TAGS = {
+    f'{{{TEMPURI_NS}}}{name}': name
+    for name in ('TaxIdOrPersonalId', 'Alias', 'Type', 'Name', 'RegisterTime', 'AliasCreateDate')
+}
+
+# Per-process cache of CheckCustomerTaxId answers, keyed by
+# (dbname, integration id, tax id) -> (monotonic timestamp, result dict).
+_taxpayer_lru = OrderedDict()
+_taxpayer_lru_lock = threading.Lock()
+_taxpayer_cache_stats = {'lru_hits': 0, 'local_hits': 0, 'remote_calls': 0}
+
+AUTH_TICKET_LIFETIME_PARAM = 'edevlet.auth_ticket_lifetime_minutes'
+AUTH_TICKET_DEFAULT_LIFETIME_MINUTES = 20
+AUTH_TICKET_PARAM_PREFIX = 'edevlet.auth_ticket.'
+AUTH_FAILURE_ERROR_CODES_PARAM = 'edevlet.auth_failure_error_codes'
+AUTH_FAILURE_HTTP_STATUSES = (401, 403)
+# ServiceResultDescription of an expired or invalid ticket, whatever code the
+# integrator puts next to it ("Ticket süresi dolmuş", "Geçersiz oturum", ...).
+AUTH_FAILURE_DESCRIPTION_RE = re.compile(
+    r'(ticket|oturum|session).*(geçersiz|süre|dolmuş|expired|invalid)'
+    r'|(geçersiz|invalid|expired).*(ticket|oturum|session)'
+)
+
+SOAP_CONNECT_TIMEOUT_PARAM = 'edevlet.soap_connect_timeout'
+SOAP_READ_TIMEOUT_PARAM = 'edevlet.soap_read_timeout'
+SOAP_POOL_SIZE_PARAM = 'edevlet.soap_pool_size'
+TAXPAYER_IMPORT_READ_TIMEOUT = 300
+TAXPAYER_FULL_IMPORT_START_DATE = '2010-01-01'
+TAXPAYER_IMPORT_CRON_XMLID = 'ir_cron_import_taxpayer_list'
+TAXPAYER_IMPORT_STALE_PARAM = 'edevlet.taxpayer_import_stale_minutes'
+TAXPAYER_IMPORT_DEFAULT_STALE_MINUTES = 30
+
+# Per-process ticket cache, keyed by (dbname, integration id) -> (ticket, expiry epoch).
+_auth_ticket_cache = {}
+_auth_ticket_lock = threading.Lock()
+
+
+class EdevletAuthenticationError(UserError):
+    """Raised when the integrator rejects the forms authentication ticket."""
+
 
 class EdevletIntegration(models.Model):
     _name = 'edevlet.integration'
@@ -26,6 +85,23 @@ class EdevletIntegration(models.Model):
     api_user_name = fields.Char(string='API User Name', size=100, required=True)
     api_password = fields.Char(string='API Password', size=100, required=True)
     web_service_url = fields.Char(string='Web Service URL', size=255)
+    document_service_url = fields.Char(
+        string='Document Service URL',
+        size=255,
+        help='GİB sendDocument (SOAP 1.2) endpoint used by the outbound e-invoice queue.',
+    )
+    sender_alias = fields.Char(
+        string='Sender Alias',
+        size=100,
+        help='Sender unit alias (urn:mail:...gb@...) written into the envelope header.',
+    )
+    application_response_cursor = fields.Integer(
+        string='Application Response Cursor',
+        readonly=True,
+        copy=False,
+        help='Outbound queue id up to which every envelope has a final GİB system response.',
+    )
+    application_response_poll_date = fields.Datetime(string='Last Application Response Poll', readonly=True, copy=False)
     prefix = fields.Char(string='Prefix', size=5)
     ubl_version = fields.Char(string='UBL Version', size=5)
     customization_id = fields.Char(string='Customization ID', size=10)
@@ -33,24 +109,62 @@ class EdevletIntegration(models.Model):
     sirket_kodu = fields.Char(string='Şirket Kodu', size=10)
     xslt_file = fields.Binary(string='XSLT File', attachment=True)
     xslt_file_name = fields.Char(string='XSLT File Name', size=128)
-    xslt_base64 = fields.Text(
-        string='XSLT Base64',
-        compute='_compute_xslt_base64',
-        store=True,
-        readonly=True,
-        help='Uploaded XSLT file encoded as base64.',
-    )
     taxpayer_check_tax_id = fields.Char(
         string='Taxpayer Check Tax ID',
         size=20,
         help='Legacy compatibility field kept to prevent onchange crashes on older custom views.',
     )
+    taxpayer_import_state = fields.Selection([
+        ('idle', 'Idle'),
+        ('queued', 'Queued'),
+        ('running', 'Running'),
+        ('done', 'Done'),
+        ('failed', 'Failed'),
+    ], string='Taxpayer Import Status', default='idle', required=True, readonly=True, copy=False)
+    taxpayer_import_start_date = fields.Date(
+        string='Taxpayer Import Start Date',
+        readonly=True,
+        copy=False,
+        help='StartDate sent to GetTaxIdListbyDate by the background taxpayer import.',
+    )
+    taxpayer_import_run_date = fields.Datetime(
+        string='Taxpayer Import Run Start',
+        readonly=True,
+        copy=False,
+        help='Start of the current full import; a resumed import leaves the rows written since then alone.',
+    )
+    taxpayer_import_count = fields.Integer(string='Imported Taxpayers', readonly=True, copy=False)
+    taxpayer_import_checkpoint_date = fields.Datetime(string='Last Taxpayer Import Checkpoint', readonly=True, copy=False)
+    taxpayer_import_done_date = fields.Datetime(string='Last Complete Taxpayer Import', readonly=True, copy=False)
+    taxpayer_import_error = fields.Text(string='Taxpayer Import Error', readonly=True, copy=False)
 
-    @api.depends('xslt_file')
-    def _compute_xslt_base64(self):
-        for record in self:
-            xslt_file = record.with_context(bin_size=False).xslt_file
-            record.xslt_base64 = xslt_file or False
+    def write(self, vals):
+        result = super().write(vals)
+        if 'xslt_file' in vals:
+            xslt_cache.invalidate((self.env.cr.dbname, record.id) for record in self)
+        if {'sirket_kodu', 'api_user_name', 'api_password', 'web_service_url'} & set(vals):
+            self._invalidate_forms_authentication_ticket()
+            self.env['ir.config_parameter'].sudo().search([
+                ('key', 'in', [f'{AUTH_TICKET_PARAM_PREFIX}{record.id}' for record in self]),
+            ]).unlink()
+        return result
+
+    def _get_xslt_base64(self):
+        """Return the uploaded XSLT as base64 text, kept in memory per attachment checksum."""
+        self.ensure_one()
+        attachment = self.env['ir.attachment'].sudo().search_read([
+            ('res_model', '=', self._name),
+            ('res_id', '=', self.id),
+            ('res_field', '=', 'xslt_file'),
+        ], ['checksum'], limit=1)
+        if not attachment:
+            return None
+        attachment = attachment[0]
+        return xslt_cache.get_payload(
+            (self.env.cr.dbname, self.id),
+            attachment['checksum'],
+            lambda: self.env['ir.attachment'].sudo().browse(attachment['id']).datas.decode(),
+        )
 
     def action_import_taxpayer_list(self):
         self.ensure_one()
@@ -68,30 +182,307 @@ class EdevletIntegration(models.Model):
         }
 
     def action_import_all_taxpayer_list(self):
+        """Queue a full taxpayer import; it runs in the background and can resume after an interruption."""
+        self.ensure_one()
+        if self.taxpayer_import_state == 'queued' or (
+            self.taxpayer_import_state == 'running' and not self._is_taxpayer_import_stale()
+        ):
+            raise UserError(_('Mükellef aktarımı zaten devam ediyor.'))
+        self._check_taxpayer_import_settings()
+        self.write({
+            'taxpayer_import_state': 'queued',
+            'taxpayer_import_start_date': TAXPAYER_FULL_IMPORT_START_DATE,
+            'taxpayer_import_run_date': False,
+            'taxpayer_import_count': 0,
+            'taxpayer_import_checkpoint_date': False,
+            'taxpayer_import_error': False,
+        })
+        return self._trigger_taxpayer_import()
+
+    def action_resume_taxpayer_import(self):
+        """Queue a failed taxpayer import again; rows it already wrote are not written twice."""
         self.ensure_one()
-        imported_count = self._import_taxpayer_list(start_date='2010-01-01')
+        if self.taxpayer_import_state != 'failed':
+            raise UserError(_('Yalnızca hata ile duran mükellef aktarımı devam ettirilebilir.'))
+        self.write({'taxpayer_import_state': 'queued', 'taxpayer_import_error': False})
+        return self._trigger_taxpayer_import()
+
+    def _trigger_taxpayer_import(self):
+        cron = self.env.ref(f'{self._module}.{TAXPAYER_IMPORT_CRON_XMLID}', raise_if_not_found=False)
+        if cron:
+            cron.sudo()._trigger()
         return {
             'type': 'ir.actions.client',
             'tag': 'display_notification',
             'params': {
-                'title': _('İşlem Başarılı'),
-                'message': _('%s adet mükellef kaydı içe aktarıldı/güncellendi.') % imported_count,
-                'type': 'success',
+                'title': _('Mükellef Aktarımı'),
+                'message': _('Mükellef listesi arka planda içe aktarılıyor. İlerlemeyi entegrasyon kaydından izleyebilirsiniz.'),
+                'type': 'info',
                 'sticky': False,
             },
         }
 
-    def _import_taxpayer_list(self, start_date):
+    @api.model
+    def _cron_import_taxpayer_list(self):
+        """Run (or resume) one queued full taxpayer import per cron call.
+
+        Imports left ``running`` without a checkpoint for longer than
+        ``edevlet.taxpayer_import_stale_minutes`` belong to a killed worker;
+        they are picked up again, imports still making progress are left
+        alone. The cron is re-triggered while more imports are waiting.
+        """
+        integrations = self.search([
+            '|',
+            ('taxpayer_import_state', '=', 'queued'),
+            '&',
+            ('taxpayer_import_state', '=', 'running'),
+            '|',
+            ('taxpayer_import_checkpoint_date', '=', False),
+            ('taxpayer_import_checkpoint_date', '<', self._get_taxpayer_import_stale_before()),
+        ], order='id')
+        if not integrations:
+            return
+        integrations[0]._run_taxpayer_import()
+        self.env['ir.cron']._notify_progress(done=1, remaining=len(integrations) - 1)
+
+    def _run_taxpayer_import(self):
+        self.ensure_one()
+        started_at = time.monotonic()
+        values = {
+            'taxpayer_import_state': 'running',
+            'taxpayer_import_error': False,
+            'taxpayer_import_checkpoint_date': fields.Datetime.now(),
+        }
+        if not self.taxpayer_import_run_date:
+            # Database time, so it compares with the write_date of the rows.
+            values['taxpayer_import_run_date'] = self.env.cr.now()
+        self.write(values)
+        self.env.cr.commit()
+        _logger.info(
+            'Taxpayer import of integration %s started from %s, %s records already imported since %s',
+            self.id, self.taxpayer_import_start_date, self.taxpayer_import_count, self.taxpayer_import_run_date,
+        )
+        try:
+            self._import_taxpayer_list(
+                start_date=fields.Date.to_string(self.taxpayer_import_start_date or TAXPAYER_FULL_IMPORT_START_DATE),
+                checkpoint=True,
+            )
+        except Exception as error:
+            self.env.cr.rollback()
+            _logger.exception('Taxpayer import of integration %s failed', self.id)
+            self.write({
+                'taxpayer_import_state': 'failed',
+                'taxpayer_import_error': str(error),
+            })
+            self.env.cr.commit()
+            return
+        self.write({
+            'taxpayer_import_state': 'done',
+            'taxpayer_import_run_date': False,
+            'taxpayer_import_done_date': fields.Datetime.now(),
+        })
+        self.env.cr.commit()
+        _logger.info(
+            'Taxpayer import of integration %s done: %s records in %.1fs',
+            self.id, self.taxpayer_import_count, time.monotonic() - started_at,
+        )
+
+    def _save_taxpayer_import_checkpoint(self, imported_count):
+        """Commit the rows upserted so far together with the running total."""
+        self.write({
+            'taxpayer_import_count': imported_count,
+            'taxpayer_import_checkpoint_date': fields.Datetime.now(),
+        })
+        self.env.cr.commit()
+
+    def _get_taxpayer_import_stale_minutes(self):
+        value = self.env['ir.config_parameter'].sudo().get_param(
+            TAXPAYER_IMPORT_STALE_PARAM,
+            TAXPAYER_IMPORT_DEFAULT_STALE_MINUTES,
+        )
+        try:
+            return float(value)
+        except (TypeError, ValueError):
+            return float(TAXPAYER_IMPORT_DEFAULT_STALE_MINUTES)
+
+    @api.model
+    def _get_taxpayer_import_stale_before(self):
+        return fields.Datetime.now() - timedelta(minutes=self._get_taxpayer_import_stale_minutes())
+
+    def _is_taxpayer_import_stale(self):
+        """Whether a ``running`` import has not saved a checkpoint for too long."""
         self.ensure_one()
+        checkpoint_date = self.taxpayer_import_checkpoint_date
+        return not checkpoint_date or checkpoint_date < self._get_taxpayer_import_stale_before()
+
+    def action_show_taxpayer_cache_stats(self):
+        stats = self.get_taxpayer_cache_stats()
+        return {
+            'type': 'ir.actions.client',
+            'tag': 'display_notification',
+            'params': {
+                'title': _('Mükellef Önbelleği'),
+                'message': _(
+                    'Bellek isabeti: %(lru)s, Yerel tablo isabeti: %(local)s, SOAP sorgusu: %(remote)s'
+                ) % {
+                    'lru': stats['lru_hits'],
+                    'local': stats['local_hits'],
+                    'remote': stats['remote_calls'],
+                },
+                'type': 'info',
+                'sticky': False,
+            },
+        }
+
+    @api.model
+    def get_taxpayer_cache_stats(self):
+        """Return the taxpayer cache counters of the current worker process."""
+        with _taxpayer_lru_lock:
+            return dict(_taxpayer_cache_stats)
+
+    def _import_taxpayer_list(self, start_date, checkpoint=False):
+        """Import the taxpayers registered since ``start_date``.
+
+        GetTaxIdListbyDate only takes a StartDate and answers with every
+        taxpayer since then, in no guaranteed order, so the import cannot be
+        split into date windows or resumed from a date. With ``checkpoint``
+        every chunk is committed along with the running total (see
+        ``_save_taxpayer_import_checkpoint``); a resumed import downloads the
+        list again from ``start_date`` and skips the rows already written
+        since ``taxpayer_import_run_date``, whatever their position.
+        """
+        self.ensure_one()
+        self._check_taxpayer_import_settings()
+        return self._with_authentication_ticket(
+            lambda ticket: self._stream_and_upsert_taxpayers(ticket=ticket, start_date=start_date, checkpoint=checkpoint)
+        )
+
+    def _check_taxpayer_import_settings(self):
         if not self.web_service_url:
             raise UserError(_('Web Service URL alanı zorunludur.'))
         if not self.sirket_kodu or not self.api_user_name or not self.api_password:
             raise UserError(_('Şirket Kodu, API Kullanıcı Adı ve API Şifre alanları zorunludur.'))
 
+    def _with_authentication_ticket(self, callback):
+        """Run ``callback(ticket)`` with a cached ticket, logging in again once if it was rejected.
+
+        Only a rejection of ``callback`` triggers the new login; a failing
+        login itself is reported as is.
+        """
+        self.ensure_one()
         ticket = self._get_forms_authentication_ticket()
-        return self._stream_and_upsert_taxpayers(ticket=ticket, start_date=start_date)
+        try:
+            return callback(ticket)
+        except EdevletAuthenticationError:
+            _logger.info('Authentication ticket of integration %s was rejected, requesting a new one', self.id)
+            return callback(self._get_forms_authentication_ticket(force_refresh=True))
+
+    def _get_forms_authentication_ticket(self, force_refresh=False):
+        """Return a valid forms authentication ticket, reusing it until it expires.
+
+        Tickets are cached per worker process and shared between workers
+        through a system parameter, so a refresh by one worker is picked up
+        by the others instead of each one logging in on its own.
+        """
+        self.ensure_one()
+        cache_key = (self.env.cr.dbname, self.id)
+        now = time.time()
+        if not force_refresh:
+            with _auth_ticket_lock:
+                cached = _auth_ticket_cache.get(cache_key)
+            if cached and cached[1] > now:
+                return cached[0]
+            cached = self._read_shared_authentication_ticket()
+            if cached and cached[1] > now:
+                with _auth_ticket_lock:
+                    _auth_ticket_cache[cache_key] = cached
+                return cached[0]
+
+        ticket = self._request_forms_authentication_ticket()
+        expires_at = now + self._get_auth_ticket_lifetime_minutes() * 60
+        with _auth_ticket_lock:
+            _auth_ticket_cache[cache_key] = (ticket, expires_at)
+        self._write_shared_authentication_ticket(ticket, expires_at)
+        return ticket
+
+    def _invalidate_forms_authentication_ticket(self):
+        with _auth_ticket_lock:
+            for record in self:
+                _auth_ticket_cache.pop((self.env.cr.dbname, record.id), None)
+
+    def _read_shared_authentication_ticket(self):
+        # Read and written with plain SQL: going through ir.config_parameter
+        # would clear the registry caches of every worker on each refresh.
+        self.env.cr.execute(
+            'SELECT value FROM ir_config_parameter WHERE key = %s',
+            [f'{AUTH_TICKET_PARAM_PREFIX}{self.id}'],
+        )
+        row = self.env.cr.fetchone()
+        if not row:
+            return False
+        try:
+            payload = json.loads(row[0])
+            return payload['ticket'], float(payload['expires_at'])
+        except (TypeError, ValueError, KeyError):
+            return False
+
+    def _write_shared_authentication_ticket(self, ticket, expires_at):
+        # A separate cursor publishes the ticket immediately and keeps the
+        # row lock out of the caller's transaction.
+        try:
+            with self.env.registry.cursor() as cr:
+                cr.execute(
+                    """
+                    INSERT INTO ir_config_parameter (key, value, create_uid, write_uid, create_date, write_date)
+                    VALUES (%s, %s, %s, %s, (now() at time zone 'UTC'), (now() at time zone 'UTC'))
+                    ON CONFLICT (key) DO UPDATE
+                       SET value = EXCLUDED.value,
+                           write_uid = EXCLUDED.write_uid,
+                           write_date = EXCLUDED.write_date
+                    """,
+                    [
+                        f'{AUTH_TICKET_PARAM_PREFIX}{self.id}',
+                        json.dumps({'ticket': ticket, 'expires_at': expires_at}),
+                        self.env.uid,
+                        self.env.uid,
+                    ],
+                )
+        except Exception:
+            _logger.warning('Could not share the authentication ticket of integration %s', self.id, exc_info=True)
+
+    def _get_auth_ticket_lifetime_minutes(self):
+        value = self.env['ir.config_parameter'].sudo().get_param(
+            AUTH_TICKET_LIFETIME_PARAM,
+            AUTH_TICKET_DEFAULT_LIFETIME_MINUTES,
+        )
+        try:
+            return float(value)
+        except (TypeError, ValueError):
+            return float(AUTH_TICKET_DEFAULT_LIFETIME_MINUTES)
+
+    def _is_authentication_failure(self, error_code, description=False):
+        """Whether a failed ServiceResult means the ticket was rejected.
+
+        Out of the box a description reporting an expired or invalid ticket
+        is enough, as the integrator does not document dedicated codes.
+        Extra codes can be listed, comma separated, in
+        ``edevlet.auth_failure_error_codes``. HTTP 401/403 answers are always
+        treated as authentication failures.
+        """
+        if error_code:
+            error_codes = self.env['ir.config_parameter'].sudo().get_param(AUTH_FAILURE_ERROR_CODES_PARAM, '')
+            if error_code.strip() in {code.strip() for code in error_codes.split(',') if code.strip()}:
+                return True
+        if not description:
+            return False
+        return bool(AUTH_FAILURE_DESCRIPTION_RE.search(description.replace('İ', 'i').lower()))
+
+    def _raise_service_error(self, message, error_code, description):
+        is_authentication_failure = self._is_authentication_failure(error_code, description)
+        error_class = EdevletAuthenticationError if is_authentication_failure else UserError
+        raise error_class(message % {'code': error_code or '-', 'desc': description or '-'})
 
-    def _get_forms_authentication_ticket(self):
+    def _request_forms_authentication_ticket(self):
         envelope = f'''<soapenv:Envelope xmlns:soapenv="{SOAP_ENV_NS}" xmlns:tem="{TEMPURI_NS}">
    <soapenv:Header/>
    <soapenv:Body>
@@ -102,44 +493,18 @@ class EdevletIntegration(models.Model):
       </tem:GetFormsAuthenticationTicket>
    </soapenv:Body>
 </soapenv:Envelope>'''
-        response_text = self._send_soap_request(
-            envelope=envelope,
-            soap_action='http://tempuri.org/GetFormsAuthenticationTicket',
-        )
-        root = self._parse_xml(response_text)
-        ns = {'soap': SOAP_ENV_NS, 'tem': TEMPURI_NS}
-        ticket_node = root.find('.//tem:GetFormsAuthenticationTicketResult', ns)
+        try:
+            with self._open_soap_stream(envelope, 'http://tempuri.org/GetFormsAuthenticationTicket') as stream:
+                ticket_node = next(iter(soap_response.SoapResponseReader(stream, 'GetFormsAuthenticationTicketResult')), None)
+        except EdevletAuthenticationError as error:
+            # A rejected login must not look like an expired ticket, which
+            # would make the caller log in once more with the same credentials.
+            raise UserError(_('Entegratör girişi reddedildi, API kullanıcı bilgilerini kontrol edin.\n%s') % error.args[0]) from error
         if ticket_node is None or not ticket_node.text:
             raise UserError(_('Ticket bilgisi SOAP cevabında bulunamadı.'))
         return ticket_node.text.strip()
 
-    def _get_taxpayer_nodes(self, ticket, start_date):
-        envelope = f'''<soapenv:Envelope xmlns:soapenv="{SOAP_ENV_NS}" xmlns:tem="{TEMPURI_NS}">
-   <soapenv:Header/>
-   <soapenv:Body>
-      <tem:GetTaxIdListbyDate>
-         <tem:Ticket>{ticket}</tem:Ticket>
-         <tem:StartDate>{start_date}</tem:StartDate>
-      </tem:GetTaxIdListbyDate>
-   </soapenv:Body>
-</soapenv:Envelope>'''
-        response_text = self._send_soap_request(
-            envelope=envelope,
-            soap_action='http://tempuri.org/GetTaxIdListbyDate',
-        )
-        root = self._parse_xml(response_text)
-        ns = {'tem': TEMPURI_NS}
-        service_result = root.findtext('.//tem:ServiceResult', default='', namespaces=ns)
-        if service_result and service_result.lower() != 'successful':
-            description = root.findtext('.//tem:ServiceResultDescription', default='', namespaces=ns)
-            error_code = root.findtext('.//tem:ErrorCode', default='', namespaces=ns)
-            raise UserError(
-                _('Mükellef sorgusu başarısız oldu. Hata Kodu: %(code)s Açıklama: %(desc)s')
-                % {'code': error_code or '-', 'desc': description or '-'}
-            )
-        return root.findall('.//tem:EInvoiceCustomerResult', ns)
-
-    def _stream_and_upsert_taxpayers(self, ticket, start_date):
+    def _stream_and_upsert_taxpayers(self, ticket, start_date, checkpoint=False):
         envelope = f'''<soapenv:Envelope xmlns:soapenv="{SOAP_ENV_NS}" xmlns:tem="{TEMPURI_NS}">
    <soapenv:Header/>
    <soapenv:Body>
@@ -149,91 +514,160 @@ class EdevletIntegration(models.Model):
       </tem:GetTaxIdListbyDate>
    </soapenv:Body>
 </soapenv:Envelope>'''
-        headers = {
-            'Content-Type': 'text/xml; charset=utf-8',
-            'SOAPAction': 'http://tempuri.org/GetTaxIdListbyDate',
-        }
-        req = request.Request(
-            self.web_service_url,
-            data=envelope.encode('utf-8'),
-            headers=headers,
-            method='POST',
-        )
-        try:
-            with request.urlopen(req, timeout=300) as response:
-                return self._upsert_taxpayers_from_xml_stream(response)
-        except HTTPError as error:
-            error_body = error.read(20000).decode('utf-8', errors='ignore') if hasattr(error, 'read') else ''
-            _logger.exception('SOAP HTTP error while requesting %s', 'http://tempuri.org/GetTaxIdListbyDate')
-            raise UserError(_('SOAP HTTP hatası: %(status)s\n%(body)s') % {
-                'status': error.code,
-                'body': error_body,
-            }) from error
-        except URLError as error:
-            _logger.exception('SOAP connection error while requesting %s', 'http://tempuri.org/GetTaxIdListbyDate')
-            raise UserError(_('SOAP bağlantı hatası: %s') % error.reason) from error
-
-    def _upsert_taxpayers_from_xml_stream(self, xml_stream):
-        company_import_model = self.env['einvoice.company.import']
-        imported_count = 0
+        with self._open_soap_stream(
+            envelope,
+            'http://tempuri.org/GetTaxIdListbyDate',
+            read_timeout=TAXPAYER_IMPORT_READ_TIMEOUT,
+        ) as stream:
+            return self._upsert_taxpayers_from_xml_stream(stream, checkpoint=checkpoint)
+
+    def _upsert_taxpayers_from_xml_stream(self, xml_stream, checkpoint=False):
+        # The list order is not guaranteed, so a resumed import goes through
+        # every record again. Rows keyed on (tax_no, alias) that were already
+        # written by this run are left alone; the total keeps counting from
+        # the stored one.
+        imported_count = self.taxpayer_import_count if checkpoint else 0
+        written_since = self.taxpayer_import_run_date if checkpoint and imported_count else False
         einvoice_type = int(self.type) if self.type and str(self.type).isdigit() else False
+        started_at = time.monotonic()
+        pending_values = []
 
-        service_result = ''
-        service_result_description = ''
-        error_code = ''
-
+        reader = soap_response.SoapResponseReader(xml_stream, 'EInvoiceCustomerResult')
         try:
-            context = ET.iterparse(xml_stream, events=('start', 'end'))
-            _, root = next(context)
-        except ET.ParseError as error:
+            for node in reader:
+                values = self._prepare_taxpayer_values(node, einvoice_type)
+                if values:
+                    pending_values.append(values)
+                if len(pending_values) >= TAXPAYER_IMPORT_BATCH_SIZE:
+                    imported_count += self._bulk_upsert_taxpayer_values(pending_values, written_since=written_since)
+                    pending_values = []
+                    if checkpoint:
+                        self._save_taxpayer_import_checkpoint(imported_count)
+        except soap_response.SoapParseError as error:
             _logger.exception('SOAP response parse error')
             raise UserError(_('SOAP cevabı parse edilemedi.')) from error
 
-        for event, elem in context:
-            if event != 'end':
-                continue
-
-            if elem.tag == f'{{{TEMPURI_NS}}}ServiceResult':
-                service_result = (elem.text or '').strip()
-            elif elem.tag == f'{{{TEMPURI_NS}}}ServiceResultDescription':
-                service_result_description = (elem.text or '').strip()
-            elif elem.tag == f'{{{TEMPURI_NS}}}ErrorCode':
-                error_code = (elem.text or '').strip()
-            elif elem.tag == f'{{{TEMPURI_NS}}}EInvoiceCustomerResult':
-                tax_no = (elem.findtext(f'{{{TEMPURI_NS}}}TaxIdOrPersonalId') or '').strip()
-                alias = (elem.findtext(f'{{{TEMPURI_NS}}}Alias') or '').strip()
-                if tax_no:
-                    values = {
-                        'tax_no': tax_no,
-                        'alias': alias,
-                        'type': self._normalize_node_text(elem.findtext(f'{{{TEMPURI_NS}}}Type')),
-                        'company_fullname': self._normalize_node_text(elem.findtext(f'{{{TEMPURI_NS}}}Name')),
-                        'register_date': self._normalize_datetime(self._normalize_node_text(elem.findtext(f'{{{TEMPURI_NS}}}RegisterTime'))),
-                        'alias_creation_date': self._normalize_datetime(self._normalize_node_text(elem.findtext(f'{{{TEMPURI_NS}}}AliasCreateDate'))),
-                        'einvoice_type': einvoice_type,
-                    }
-                    domain = [('tax_no', '=', tax_no)]
-                    if alias:
-                        domain.append(('alias', '=', alias))
-                    existing_record = company_import_model.search(domain, limit=1)
-                    if existing_record:
-                        existing_record.write(values)
-                    else:
-                        company_import_model.create(values)
-                    imported_count += 1
-                elem.clear()
-                root.clear()
-
-        if service_result and service_result.lower() != 'successful':
-            raise UserError(
-                _('Mükellef sorgusu başarısız oldu. Hata Kodu: %(code)s Açıklama: %(desc)s')
-                % {'code': error_code or '-', 'desc': service_result_description or '-'}
-            )
+        if pending_values:
+            imported_count += self._bulk_upsert_taxpayer_values(pending_values, written_since=written_since)
+            if checkpoint:
+                self._save_taxpayer_import_checkpoint(imported_count)
 
+        self._check_soap_service_result(
+            reader,
+            _('Mükellef sorgusu başarısız oldu. Hata Kodu: %(code)s Açıklama: %(desc)s'),
+        )
+
+        elapsed = time.monotonic() - started_at
+        _logger.info(
+            'Taxpayer import finished: %s records in %.1fs (%.0f rows/s)',
+            imported_count, elapsed, imported_count / elapsed if elapsed else imported_count,
+        )
         return imported_count
 
+    def _prepare_taxpayer_values(self, node, einvoice_type):
+        # One pass over the children instead of a findtext() per field: lxml
+        # findtext() goes through ElementPath and costs several times more.
+        texts = {}
+        for child in node:
+            name = TAXPAYER_FIELD_TAGS.get(child.tag)
+            if name and name not in texts:
+                texts[name] = child.text
+        tax_no = self._normalize_node_text(texts.get('TaxIdOrPersonalId'))
+        if not tax_no:
+            return False
+        return {
+            'tax_no': tax_no,
+            'alias': self._normalize_node_text(texts.get('Alias')),
+            'type': self._normalize_node_text(texts.get('Type')),
+            'company_fullname': self._normalize_node_text(texts.get('Name')),
+            'register_date': self._normalize_datetime(self._normalize_node_text(texts.get('RegisterTime'))),
+            'alias_creation_date': self._normalize_datetime(self._normalize_node_text(texts.get('AliasCreateDate'))),
+            'einvoice_type': einvoice_type,
+        }
+
+    def _bulk_upsert_taxpayer_values(self, values_list, written_since=False):
+        """Create or update a chunk of taxpayer rows with a single statement.
+
+        Rows are keyed on ``(tax_no, alias)`` through the unique index of
+        ``einvoice_company_import``; when the same key appears more than once
+        in the chunk the last occurrence wins. With ``written_since`` rows
+        written at or after that time are kept as they are and only the rows
+        actually inserted or updated are counted.
+        """
+        if not values_list:
+            return 0
+        company_import_model = self.env['einvoice.company.import']
+        company_import_model.flush_model()
+
+        values_by_key = {}
+        for values in values_list:
+            values_by_key[(values['tax_no'], values['alias'] or '')] = values
+
+        rows = [
+            (
+                values['tax_no'],
+                values['alias'] or None,
+                values['type'] or None,
+                values['company_fullname'] or None,
+                values['register_date'] or None,
+                values['alias_creation_date'] or None,
+                values['einvoice_type'] or None,
+                self.env.uid,
+                self.env.uid,
+            )
+            for values in values_by_key.values()
+        ]
+        conflict_filter = ''
+        if written_since:
+            conflict_filter = self.env.cr._obj.mogrify(
+                'WHERE einvoice_company_import.write_date IS NULL'
+                ' OR einvoice_company_import.write_date < %s RETURNING id',
+                [written_since],
+            ).decode()
+        written = execute_values(
+            self.env.cr._obj,
+            f"""
+            INSERT INTO einvoice_company_import (
+                tax_no, alias, type, company_fullname, register_date, alias_creation_date,
+                einvoice_type, create_uid, write_uid, create_date, write_date
+            )
+            VALUES %s
+            ON CONFLICT (tax_no, (COALESCE(alias, ''))) DO UPDATE
+               SET type = EXCLUDED.type,
+                   company_fullname = EXCLUDED.company_fullname,
+                   register_date = EXCLUDED.register_date,
+                   alias_creation_date = EXCLUDED.alias_creation_date,
+                   einvoice_type = EXCLUDED.einvoice_type,
+                   write_uid = EXCLUDED.write_uid,
+                   write_date = EXCLUDED.write_date
+            {conflict_filter}
+            """,
+            rows,
+            template="""(
+                %s, %s, %s, %s, %s::timestamp, %s::timestamp, %s, %s, %s,
+                (now() at time zone 'UTC'), (now() at time zone 'UTC')
+            )""",
+            page_size=len(rows),
+            fetch=bool(written_since),
+        )
+        company_import_model.invalidate_model()
+        return len(written) if written_since else len(rows)
+
     def _check_customer_tax_id(self, ticket, tax_id_or_personal_id):
-        envelope = f'''<soapenv:Envelope xmlns:soapenv="{SOAP_ENV_NS}" xmlns:tem="{TEMPURI_NS}">
+        with self._open_soap_stream(
+            self._build_check_customer_tax_id_envelope(ticket, tax_id_or_personal_id),
+            CHECK_CUSTOMER_TAX_ID_ACTION,
+        ) as stream:
+            customers = self._parse_check_customer_tax_id_response(stream)
+        # Only registered taxpayers belong in the local registry, otherwise
+        # the cache-first resolver would answer "mükellef" for them later on.
+        self._upsert_check_customer_tax_id_results([
+            customer for customer in customers if self._is_existing_customer_node(customer)
+        ])
+        return self._summarize_customer_nodes(customers)
+
+    def _build_check_customer_tax_id_envelope(self, ticket, tax_id_or_personal_id):
+        return f'''<soapenv:Envelope xmlns:soapenv="{SOAP_ENV_NS}" xmlns:tem="{TEMPURI_NS}">
    <soapenv:Header/>
    <soapenv:Body>
       <tem:CheckCustomerTaxId>
@@ -242,145 +676,318 @@ class EdevletIntegration(models.Model):
       </tem:CheckCustomerTaxId>
    </soapenv:Body>
 </soapenv:Envelope>'''
-        response_text = self._send_soap_request(
-            envelope=envelope,
-            soap_action='http://tempuri.org/CheckCustomerTaxId',
+
+    def _parse_check_customer_tax_id_response(self, response):
+        """Return the customer nodes of a ``CheckCustomerTaxId`` response (bytes or a binary stream)."""
+        reader = soap_response.SoapResponseReader(response, 'EInvoiceCustomerResult')
+        try:
+            customers = list(reader)
+        except soap_response.SoapParseError as error:
+            _logger.exception('SOAP response parse error')
+            raise UserError(_('SOAP cevabı parse edilemedi.')) from error
+        self._check_soap_service_result(
+            reader,
+            _('Mükelleflik kontrolü başarısız oldu. Hata Kodu: %(code)s Açıklama: %(desc)s'),
         )
-        root = self._parse_xml(response_text)
-        ns = {'tem': TEMPURI_NS}
-
-        service_result = root.findtext('.//tem:ServiceResult', default='', namespaces=ns)
-        service_description = root.findtext('.//tem:ServiceResultDescription', default='', namespaces=ns)
-        error_code = root.findtext('.//tem:ErrorCode', default='', namespaces=ns)
-        if service_result and service_result.lower() != 'successful':
-            raise UserError(
-                _('Mükelleflik kontrolü başarısız oldu. Hata Kodu: %(code)s Açıklama: %(desc)s')
-                % {'code': error_code or '-', 'desc': service_description or '-'}
-            )
+        return customers
+
+    def _is_existing_customer_node(self, customer):
+        return (customer.findtext(f'{{{TEMPURI_NS}}}IsExist') or '').strip().lower() == 'true'
 
-        customers = root.findall('.//tem:EInvoiceCustomerResult', ns)
+    def _summarize_customer_nodes(self, customers):
         if not customers:
             return {
                 'summary': _('Sorgu başarılı fakat kayıt bulunamadı.'),
                 'status': False,
             }
 
-        self._upsert_check_customer_tax_id_results(customers)
-
         lines = []
         is_taxpayer = False
         for customer in customers:
-            is_exist = (customer.findtext(f'{{{TEMPURI_NS}}}IsExist') or '').strip().lower()
-            if is_exist == 'true':
+            is_exist = self._is_existing_customer_node(customer)
+            if is_exist:
                 is_taxpayer = True
-            lines.append(
-                _('%(tax_id)s | %(name)s | %(alias)s | Durum: %(status)s') % {
-                    'tax_id': self._normalize_node_text(customer.findtext(f'{{{TEMPURI_NS}}}TaxIdOrPersonalId')) or '-',
-                    'name': self._normalize_node_text(customer.findtext(f'{{{TEMPURI_NS}}}Name')) or '-',
-                    'alias': self._normalize_node_text(customer.findtext(f'{{{TEMPURI_NS}}}Alias')) or '-',
-                    'status': _('Var') if is_exist == 'true' else _('Yok'),
-                }
-            )
+            lines.append(self._format_taxpayer_summary_line(
+                self._normalize_node_text(customer.findtext(f'{{{TEMPURI_NS}}}TaxIdOrPersonalId')),
+                self._normalize_node_text(customer.findtext(f'{{{TEMPURI_NS}}}Name')),
+                self._normalize_node_text(customer.findtext(f'{{{TEMPURI_NS}}}Alias')),
+                is_exist,
+            ))
 
         return {
             'summary': '\n'.join(lines),
             'status': 'mukellef' if is_taxpayer else 'non_mukellef',
         }
 
-    def _upsert_check_customer_tax_id_results(self, customer_nodes):
-        company_import_model = self.env['einvoice.company.import']
-        einvoice_type = int(self.type) if self.type and str(self.type).isdigit() else False
+    def _format_taxpayer_summary_line(self, tax_id, name, alias, is_exist):
+        return _('%(tax_id)s | %(name)s | %(alias)s | Durum: %(status)s') % {
+            'tax_id': tax_id or '-',
+            'name': name or '-',
+            'alias': alias or '-',
+            'status': _('Var') if is_exist else _('Yok'),
+        }
 
-        for node in customer_nodes:
-            tax_no = self._normalize_node_text(node.findtext(f'{{{TEMPURI_NS}}}TaxIdOrPersonalId'))
-            alias = self._normalize_node_text(node.findtext(f'{{{TEMPURI_NS}}}Alias'))
-            if not tax_no:
-                continue
-
-            values = {
-                'tax_no': tax_no,
-                'alias': alias,
-                'type': self._normalize_node_text(node.findtext(f'{{{TEMPURI_NS}}}Type')),
-                'company_fullname': self._normalize_node_text(node.findtext(f'{{{TEMPURI_NS}}}Name')),
-                'register_date': self._normalize_datetime(self._normalize_node_text(node.findtext(f'{{{TEMPURI_NS}}}RegisterTime'))),
-                'alias_creation_date': self._normalize_datetime(self._normalize_node_text(node.findtext(f'{{{TEMPURI_NS}}}AliasCreateDate'))),
-                'einvoice_type': einvoice_type,
-            }
-            domain = [('tax_no', '=', tax_no)]
-            if alias:
-                domain.append(('alias', '=', alias))
-            existing_record = company_import_model.search(domain, limit=1)
-            if existing_record:
-                existing_record.write(values)
-            else:
-                company_import_model.create(values)
-
-    def _upsert_taxpayers(self, customer_nodes):
-        company_import_model = self.env['einvoice.company.import']
-        imported_count = 0
-        einvoice_type = int(self.type) if self.type and str(self.type).isdigit() else False
-        for node in customer_nodes:
-            tax_no = self._get_node_text(node, 'TaxIdOrPersonalId')
-            alias = self._get_node_text(node, 'Alias')
-            if not tax_no:
-                continue
-            values = {
-                'tax_no': tax_no,
-                'alias': alias,
-                'type': self._get_node_text(node, 'Type'),
-                'company_fullname': self._get_node_text(node, 'Name'),
-                'register_date': self._normalize_datetime(self._get_node_text(node, 'RegisterTime')),
-                'alias_creation_date': self._normalize_datetime(self._get_node_text(node, 'AliasCreateDate')),
-                'einvoice_type': einvoice_type,
-            }
-            domain = [('tax_no', '=', tax_no)]
-            if alias:
-                domain.append(('alias', '=', alias))
-            existing_record = company_import_model.search(domain, limit=1)
-            if existing_record:
-                existing_record.write(values)
-            else:
-                company_import_model.create(values)
-            imported_count += 1
-        return imported_count
+    def _resolve_customer_tax_id(self, tax_id_or_personal_id):
+        """Answer a mükelleflik check from the caches, querying the integrator only on a miss.
+
+        Lookup order is the in-process LRU, then ``einvoice.company.import``
+        rows written within the configured TTL, then ``CheckCustomerTaxId``.
+        A TTL of zero disables both caches. Only positive answers are cached,
+        a number that is not (yet) registered is asked again on the next check.
+        """
+        self.ensure_one()
+        result = self._get_cached_taxpayer_results([tax_id_or_personal_id]).get(tax_id_or_personal_id)
+        if result:
+            return result
 
-    def _send_soap_request(self, envelope, soap_action):
-        headers = {
-            'Content-Type': 'text/xml; charset=utf-8',
-            'SOAPAction': soap_action,
+        result = self._with_authentication_ticket(
+            lambda ticket: self._check_customer_tax_id(ticket=ticket, tax_id_or_personal_id=tax_id_or_personal_id)
+        )
+        with _taxpayer_lru_lock:
+            _taxpayer_cache_stats['remote_calls'] += 1
+        self._store_taxpayer_result(tax_id_or_personal_id, result)
+        return result
+
+    def _resolve_customer_tax_ids(self, tax_ids):
+        """Bulk variant of :meth:`_resolve_customer_tax_id`.
+
+        Duplicates are collapsed, cached answers are served first and the rest
+        is queried concurrently. Returns a dict keyed by tax id; failed
+        queries map to ``{'summary': <error>, 'status': False, 'error': True}``
+        instead of raising.
+        """
+        self.ensure_one()
+        tax_ids = list(dict.fromkeys(tax_id for tax_id in tax_ids if tax_id))
+        results = self._get_cached_taxpayer_results(tax_ids)
+        remaining = [tax_id for tax_id in tax_ids if tax_id not in results]
+        if remaining:
+            results.update(self._check_customer_tax_ids_concurrently(remaining))
+        return results
+
+    def _check_customer_tax_ids_concurrently(self, tax_ids):
+        results = {}
+        customer_nodes = []
+        pending = tax_ids
+        for force_refresh in (False, True):
+            ticket = self._get_forms_authentication_ticket(force_refresh=force_refresh)
+            responses = self._post_soap_requests_concurrently(
+                {tax_id: self._build_check_customer_tax_id_envelope(ticket, tax_id) for tax_id in pending},
+                CHECK_CUSTOMER_TAX_ID_ACTION,
+            )
+            rejected = []
+            for tax_id, response in responses.items():
+                try:
+                    if isinstance(response, Exception):
+                        self._raise_soap_transport_error(response, CHECK_CUSTOMER_TAX_ID_ACTION)
+                    customers = self._parse_check_customer_tax_id_response(response)
+                except EdevletAuthenticationError as error:
+                    if force_refresh:
+                        results[tax_id] = {'summary': str(error.args[0]), 'status': False, 'error': True}
+                    else:
+                        rejected.append(tax_id)
+                    continue
+                except UserError as error:
+                    results[tax_id] = {'summary': str(error.args[0]), 'status': False, 'error': True}
+                    continue
+                customer_nodes.extend(customer for customer in customers if self._is_existing_customer_node(customer))
+                results[tax_id] = self._summarize_customer_nodes(customers)
+                self._store_taxpayer_result(tax_id, results[tax_id])
+            if not rejected:
+                break
+            _logger.info('Authentication ticket of integration %s was rejected, requesting a new one', self.id)
+            pending = rejected
+
+        self._upsert_check_customer_tax_id_results(customer_nodes)
+        with _taxpayer_lru_lock:
+            _taxpayer_cache_stats['remote_calls'] += len(tax_ids)
+        return results
+
+    def _post_soap_requests_concurrently(self, envelopes, soap_action):
+        """POST many envelopes with a bounded worker pool and a global rate limit.
+
+        Worker threads only touch the HTTP transport, never the ORM. Returns a
+        dict mapping each key of ``envelopes`` to the response body (bytes) or
+        to the transport exception raised for it.
+        """
+        url = self.web_service_url
+        options = self._get_soap_transport_options()
+        workers, rate = self._get_bulk_check_limits()
+        rate_limiter = soap_transport.RateLimiter(rate)
+
+        def _post(envelope):
+            rate_limiter.wait()
+            try:
+                return soap_transport.post(url, envelope, soap_action, **options).content
+            except soap_transport.SoapTransportError as error:
+                return error
+
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = {key: executor.submit(_post, envelope) for key, envelope in envelopes.items()}
+            return {key: future.result() for key, future in futures.items()}
+
+    def _get_bulk_check_limits(self):
+        get_param = self.env['ir.config_parameter'].sudo().get_param
+        try:
+            workers = max(1, int(get_param(TAXPAYER_CHECK_WORKERS_PARAM, TAXPAYER_CHECK_DEFAULT_WORKERS)))
+        except (TypeError, ValueError):
+            workers = TAXPAYER_CHECK_DEFAULT_WORKERS
+        try:
+            rate = float(get_param(TAXPAYER_CHECK_RATE_PARAM, TAXPAYER_CHECK_DEFAULT_RATE))
+        except (TypeError, ValueError):
+            rate = TAXPAYER_CHECK_DEFAULT_RATE
+        return workers, rate
+
+    def _get_cached_taxpayer_results(self, tax_ids):
+        """Return the answers available from the LRU or the fresh local registry rows."""
+        ttl_hours = self._get_taxpayer_cache_ttl_hours()
+        if ttl_hours <= 0 or not tax_ids:
+            return {}
+
+        results = {}
+        now = time.monotonic()
+        with _taxpayer_lru_lock:
+            for tax_id in tax_ids:
+                cache_key = (self.env.cr.dbname, self.id, tax_id)
+                cached = _taxpayer_lru.get(cache_key)
+                if cached and now - cached[0] < ttl_hours * 3600:
+                    _taxpayer_lru.move_to_end(cache_key)
+                    results[tax_id] = dict(cached[1])
+            _taxpayer_cache_stats['lru_hits'] += len(results)
+
+        local_results = self._get_local_taxpayer_results(
+            [tax_id for tax_id in tax_ids if tax_id not in results],
+            ttl_hours,
+        )
+        with _taxpayer_lru_lock:
+            _taxpayer_cache_stats['local_hits'] += len(local_results)
+        for tax_id, result in local_results.items():
+            self._store_taxpayer_result(tax_id, result)
+            results[tax_id] = dict(result)
+        return results
+
+    def _get_local_taxpayer_results(self, tax_ids, ttl_hours):
+        if not tax_ids:
+            return {}
+        fresh_since = fields.Datetime.now() - timedelta(hours=ttl_hours)
+        taxpayers_by_tax_no = defaultdict(list)
+        for taxpayer in self.env['einvoice.company.import'].lookup_taxpayer(tax_ids):
+            if taxpayer.write_date and taxpayer.write_date >= fresh_since:
+                taxpayers_by_tax_no[taxpayer.tax_no].append(taxpayer)
+        return {
+            tax_no: {
+                'summary': '\n'.join(
+                    self._format_taxpayer_summary_line(taxpayer.tax_no, taxpayer.company_fullname, taxpayer.alias, True)
+                    for taxpayer in taxpayers
+                ),
+                'status': 'mukellef',
+            }
+            for tax_no, taxpayers in taxpayers_by_tax_no.items()
         }
-        req = request.Request(
-            self.web_service_url,
-            data=envelope.encode('utf-8'),
-            headers=headers,
-            method='POST',
+
+    def _store_taxpayer_result(self, tax_id, result):
+        if result.get('status') != 'mukellef' or self._get_taxpayer_cache_ttl_hours() <= 0:
+            return
+        cache_key = (self.env.cr.dbname, self.id, tax_id)
+        with _taxpayer_lru_lock:
+            _taxpayer_lru[cache_key] = (time.monotonic(), dict(result))
+            _taxpayer_lru.move_to_end(cache_key)
+            while len(_taxpayer_lru) > TAXPAYER_LRU_SIZE:
+                _taxpayer_lru.popitem(last=False)
+
+    def _get_taxpayer_cache_ttl_hours(self):
+        value = self.env['ir.config_parameter'].sudo().get_param(
+            TAXPAYER_CACHE_TTL_PARAM,
+            TAXPAYER_CACHE_DEFAULT_TTL_HOURS,
         )
         try:
-            with request.urlopen(req, timeout=60) as response:
-                return response.read().decode('utf-8', errors='ignore')
-        except HTTPError as error:
-            error_body = error.read().decode('utf-8', errors='ignore') if hasattr(error, 'read') else ''
-            _logger.exception('SOAP HTTP error while requesting %s', soap_action)
-            raise UserError(_('SOAP HTTP hatası: %(status)s\n%(body)s') % {
-                'status': error.code,
-                'body': error_body,
-            }) from error
-        except URLError as error:
-            _logger.exception('SOAP connection error while requesting %s', soap_action)
-            raise UserError(_('SOAP bağlantı hatası: %s') % error.reason) from error
+            return float(value)
+        except (TypeError, ValueError):
+            return float(TAXPAYER_CACHE_DEFAULT_TTL_HOURS)
+
+    def _upsert_check_customer_tax_id_results(self, customer_nodes):
+        einvoice_type = int(self.type) if self.type and str(self.type).isdigit() else False
+        values_list = [self._prepare_taxpayer_values(node, einvoice_type) for node in customer_nodes]
+        self._bulk_upsert_taxpayer_values([values for values in values_list if values])
 
-    def _parse_xml(self, payload):
+    def _post_soap_request(self, envelope, soap_action, read_timeout=None, stream=False):
+        """Send a SOAP call over the pooled transport of ``web_service_url``."""
+        self.ensure_one()
+        options = self._get_soap_transport_options()
+        if read_timeout:
+            options['read_timeout'] = read_timeout
         try:
-            return ET.fromstring(payload)
-        except ET.ParseError as error:
-            _logger.exception('SOAP response parse error')
-            raise UserError(_('SOAP cevabı parse edilemedi.')) from error
+            return soap_transport.post(
+                self.web_service_url,
+                envelope,
+                soap_action,
+                stream=stream,
+                **options,
+            )
+        except soap_transport.SoapTransportError as error:
+            self._raise_soap_transport_error(error, soap_action)
+
+    @contextmanager
+    def _open_soap_stream(self, envelope, soap_action, read_timeout=None):
+        """POST a SOAP call and yield the response body as a binary stream.
+
+        The body is decoded while it is read, so it can be handed straight to
+        ``soap_response.SoapResponseReader`` without being buffered. Parse and
+        read errors raised inside the block are reported as ``UserError``.
+        """
+        response = self._post_soap_request(
+            envelope=envelope,
+            soap_action=soap_action,
+            read_timeout=read_timeout,
+            stream=True,
+        )
+        with response:
+            try:
+                yield response.raw
+            except soap_response.SoapParseError as error:
+                _logger.exception('SOAP response parse error')
+                raise UserError(_('SOAP cevabı parse edilemedi.')) from error
+            except urllib3.exceptions.HTTPError as error:
+                _logger.exception('SOAP connection error while reading %s', soap_action)
+                raise UserError(_('SOAP bağlantı hatası: %s') % error) from error
+
+    def _check_soap_service_result(self, reader, message):
+        """Raise ``message`` when the ``ServiceResult`` read by ``reader`` is not successful."""
+        if reader.failed:
+            self._raise_service_error(message, reader.error_code, reader.description)
+
+    def _raise_soap_transport_error(self, error, soap_action):
+        if isinstance(error, soap_transport.SoapHTTPError):
+            _logger.error('SOAP HTTP error %s while requesting %s', error.status, soap_action)
+            error_class = EdevletAuthenticationError if error.status in AUTH_FAILURE_HTTP_STATUSES else UserError
+            raise error_class(_('SOAP HTTP hatası: %(status)s\n%(body)s') % {
+                'status': error.status,
+                'body': error.body,
+            }) from error
+        _logger.error('SOAP connection error while requesting %s: %s', soap_action, error.reason)
+        raise UserError(_('SOAP bağlantı hatası: %s') % error.reason) from error
+
+    @api.model
+    def _get_soap_transport_options(self):
+        get_param = self.env['ir.config_parameter'].sudo().get_param
+
+        def _number(key, parse, default):
+            value = get_param(key)
+            if not value:
+                return default
+            try:
+                number = parse(value)
+            except (TypeError, ValueError):
+                number = None
+            if number is None or not number > 0:
+                _logger.warning('Invalid value %r for system parameter %s, using %s', value, key, default)
+                return default
+            return number
 
-    def _get_node_text(self, parent_node, tag_name):
-        node = parent_node.find(f'{{{TEMPURI_NS}}}{tag_name}')
-        if node is None or not node.text:
-            return False
-        return node.text.strip()
+        return {
+            'connect_timeout': _number(SOAP_CONNECT_TIMEOUT_PARAM, float, soap_transport.DEFAULT_CONNECT_TIMEOUT),
+            'read_timeout': _number(SOAP_READ_TIMEOUT_PARAM, float, soap_transport.DEFAULT_READ_TIMEOUT),
+            'pool_size': _number(SOAP_POOL_SIZE_PARAM, int, soap_transport.DEFAULT_POOL_SIZE),
+        }
 
     def _normalize_datetime(self, value):
         if not value:
@@ -1,4 +1,18 @@
-from odoo import models, fields
+from psycopg2.extras import execute_values
+
+from odoo import api, models, fields
+
+
+RECEIVING_DETAIL_UPSERT_COLUMNS = (
+    'uuid', 'einvoice_id', 'service_result', 'status_code', 'status_description', 'invoice_type_code',
+    'profile_id', 'sender_tax_id', 'receiver_tax_id', 'party_name', 'issue_date', 'last_date',
+)
+RECEIVING_DETAIL_TIMESTAMP_COLUMNS = ('issue_date', 'last_date')
+
+
+def _sql_value(value):
+    # False is the ORM's empty value; 0 (e.g. a status code) is a real one.
+    return None if value is None or value is False else value
 
 
 class EdevletRelation(models.Model):
@@ -100,16 +114,90 @@ class EinvoiceReceivingDetail(models.Model):
     create_date = fields.Datetime(string='Create Date')
     record_type = fields.Integer(string='Record Type')
 
+    def init(self):
+        """Enforce one row per uuid so polled responses can be upserted in bulk."""
+        self.env.cr.execute(
+            """
+            CREATE UNIQUE INDEX IF NOT EXISTS einvoice_receiving_detail_uuid_uniq
+            ON einvoice_receiving_detail (uuid)
+            """
+        )
+
+    @api.model
+    def _bulk_upsert_receiving_detail_values(self, values_list):
+        """Create or update receiving detail rows keyed on ``uuid`` with a single statement.
+
+        When the same uuid appears more than once in ``values_list`` the last
+        occurrence wins.
+        """
+        values_by_uuid = {values['uuid']: values for values in values_list if values.get('uuid')}
+        if not values_by_uuid:
+            return 0
+        self.flush_model()
+        rows = [
+            tuple(_sql_value(values.get(column)) for column in RECEIVING_DETAIL_UPSERT_COLUMNS) + (self.env.uid, self.env.uid)
+            for values in values_by_uuid.values()
+        ]
+        placeholders = ', '.join(
+            '%s::timestamp' if column in RECEIVING_DETAIL_TIMESTAMP_COLUMNS else '%s'
+            for column in RECEIVING_DETAIL_UPSERT_COLUMNS
+        )
+        execute_values(
+            self.env.cr._obj,
+            f"""
+            INSERT INTO einvoice_receiving_detail (
+                {', '.join(RECEIVING_DETAIL_UPSERT_COLUMNS)}, create_uid, write_uid, create_date, write_date
+            )
+            VALUES %s
+            ON CONFLICT (uuid) DO UPDATE
+               SET {', '.join(f'{column} = EXCLUDED.{column}' for column in RECEIVING_DETAIL_UPSERT_COLUMNS[1:])},
+                   write_uid = EXCLUDED.write_uid,
+                   write_date = EXCLUDED.write_date
+            """,
+            rows,
+            template=f"""(
+                {placeholders}, %s, %s, (now() at time zone 'UTC'), (now() at time zone 'UTC')
+            )""",
+            page_size=len(rows),
+        )
+        self.invalidate_model()
+        return len(rows)
+
 
 class EinvoiceCompanyImport(models.Model):
     _name = 'einvoice.company.import'
     _description = 'E-Invoice Company Import'
 
     einvoice_comp_id = fields.Integer(string='E-Invoice Company ID', readonly=True, copy=False)
-    tax_no = fields.Char(string='Tax No', size=50)
+    tax_no = fields.Char(string='Tax No', size=50, index=True)
     alias = fields.Char(string='Alias', size=100)
     company_fullname = fields.Char(string='Company Full Name', size=250)
     type = fields.Char(string='Type', size=50)
     register_date = fields.Datetime(string='Register Date')
     alias_creation_date = fields.Datetime(string='Alias Creation Date')
     einvoice_type = fields.Integer(string='E-Invoice Type')
+
+    def init(self):
+        """Enforce one row per (tax_no, alias) so taxpayer imports can upsert in bulk."""
+        self.env.cr.execute(
+            """
+            CREATE UNIQUE INDEX IF NOT EXISTS einvoice_company_import_tax_no_alias_uniq
+            ON einvoice_company_import (tax_no, (COALESCE(alias, '')))
+            """
+        )
+
+    @api.model
+    def lookup_taxpayer(self, tax_no):
+        """Return the imported registry rows of a VKN/TCKN, newest alias first and undated aliases last.
+
+        ``tax_no`` may also be a list, in which case the rows of all given
+        numbers are fetched with a single query.
+        """
+        tax_nos = [tax_no] if isinstance(tax_no, str) or not tax_no else tax_no
+        tax_nos = [value.strip() for value in tax_nos if value and value.strip()]
+        if not tax_nos:
+            return self.browse()
+        return self.search(
+            [('tax_no', 'in', tax_nos)],
+            order='alias_creation_date desc nulls last, id desc',
+        )
@@ -0,0 +1,769 @@
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+import base64
+import hashlib
+import io
+import logging
+import shutil
+import tempfile
+import time
+import uuid
+import xml.etree.ElementTree as ET
+from xml.sax.saxutils import escape
+
+import urllib3
+
+from odoo import api, fields, models, _
+from odoo.exceptions import UserError, ValidationError
+from odoo.tools import str2bool
+
+from .. import soap_response, soap_transport, ubl_envelope, ubl_validation
+
+
+_logger = logging.getLogger(__name__)
+
+SOAP12_ENV_NS = 'http://www.w3.org/2003/05/soap-envelope'
+GIB_EFATURA_NS = 'http://gib.gov.tr/vedop3/eFatura'
+XMLMIME_NS = 'http://www.w3.org/2005/05/xmlmime'
+SEND_DOCUMENT_ACTION = 'sendDocument'
+GET_APPLICATION_RESPONSE_ACTION = 'getApplicationResponse'
+UBL_CBC_NS = 'urn:oasis:names:specification:ubl:schema:xsd:CommonBasicComponents-2'
+UBL_CAC_NS = 'urn:oasis:names:specification:ubl:schema:xsd:CommonAggregateComponents-2'
+# Spooled responses stay in memory up to this size, then move to a temp file.
+RESPONSE_SPOOL_MAX_MEMORY = 1024 * 1024
+APPLICATION_RESPONSE_TAG = '{urn:oasis:names:specification:ubl:schema:xsd:ApplicationResponse-2}ApplicationResponse'
+# GİB system response codes that are not final yet: queued, processing,
+# processed by GİB, not delivered yet and waiting for the receiver.
+APPLICATION_RESPONSE_PENDING_CODES = ('1000', '1100', '1200', '1210', '1220')
+APPLICATION_RESPONSE_SUCCESS_CODE = '1300'
+
+SEND_QUEUE_BATCH_SIZE_PARAM = 'edevlet.send_queue_batch_size'
+SEND_QUEUE_DEFAULT_BATCH_SIZE = 50
+SEND_QUEUE_WORKERS_PARAM = 'edevlet.send_queue_workers'
+SEND_QUEUE_DEFAULT_WORKERS = 4
+SEND_QUEUE_MAX_ATTEMPTS_PARAM = 'edevlet.send_queue_max_attempts'
+SEND_QUEUE_DEFAULT_MAX_ATTEMPTS = 6
+SEND_QUEUE_BACKOFF_PARAM = 'edevlet.send_queue_backoff_seconds'
+SEND_QUEUE_DEFAULT_BACKOFF_SECONDS = 60
+SEND_QUEUE_MAX_BACKOFF_SECONDS = 6 * 3600
+# Claimed entries not settled within this time (killed worker) are claimed again.
+SEND_QUEUE_LEASE_SECONDS = 30 * 60
+VALIDATE_BEFORE_SEND_PARAM = 'edevlet.validate_before_send'
+ENVELOPE_MAX_DOCUMENTS_PARAM = 'edevlet.envelope_max_documents'
+ENVELOPE_MAX_BYTES_PARAM = 'edevlet.envelope_max_bytes'
+APPLICATION_RESPONSE_BATCH_SIZE_PARAM = 'edevlet.application_response_batch_size'
+APPLICATION_RESPONSE_DEFAULT_BATCH_SIZE = 200
+RECEIVER_ALIAS_PREFIX = 'urn:mail:'
+RECEIVER_POSTBOX_LABEL_SUFFIX = 'pk'
+RECEIVER_DEFAULT_POSTBOX_LABEL = 'defaultpk'
+
+
+def _postbox_label(alias):
+    """Return the label of a ``urn:mail:<label>@<domain>`` postbox alias, False for any other alias."""
+    if not alias:
+        return False
+    address = alias.strip().lower()
+    if address.startswith(RECEIVER_ALIAS_PREFIX):
+        address = address[len(RECEIVER_ALIAS_PREFIX):]
+    label = address.split('@', 1)[0]
+    return label if label.endswith(RECEIVER_POSTBOX_LABEL_SUFFIX) else False
+
+
+def _spool_body(raw):
+    """Copy a streamed response body into a rewound temporary file."""
+    spool = tempfile.SpooledTemporaryFile(max_size=RESPONSE_SPOOL_MAX_MEMORY)
+    try:
+        shutil.copyfileobj(raw, spool)
+    except urllib3.exceptions.HTTPError as error:
+        spool.close()
+        raise soap_transport.SoapTransportError(str(error)) from error
+    spool.seek(0)
+    return spool
+
+
+def _node_text(node, path):
+    value = node.findtext(path)
+    if not value:
+        return False
+    return value.strip() or False
+
+
+class EinvoiceSendQueue(models.Model):
+    _name = 'einvoice.send.queue'
+    _description = 'E-Invoice Outbound Queue'
+    _order = 'id desc'
+
+    move_id = fields.Many2one('account.move', string='Invoice', required=True, ondelete='cascade', index=True)
+    integration_id = fields.Many2one('edevlet.integration', string='Integration', ondelete='set null')
+    state = fields.Selection([
+        ('pending', 'Pending'),
+        ('sending', 'Sending'),
+        ('sent', 'Sent'),
+        ('failed', 'Failed'),
+    ], string='State', default='pending', required=True, index=True, copy=False)
+    document_uuid = fields.Char(
+        string='Document UUID',
+        size=50,
+        required=True,
+        copy=False,
+        default=lambda self: str(uuid.uuid4()),
+        help='UUID written into the UBL document; kept for every retry so the integrator can detect duplicates.',
+    )
+    envelope_uuid = fields.Char(
+        string='Envelope UUID',
+        size=50,
+        index=True,
+        copy=False,
+        help='Instance identifier of the envelope (ZARF) the document was last sent in.',
+    )
+    attempt_count = fields.Integer(string='Attempts', default=0, copy=False)
+    next_attempt_date = fields.Datetime(
+        string='Next Attempt',
+        required=True,
+        index=True,
+        copy=False,
+        default=fields.Datetime.now,
+    )
+    last_attempt_date = fields.Datetime(string='Last Attempt', copy=False)
+    last_error = fields.Text(string='Last Error', copy=False)
+    sent_date = fields.Datetime(string='Sent Date', copy=False)
+    response_message = fields.Char(string='Response Message', size=250, copy=False)
+    response_hash = fields.Char(string='Response Hash', size=100, copy=False)
+    system_response_code = fields.Char(string='System Response Code', size=20, copy=False)
+    system_response_description = fields.Char(string='System Response Description', size=250, copy=False)
+
+    @api.model
+    def _enqueue_moves(self, moves):
+        """Queue the posted customer invoices of ``moves`` that are not queued or sent yet.
+
+        Only rows are inserted here; documents are generated and sent by the
+        cron so posting never waits for the integrator.
+        """
+        moves = moves.filtered(
+            lambda move: move.state == 'posted' and move.move_type in move._XML_ALLOWED_MOVE_TYPES
+        )
+        if not moves:
+            return self.browse()
+        queued_moves = self.search([
+            ('move_id', 'in', moves.ids),
+            ('state', 'in', ('pending', 'sending', 'sent')),
+        ]).move_id
+        integrations = {}
+        values_list = []
+        for move in moves - queued_moves:
+            if move.company_id not in integrations:
+                integrations[move.company_id] = move._get_edevlet_integration()
+            values_list.append({
+                'move_id': move.id,
+                'integration_id': integrations[move.company_id].id,
+            })
+        return self.create(values_list)
+
+    def action_retry(self):
+        entries = self.filtered(lambda entry: entry.state == 'failed')
+        entries.write({
+            'state': 'pending',
+            'attempt_count': 0,
+            'next_attempt_date': fields.Datetime.now(),
+            'system_response_code': False,
+            'system_response_description': False,
+        })
+        # Re-sent entries must be polled again even if the cursor already passed them.
+        for integration in entries.integration_id:
+            first_id = min(entries.filtered(lambda entry: entry.integration_id == integration).ids)
+            if integration.application_response_cursor >= first_id:
+                integration.application_response_cursor = first_id - 1
+
+    @api.model
+    def _cron_send_pending(self, limit=None):
+        """Send one batch of due entries per cron call.
+
+        The claim is committed before the documents are sent, so no row lock
+        is held while the integrator answers. The cron is run again right
+        away while due entries remain.
+        """
+        batch_size, workers = self._get_send_queue_limits()
+        entries = self._claim_due_entries(limit or batch_size)
+        if not entries:
+            return 0
+        self.env.cr.commit()
+        entries._send(workers)
+        self.env['ir.cron']._notify_progress(
+            done=len(entries), remaining=self.search_count(self._get_due_domain()),
+        )
+        return len(entries)
+
+    @api.model
+    def _get_due_domain(self):
+        return [('state', 'in', ('pending', 'sending')), ('next_attempt_date', '<=', fields.Datetime.now())]
+
+    @api.model
+    def _claim_due_entries(self, limit):
+        """Mark the next due entries ``sending`` and lease them for ``SEND_QUEUE_LEASE_SECONDS``.
+
+        Rows locked by a parallel cron run are skipped. An entry whose lease
+        expires while still ``sending`` (the worker was killed) is due again.
+        """
+        self.flush_model()
+        now = fields.Datetime.now()
+        self.env.cr.execute(
+            """
+            SELECT id
+              FROM einvoice_send_queue
+             WHERE state IN ('pending', 'sending')
+               AND next_attempt_date <= %s
+             ORDER BY next_attempt_date, id
+             LIMIT %s
+               FOR UPDATE SKIP LOCKED
+            """,
+            (now, limit),
+        )
+        entries = self.browse([row[0] for row in self.env.cr.fetchall()])
+        entries.write({
+            'state': 'sending',
+            'next_attempt_date': now + timedelta(seconds=SEND_QUEUE_LEASE_SECONDS),
+        })
+        return entries
+
+    def _send(self, workers):
+        started = time.monotonic()
+        detail_values = []
+        requests_by_envelope, entries_by_envelope = self._prepare_envelope_requests(detail_values)
+
+        responses = self._post_gib_requests(requests_by_envelope, SEND_DOCUMENT_ACTION, workers)
+        for envelope_uuid, response in responses.items():
+            entries = entries_by_envelope[envelope_uuid]
+            if isinstance(response, soap_transport.SoapTransportError):
+                error_code, error = self._describe_gib_error(response, SEND_DOCUMENT_ACTION)
+                detail_values.extend(entry._register_attempt(error=error, error_code=error_code) for entry in entries)
+                continue
+            try:
+                message, response_hash = self._parse_send_document_response(response)
+            except UserError as error:
+                detail_values.extend(entry._register_attempt(error=str(error)) for entry in entries)
+                continue
+            detail_values.extend(
+                entry._register_attempt(message=message, response_hash=response_hash) for entry in entries
+            )
+
+        self.env['einvoice.sending.detail'].sudo().create(detail_values)
+        sent_count = len(self.filtered(lambda entry: entry.state == 'sent'))
+        elapsed = time.monotonic() - started
+        _logger.info(
+            'E-invoice queue: %s of %s documents sent in %s envelopes in %.1fs (%.1f documents/s)',
+            sent_count, len(self), len(requests_by_envelope), elapsed, len(self) / elapsed if elapsed else 0.0,
+        )
+
+    def _prepare_envelope_requests(self, detail_values):
+        """Render the documents and pack them into one envelope per receiver and size limit.
+
+        Returns ``(requests, entries)``, both keyed by envelope UUID. Entries
+        whose document cannot be generated get a failed attempt appended to
+        ``detail_values`` and are left out.
+        """
+        max_documents, max_bytes = self._get_envelope_limits()
+        receiver_aliases = self._get_receiver_aliases()
+        rendered = []
+        for entry in self:
+            try:
+                integration = entry._get_send_integration()
+                receiver_alias = receiver_aliases.get(entry.move_id.partner_id.commercial_partner_id.id)
+                if not receiver_alias:
+                    raise UserError(_('Alıcı için e-Fatura posta kutusu etiketi bulunamadı.'))
+                document = entry._render_document(integration)
+            except (UserError, ValidationError) as error:
+                detail_values.append(entry._register_attempt(error=str(error)))
+                continue
+            rendered.append((entry, integration, receiver_alias, document))
+
+        if rendered and self._is_validate_before_send_enabled():
+            issues_list = ubl_validation.validate_documents(
+                [document for _entry, _integration, _alias, document in rendered],
+                xsd_path=self.env['account.move']._get_ubl_xsd_path(),
+            )
+            valid = []
+            for item, issues in zip(rendered, issues_list):
+                if not issues:
+                    valid.append(item)
+                    continue
+                # A document rejected by the schematron fails the same way on every retry.
+                error = _('XML doğrulaması başarısız:\n%s') % '\n'.join(f'- {issue.message}' for issue in issues)
+                detail_values.append(item[0]._register_attempt(error=error, retry=False))
+            rendered = valid
+
+        groups = {}
+        for entry, integration, receiver_alias, document in rendered:
+            group = groups.setdefault((integration, receiver_alias), ([], []))
+            group[0].append(entry)
+            group[1].append(document)
+
+        requests_by_envelope = {}
+        entries_by_envelope = {}
+        creation_datetime = fields.Datetime.context_timestamp(self, fields.Datetime.now()).strftime('%Y-%m-%dT%H:%M:%S')
+        for (integration, receiver_alias), (entries, documents) in groups.items():
+            start = 0
+            for batch in ubl_envelope.pack_documents(documents, max_count=max_documents, max_bytes=max_bytes):
+                batch_entries = self.browse([entry.id for entry in entries[start:start + len(batch)]])
+                start += len(batch)
+                envelope_uuid = str(uuid.uuid4())
+                header = {
+                    'instance_identifier': envelope_uuid,
+                    'creation_datetime': creation_datetime,
+                    'sender': self._prepare_envelope_party(
+                        integration.sender_alias, batch_entries[0].move_id.company_id.partner_id
+                    ),
+                    'receiver': self._prepare_envelope_party(
+                        receiver_alias, batch_entries[0].move_id.partner_id.commercial_partner_id
+                    ),
+                }
+                payload = ubl_envelope.build_envelope_zip(header, batch)
+                requests_by_envelope[envelope_uuid] = {
+                    'url': integration.document_service_url,
+                    'envelope': self._build_send_document_envelope(
+                        f'{envelope_uuid}.zip', payload, hashlib.md5(payload).hexdigest()
+                    ),
+                }
+                entries_by_envelope[envelope_uuid] = batch_entries
+                batch_entries.write({'envelope_uuid': envelope_uuid})
+        return requests_by_envelope, entries_by_envelope
+
+    def _get_send_integration(self):
+        self.ensure_one()
+        integration = self.integration_id or self.move_id._get_edevlet_integration()
+        if not integration or not integration.document_service_url:
+            raise UserError(_('E-Fatura gönderim servis adresi (Document Service URL) tanımlı değil.'))
+        if not integration.sender_alias:
+            raise UserError(_('E-Fatura gönderici birim etiketi (Sender Alias) tanımlı değil.'))
+        return integration
+
+    def _render_document(self, integration):
+        """Return the serialized UBL document of the entry, carrying its stable UUID."""
+        self.ensure_one()
+        buffer = io.BytesIO()
+        self.move_id._write_invoice_xml(buffer, integration=integration, document_uuid=self.document_uuid)
+        return buffer.getvalue()
+
+    def _get_receiver_aliases(self):
+        """Map the commercial partner ids of the queued moves to their postbox alias."""
+        return self._get_partner_receiver_aliases(self.move_id.partner_id.commercial_partner_id)
+
+    @api.model
+    def _get_partner_receiver_aliases(self, partners):
+        """Map ``partners`` ids to their e-invoice postbox alias, from the imported taxpayer list.
+
+        Only postbox aliases (``urn:mail:<label>pk@...``) can receive
+        invoices; sender unit (``...gb@``) aliases are ignored. The
+        ``defaultpk`` label wins, otherwise the most recently created postbox,
+        which is the first one returned by ``lookup_taxpayer``.
+        """
+        tax_ids = {partner.id: (partner.vergi_no or partner.vat or '').strip() for partner in partners}
+        aliases_by_tax_id = {}
+        for taxpayer in self.env['einvoice.company.import'].sudo().lookup_taxpayer(list(set(tax_ids.values()))):
+            label = _postbox_label(taxpayer.alias)
+            if not label:
+                continue
+            is_default = label == RECEIVER_DEFAULT_POSTBOX_LABEL
+            current = aliases_by_tax_id.get(taxpayer.tax_no)
+            if current is None or (is_default and not current[0]):
+                aliases_by_tax_id[taxpayer.tax_no] = (is_default, taxpayer.alias)
+        return {
+            partner_id: aliases_by_tax_id[tax_id][1] if tax_id in aliases_by_tax_id else None
+            for partner_id, tax_id in tax_ids.items()
+        }
+
+    @api.model
+    def _prepare_envelope_party(self, alias, partner):
+        return {
+            'identifier': alias,
+            'name': partner.name or '',
+            'tax_id': partner.vergi_no or partner.vat or '',
+        }
+
+    @api.model
+    def _build_send_document_envelope(self, file_name, payload, payload_hash):
+        return f"""<?xml version="1.0" encoding="utf-8"?>
+<soap12:Envelope xmlns:soap12="{SOAP12_ENV_NS}" xmlns:ef="{GIB_EFATURA_NS}" xmlns:xmime="{XMLMIME_NS}">
+  <soap12:Body>
+    <ef:documentRequest>
+      <fileName>{escape(file_name)}</fileName>
+      <binaryData xmime:contentType="application/zip">{base64.b64encode(payload).decode()}</binaryData>
+      <hash>{payload_hash}</hash>
+    </ef:documentRequest>
+  </soap12:Body>
+</soap12:Envelope>"""
+
+    @api.model
+    def _post_gib_requests(self, requests_by_id, soap_action, workers, spool=False):
+        """POST the SOAP 1.2 envelopes with at most ``workers`` parallel calls.
+
+        Worker threads only touch the HTTP transport, never the ORM. Returns a
+        dict mapping each key of ``requests_by_id`` to the response text or to
+        the transport exception raised for it. With ``spool=True`` the bodies
+        are streamed into rewound temporary files instead, which the caller
+        must close.
+        """
+        if not requests_by_id:
+            return {}
+        options = self.env['edevlet.integration']._get_soap_transport_options()
+
+        def _post(request):
+            try:
+                response = soap_transport.post(
+                    request['url'],
+                    request['envelope'],
+                    soap_action,
+                    soap_version='1.2',
+                    stream=spool,
+                    **options,
+                )
+                if not spool:
+                    return response.content.decode('utf-8', errors='ignore')
+                with response:
+                    return _spool_body(response.raw)
+            except soap_transport.SoapTransportError as error:
+                return error
+
+        with ThreadPoolExecutor(max_workers=max(1, min(workers, len(requests_by_id)))) as executor:
+            futures = {key: executor.submit(_post, request) for key, request in requests_by_id.items()}
+            return {key: future.result() for key, future in futures.items()}
+
+    @api.model
+    def _parse_send_document_response(self, response_text):
+        try:
+            root = ET.fromstring(response_text)
+        except ET.ParseError as error:
+            raise UserError(_('sendDocument cevabı parse edilemedi.')) from error
+        fault = self._parse_gib_fault(root)
+        if fault:
+            raise UserError(_('%(action)s hatası: %(code)s - %(msg)s') % dict(fault, action=SEND_DOCUMENT_ACTION))
+        document_response = root.find(f'.//{{{GIB_EFATURA_NS}}}documentResponse')
+        if document_response is None:
+            raise UserError(_('sendDocument cevabında documentResponse bulunamadı.'))
+        return (
+            (document_response.findtext('msg') or '').strip(),
+            (document_response.findtext('hash') or '').strip(),
+        )
+
+    @api.model
+    def _parse_gib_fault(self, root):
+        fault = root.find(f'.//{{{SOAP12_ENV_NS}}}Fault')
+        if fault is None:
+            return None
+        return self._read_gib_fault(fault)
+
+    @api.model
+    def _read_gib_fault(self, fault):
+        detail = fault.find(f'.//{{{GIB_EFATURA_NS}}}EFaturaFault')
+        if detail is not None:
+            return {'code': (detail.findtext('code') or '-').strip(), 'msg': (detail.findtext('msg') or '-').strip()}
+        reason = fault.find(f'{{{SOAP12_ENV_NS}}}Reason/{{{SOAP12_ENV_NS}}}Text')
+        return {'code': '-', 'msg': (reason.text or '-').strip() if reason is not None else '-'}
+
+    @api.model
+    def _describe_gib_error(self, error, soap_action):
+        """Return ``(error code, message)`` for a failed transport call."""
+        if isinstance(error, soap_transport.SoapHTTPError):
+            try:
+                fault = self._parse_gib_fault(ET.fromstring(error.body))
+            except ET.ParseError:
+                fault = None
+            if fault:
+                return fault['code'], _('%(action)s hatası: %(code)s - %(msg)s') % dict(fault, action=soap_action)
+            return str(error.status), _('SOAP HTTP hatası: %(status)s\n%(body)s') % {
+                'status': error.status,
+                'body': error.body,
+            }
+        return False, _('SOAP bağlantı hatası: %s') % error.reason
+
+    @api.model
+    def _cron_poll_application_responses(self, limit=None):
+        """Fetch the GİB system responses of the envelopes sent since the last run.
+
+        Only outgoing envelopes are polled: GİB delivers incoming documents by
+        calling the receiver's own sendDocument service, there is nothing to
+        poll for them.
+        """
+        batch_size = limit or self._get_application_response_batch_size()
+        _batch_size, workers = self._get_send_queue_limits()
+        integrations = self.env['edevlet.integration'].sudo().search([('document_service_url', '!=', False)])
+        return sum(self._poll_application_responses(integration, batch_size, workers) for integration in integrations)
+
+    @api.model
+    def _poll_application_responses(self, integration, limit, workers):
+        """Poll the open envelopes of ``integration`` above its cursor, then move the cursor.
+
+        The cursor is the highest queue id up to which every entry has a final
+        system response, so the cost of a run follows the number of envelopes
+        sent since then rather than the whole sending history.
+        """
+        started = time.monotonic()
+        cursor = integration.application_response_cursor
+        open_entries = self.search(
+            self._get_open_response_domain(integration, cursor, sent_only=True),
+            order='id',
+            limit=limit,
+        )
+        envelope_uuids = set(open_entries.mapped('envelope_uuid'))
+        entries_by_envelope = {envelope_uuid: self.browse() for envelope_uuid in envelope_uuids}
+        for entry in self.search([('envelope_uuid', 'in', list(envelope_uuids)), ('state', '=', 'sent')]):
+            entries_by_envelope[entry.envelope_uuid] |= entry
+
+        requests_by_envelope = {
+            envelope_uuid: {
+                'url': integration.document_service_url,
+                'envelope': self._build_get_application_response_envelope(envelope_uuid),
+            }
+            for envelope_uuid in envelope_uuids
+        }
+        responses = self._post_gib_requests(
+            requests_by_envelope, GET_APPLICATION_RESPONSE_ACTION, workers, spool=True
+        )
+        detail_values = []
+        for envelope_uuid, response in responses.items():
+            if isinstance(response, soap_transport.SoapTransportError):
+                _error_code, error = self._describe_gib_error(response, GET_APPLICATION_RESPONSE_ACTION)
+                _logger.warning('Application response of envelope %s could not be fetched: %s', envelope_uuid, error)
+                continue
+            try:
+                with response:
+                    response_values = self._parse_get_application_response(response)
+            except UserError as error:
+                _logger.warning('Application response of envelope %s could not be read: %s', envelope_uuid, error)
+                continue
+            detail_values.extend(response_values)
+            # Responses about other documents are only recorded; the entries
+            # follow the system response of their own envelope.
+            envelope_response = [values for values in response_values if values['einvoice_id'] == envelope_uuid]
+            if envelope_response:
+                entries_by_envelope[envelope_uuid]._apply_system_response(
+                    envelope_response[-1]['service_result'],
+                    envelope_response[-1]['status_description'],
+                )
+
+        self.env['einvoice.receiving.detail'].sudo()._bulk_upsert_receiving_detail_values(detail_values)
+        integration.sudo().write({
+            'application_response_cursor': self._get_application_response_cursor(integration, cursor),
+            'application_response_poll_date': fields.Datetime.now(),
+        })
+        _logger.info(
+            'Application responses of integration %s: %s envelopes polled, %s responses stored in %.1fs',
+            integration.id, len(responses), len(detail_values), time.monotonic() - started,
+        )
+        return len(responses)
+
+    @api.model
+    def _get_open_response_domain(self, integration, cursor, sent_only=False):
+        """Entries above ``cursor`` that still wait for being sent or for a final system response."""
+        awaiting_response = [
+            ('state', '=', 'sent'),
+            ('envelope_uuid', '!=', False),
+            '|',
+            ('system_response_code', '=', False),
+            ('system_response_code', 'in', APPLICATION_RESPONSE_PENDING_CODES),
+        ]
+        domain = [('integration_id', '=', integration.id), ('id', '>', cursor)]
+        if sent_only:
+            return domain + awaiting_response
+        return domain + ['|', ('state', 'in', ('pending', 'sending')), '&', '&'] + awaiting_response
+
+    @api.model
+    def _get_application_response_cursor(self, integration, cursor):
+        first_open = self.search(self._get_open_response_domain(integration, cursor), order='id', limit=1)
+        if first_open:
+            return first_open.id - 1
+        last_entry = self.search([('integration_id', '=', integration.id)], order='id desc', limit=1)
+        return max(cursor, last_entry.id)
+
+    def _apply_system_response(self, code, description):
+        values = {
+            'system_response_code': code,
+            'system_response_description': (description or '')[:250] or False,
+        }
+        if code and code not in APPLICATION_RESPONSE_PENDING_CODES and code != APPLICATION_RESPONSE_SUCCESS_CODE:
+            values.update({
+                'state': 'failed',
+                'last_error': _('GİB sistem yanıtı: %(code)s - %(description)s') % {
+                    'code': code,
+                    'description': description or '-',
+                },
+            })
+        self.write(values)
+
+    @api.model
+    def _build_get_application_response_envelope(self, instance_identifier):
+        return f"""<?xml version="1.0" encoding="utf-8"?>
+<soap12:Envelope xmlns:soap12="{SOAP12_ENV_NS}" xmlns:ef="{GIB_EFATURA_NS}">
+  <soap12:Body>
+    <ef:getAppRespRequest>
+      <instanceIdentifier>{escape(instance_identifier)}</instanceIdentifier>
+    </ef:getAppRespRequest>
+  </soap12:Body>
+</soap12:Envelope>"""
+
+    @api.model
+    def _parse_get_application_response(self, response_stream):
+        """Return the receiving detail values of the responses carried by a getApplicationResponse answer.
+
+        ``response_stream`` is the binary body (or its bytes). The escaped
+        ``applicationResponse`` document (a bare response or a system
+        envelope carrying many of them) is parsed while the body is read and
+        each response is cleared once read, so memory use stays flat.
+        """
+        reader = soap_response.EmbeddedXmlReader(
+            response_stream,
+            'applicationResponse',
+            APPLICATION_RESPONSE_TAG,
+            fault_tag=f'{{{SOAP12_ENV_NS}}}Fault',
+        )
+        now = fields.Datetime.now()
+        values_list = []
+        try:
+            for node in reader:
+                values = self._prepare_application_response_values(node, now)
+                node.clear()
+                if values:
+                    values_list.append(values)
+        except soap_response.SoapParseError as error:
+            raise UserError(_('getApplicationResponse cevabı parse edilemedi.')) from error
+        if reader.fault is not None:
+            fault = self._read_gib_fault(reader.fault)
+            raise UserError(
+                _('%(action)s hatası: %(code)s - %(msg)s') % dict(fault, action=GET_APPLICATION_RESPONSE_ACTION)
+            )
+        return values_list
+
+    @api.model
+    def _prepare_application_response_values(self, node, poll_date):
+        response_uuid = _node_text(node, f'{{{UBL_CBC_NS}}}UUID')
+        if not response_uuid:
+            return False
+        document_response = node.find(f'{{{UBL_CAC_NS}}}DocumentResponse')
+        if document_response is None:
+            document_response = ET.Element('DocumentResponse')
+        # System responses carry the envelope status (1200, 1300, ...) on the
+        # line response; application responses (KABUL/RED) only on the document.
+        response = document_response.find(f'{{{UBL_CAC_NS}}}LineResponse/{{{UBL_CAC_NS}}}Response')
+        if response is None:
+            response = document_response.find(f'{{{UBL_CAC_NS}}}Response')
+        code = _node_text(response, f'{{{UBL_CBC_NS}}}ResponseCode') if response is not None else False
+        description = _node_text(response, f'{{{UBL_CBC_NS}}}Description') if response is not None else False
+        issue_date = _node_text(node, f'{{{UBL_CBC_NS}}}IssueDate')
+        issue_time = _node_text(node, f'{{{UBL_CBC_NS}}}IssueTime')
+        sender_path = f'{{{UBL_CAC_NS}}}SenderParty'
+        receiver_path = f'{{{UBL_CAC_NS}}}ReceiverParty'
+        party_id_path = f'{{{UBL_CAC_NS}}}PartyIdentification/{{{UBL_CBC_NS}}}ID'
+        return {
+            'uuid': response_uuid,
+            'einvoice_id': _node_text(
+                document_response, f'{{{UBL_CAC_NS}}}DocumentReference/{{{UBL_CBC_NS}}}ID'
+            ),
+            'service_result': code,
+            'status_code': int(code) if code and code.isdigit() else False,
+            'status_description': (description or '')[:250] or False,
+            'invoice_type_code': _node_text(
+                document_response, f'{{{UBL_CAC_NS}}}DocumentReference/{{{UBL_CBC_NS}}}DocumentTypeCode'
+            ),
+            'profile_id': _node_text(node, f'{{{UBL_CBC_NS}}}ProfileID'),
+            'sender_tax_id': _node_text(node, f'{sender_path}/{party_id_path}'),
+            'receiver_tax_id': _node_text(node, f'{receiver_path}/{party_id_path}'),
+            'party_name': _node_text(node, f'{sender_path}/{{{UBL_CAC_NS}}}PartyName/{{{UBL_CBC_NS}}}Name'),
+            'issue_date': f'{issue_date} {(issue_time or "00:00:00")[:8]}' if issue_date else False,
+            'last_date': poll_date,
+        }
+
+    def _register_attempt(self, message=False, response_hash=False, error=False, error_code=False, retry=True):
+        """Update the entry after one send attempt and return its sending detail values.
+
+        A failed attempt is retried with backoff unless ``retry`` is false or
+        the attempt limit is reached.
+        """
+        self.ensure_one()
+        now = fields.Datetime.now()
+        attempts = self.attempt_count + 1
+        values = {'attempt_count': attempts, 'last_attempt_date': now}
+        if error:
+            max_attempts, backoff_seconds = self._get_send_queue_retry_policy()
+            if not retry or attempts >= max_attempts:
+                values['state'] = 'failed'
+            else:
+                delay = min(backoff_seconds * 2 ** (attempts - 1), SEND_QUEUE_MAX_BACKOFF_SECONDS)
+                values['state'] = 'pending'
+                values['next_attempt_date'] = now + timedelta(seconds=delay)
+            values['last_error'] = error
+            _logger.warning('E-invoice %s send attempt %s failed: %s', self.document_uuid, attempts, error)
+        else:
+            values.update({
+                'state': 'sent',
+                'sent_date': now,
+                'response_message': message,
+                'response_hash': response_hash,
+                'last_error': False,
+            })
+        self.write(values)
+        return {
+            'uuid': self.document_uuid,
+            'einvoice_id': self.move_id.name,
+            'action_id': self.move_id.id,
+            'action_type': SEND_DOCUMENT_ACTION,
+            'is_succesfull': not error,
+            'service_result': 'Error' if error else 'Success',
+            'service_result_description': (error or message or '')[:250],
+            'error_code': error_code or False,
+            'invoice_type_code': self.move_id.invoice_type_code,
+            'record_date': now,
+            'record_emp': self.env.uid,
+        }
+
+    @api.model
+    def _get_send_queue_limits(self):
+        get_param = self.env['ir.config_parameter'].sudo().get_param
+        try:
+            batch_size = max(int(get_param(SEND_QUEUE_BATCH_SIZE_PARAM, SEND_QUEUE_DEFAULT_BATCH_SIZE)), 1)
+        except (TypeError, ValueError):
+            batch_size = SEND_QUEUE_DEFAULT_BATCH_SIZE
+        try:
+            workers = max(int(get_param(SEND_QUEUE_WORKERS_PARAM, SEND_QUEUE_DEFAULT_WORKERS)), 1)
+        except (TypeError, ValueError):
+            workers = SEND_QUEUE_DEFAULT_WORKERS
+        return batch_size, workers
+
+    @api.model
+    def _get_envelope_limits(self):
+        get_param = self.env['ir.config_parameter'].sudo().get_param
+        try:
+            max_documents = max(int(get_param(ENVELOPE_MAX_DOCUMENTS_PARAM, ubl_envelope.DEFAULT_MAX_DOCUMENTS)), 1)
+        except (TypeError, ValueError):
+            max_documents = ubl_envelope.DEFAULT_MAX_DOCUMENTS
+        try:
+            max_bytes = max(int(get_param(ENVELOPE_MAX_BYTES_PARAM, ubl_envelope.DEFAULT_MAX_BYTES)), 1)
+        except (TypeError, ValueError):
+            max_bytes = ubl_envelope.DEFAULT_MAX_BYTES
+        return max_documents, max_bytes
+
+    @api.model
+    def _get_application_response_batch_size(self):
+        value = self.env['ir.config_parameter'].sudo().get_param(
+            APPLICATION_RESPONSE_BATCH_SIZE_PARAM, APPLICATION_RESPONSE_DEFAULT_BATCH_SIZE
+        )
+        try:
+            return max(int(value), 1)
+        except (TypeError, ValueError):
+            return APPLICATION_RESPONSE_DEFAULT_BATCH_SIZE
+
+    @api.model
+    def _is_validate_before_send_enabled(self):
+        value = self.env['ir.config_parameter'].sudo().get_param(VALIDATE_BEFORE_SEND_PARAM, 'False')
+        return str2bool(value, default=False)
+
+    @api.model
+    def _get_send_queue_retry_policy(self):
+        get_param = self.env['ir.config_parameter'].sudo().get_param
+        try:
+            max_attempts = max(int(get_param(SEND_QUEUE_MAX_ATTEMPTS_PARAM, SEND_QUEUE_DEFAULT_MAX_ATTEMPTS)), 1)
+        except (TypeError, ValueError):
+            max_attempts = SEND_QUEUE_DEFAULT_MAX_ATTEMPTS
+        try:
+            backoff_seconds = max(float(get_param(SEND_QUEUE_BACKOFF_PARAM, SEND_QUEUE_DEFAULT_BACKOFF_SECONDS)), 0.0)
+        except (TypeError, ValueError):
+            backoff_seconds = SEND_QUEUE_DEFAULT_BACKOFF_SECONDS
+        return max_attempts, backoff_seconds
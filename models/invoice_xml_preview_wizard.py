@@ -3,33 +3,51 @@ from lxml import etree
 from odoo import fields, models
 from odoo.tools import html_escape
 
+from .. import xslt_cache
+
 
 class InvoiceXMLPreviewWizard(models.TransientModel):
     _name = 'invoice.xml.preview.wizard'
     _description = 'Invoice XML Preview'
 
     preview_html = fields.Html(string='Preview', sanitize=False, readonly=True)
+    move_id = fields.Many2one('account.move', string='Invoice', ondelete='cascade', readonly=True)
+    content_hash = fields.Char(
+        string='Content Hash',
+        index=True,
+        readonly=True,
+        help='Fingerprint of the previewed invoice without its UUID and issue time.',
+    )
 
     def action_close(self):
         return {'type': 'ir.actions.act_window_close'}
 
     @staticmethod
-    def build_preview_html(xml_content, xslt_content):
-        if not xml_content:
-            return '<div class="text-warning">Görüntülenecek XML içeriği bulunamadı.</div>'
+    def build_preview_html(xml_content, xslt_content, cache_key=None):
+        """Render ``xml_content`` through ``xslt_content``.
 
-        try:
-            xml_doc = etree.fromstring(xml_content)
-        except etree.XMLSyntaxError:
-            escaped_xml = html_escape(
-                xml_content.decode('utf-8', errors='replace') if isinstance(xml_content, (bytes, bytearray)) else str(xml_content)
-            )
-            return (
-                '<div class="text-danger">XML içeriği okunamadı.</div>'
-                '<pre style="white-space:pre-wrap;word-break:break-word;max-height:70vh;overflow:auto;padding:8px;">'
-                f'{escaped_xml}'
-                '</pre>'
-            )
+        ``xml_content`` is either serialized XML or an already built lxml
+        element, which is transformed as is. With a ``cache_key`` (e.g.
+        database name and integration id) the compiled stylesheet is reused
+        across previews.
+        """
+        if isinstance(xml_content, etree._Element):
+            xml_doc = xml_content
+        elif not xml_content:
+            return '<div class="text-warning">Görüntülenecek XML içeriği bulunamadı.</div>'
+        else:
+            try:
+                xml_doc = etree.fromstring(xml_content)
+            except etree.XMLSyntaxError:
+                escaped_xml = html_escape(
+                    xml_content.decode('utf-8', errors='replace') if isinstance(xml_content, (bytes, bytearray)) else str(xml_content)
+                )
+                return (
+                    '<div class="text-danger">XML içeriği okunamadı.</div>'
+                    '<pre style="white-space:pre-wrap;word-break:break-word;max-height:70vh;overflow:auto;padding:8px;">'
+                    f'{escaped_xml}'
+                    '</pre>'
+                )
 
         if not xslt_content:
             escaped_xml = html_escape(etree.tostring(xml_doc, encoding='unicode', pretty_print=True))
@@ -40,9 +58,12 @@ class InvoiceXMLPreviewWizard(models.TransientModel):
             )
 
         try:
-            xsl_doc = etree.fromstring(xslt_content)
-            transform = etree.XSLT(xsl_doc)
-            html_result = transform(xml_doc)
+            if cache_key is None:
+                html_result = etree.XSLT(etree.fromstring(xslt_content))(xml_doc)
+            else:
+                transform, transform_lock = xslt_cache.get_transform(cache_key, xslt_content)
+                with transform_lock:
+                    html_result = transform(xml_doc)
             return str(html_result)
         except (etree.XMLSyntaxError, etree.XSLTError, ValueError):
             escaped_xml = html_escape(etree.tostring(xml_doc, encoding='unicode', pretty_print=True))
@@ -0,0 +1,34 @@
+import io
+import mmap
+
+from odoo import api, models
+
+
+class IrAttachment(models.Model):
+    _inherit = 'ir.attachment'
+
+    @api.model
+    def _create_from_file(self, file, values):
+        """Create a binary attachment whose content is read from the binary file object ``file``.
+
+        With the file storage the file is memory-mapped and handed to the
+        standard ``raw`` create, which hashes, indexes and writes it to the
+        filestore from the mapping; generated XML and ZIP files are never
+        loaded into memory as a whole. The database storage needs the content
+        as a single value and reads the file.
+        """
+        file.seek(0)
+        if self._storage() == 'db':
+            return self.create(dict(values, type='binary', raw=file.read()))
+        try:
+            fileno = file.fileno()
+        except (AttributeError, io.UnsupportedOperation):
+            fileno = None
+        file.seek(0, io.SEEK_END)
+        if fileno is None or not file.tell():
+            file.seek(0)
+            return self.create(dict(values, type='binary', raw=file.read()))
+
+        file.flush()
+        with mmap.mmap(fileno, 0, access=mmap.ACCESS_READ) as content:
+            return self.create(dict(values, type='binary', raw=content))
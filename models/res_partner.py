@@ -1,5 +1,14 @@
-from odoo import _, fields, models
+from collections import defaultdict
+from datetime import timedelta
+
+from odoo import _, api, fields, models
 from odoo.exceptions import UserError
+
+TAXPAYER_RECHECK_DAYS_PARAM = 'edevlet.taxpayer_recheck_days'
+TAXPAYER_RECHECK_DEFAULT_DAYS = 30
+TAXPAYER_CRON_BATCH_SIZE = 1000
+# Failed lookups are retried after 1, 2, 4, ... hours, at most after the recheck period.
+TAXPAYER_RETRY_BASE_HOURS = 1
 
 
 class ResPartner(models.Model):
@@ -30,6 +39,23 @@ class ResPartner(models.Model):
         readonly=True,
         copy=False,
     )
+    taxpayer_check_date = fields.Datetime(
+        string='Mükelleflik Kontrol Tarihi',
+        readonly=True,
+        copy=False,
+    )
+    taxpayer_check_failure_count = fields.Integer(
+        string='Failed Taxpayer Checks',
+        readonly=True,
+        copy=False,
+        help='Consecutive failed taxpayer lookups; resets on the next successful one.',
+    )
+    taxpayer_check_retry_date = fields.Datetime(
+        string='Next Taxpayer Check Retry',
+        readonly=True,
+        copy=False,
+        help='The cron does not retry a failed taxpayer lookup before this date.',
+    )
 
     def action_check_customer_tax_id(self):
         self.ensure_one()
@@ -38,17 +64,13 @@ class ResPartner(models.Model):
         if not tax_id_or_personal_id:
             raise UserError(_('Müşteri kartında Vergi No/VAT bilgisi bulunamadı.'))
 
-        integration = self.env['edevlet.integration'].search([('type', '=', '1')], limit=1)
-        if not integration:
-            raise UserError(_('Mükelleflik kontrolü için EFATURA tipinde entegrasyon tanımı bulunamadı.'))
-
-        ticket = integration._get_forms_authentication_ticket()
-        result = integration._check_customer_tax_id(
-            ticket=ticket,
-            tax_id_or_personal_id=tax_id_or_personal_id,
-        )
-        self.taxpayer_check_result = result.get('summary')
-        self.taxpayer_status = result.get('status')
+        integration = self._get_taxpayer_check_integration()
+        result = integration._resolve_customer_tax_id(tax_id_or_personal_id)
+        self.write({
+            'taxpayer_check_result': result.get('summary'),
+            'taxpayer_status': result.get('status'),
+            'taxpayer_check_date': fields.Datetime.now(),
+        })
 
         return {
             'type': 'ir.actions.client',
@@ -60,3 +82,102 @@ class ResPartner(models.Model):
                 'sticky': False,
             },
         }
+
+    def action_check_customer_tax_ids(self):
+        partners = self.filtered(lambda partner: (partner.vergi_no or partner.vat or '').strip())
+        if not partners:
+            raise UserError(_('Seçili müşterilerde Vergi No/VAT bilgisi bulunamadı.'))
+
+        results = partners._check_customer_tax_ids(self._get_taxpayer_check_integration())
+        failed_count = sum(1 for result in results.values() if result.get('error'))
+        return {
+            'type': 'ir.actions.client',
+            'tag': 'display_notification',
+            'params': {
+                'title': _('Mükelleflik Kontrolü'),
+                'message': _(
+                    '%(checked)s müşteri kontrol edildi (%(unique)s farklı Vergi No, %(failed)s hatalı, %(skipped)s Vergi No bilgisi eksik).'
+                ) % {
+                    'checked': len(partners),
+                    'unique': len(results),
+                    'failed': failed_count,
+                    'skipped': len(self) - len(partners),
+                },
+                'type': 'warning' if failed_count else 'success',
+                'sticky': bool(failed_count),
+            },
+        }
+
+    @api.model
+    def _cron_check_customer_tax_ids(self, limit=TAXPAYER_CRON_BATCH_SIZE):
+        integration = self.env['edevlet.integration'].search([('type', '=', '1')], limit=1)
+        if not integration:
+            return
+        now = fields.Datetime.now()
+        # Failed lookups wait for their retry date and then come after the
+        # partners that were never tried, so they cannot take up every batch.
+        partners = self.search([
+            '|', ('vergi_no', '!=', False), ('vat', '!=', False),
+            '|', ('taxpayer_check_date', '=', False),
+            ('taxpayer_check_date', '<', now - timedelta(days=self._get_taxpayer_recheck_days())),
+            '|', ('taxpayer_check_retry_date', '=', False), ('taxpayer_check_retry_date', '<=', now),
+        ], order='taxpayer_check_retry_date asc nulls first, taxpayer_check_date asc nulls first, id', limit=limit)
+        with_tax_id = partners.filtered(lambda partner: (partner.vergi_no or partner.vat or '').strip())
+        # Blank (whitespace only) numbers are stamped as checked, otherwise
+        # they would stay at the head of the queue and take up every batch.
+        (partners - with_tax_id).write({
+            'taxpayer_check_result': _('Müşteri kartında Vergi No/VAT bilgisi bulunamadı.'),
+            'taxpayer_check_date': fields.Datetime.now(),
+        })
+        with_tax_id._check_customer_tax_ids(integration)
+
+    def _check_customer_tax_ids(self, integration):
+        """Resolve the taxpayer status of all partners in ``self`` and write it back in batches.
+
+        Partners sharing a tax id share one lookup and one ``write``. Failed
+        lookups store the error message and keep the previous status and
+        check date; the cron retries them with an exponential backoff.
+        """
+        partners_by_tax_id = defaultdict(lambda: self.browse())
+        for partner in self:
+            partners_by_tax_id[(partner.vergi_no or partner.vat or '').strip()] |= partner
+
+        results = integration._resolve_customer_tax_ids(list(partners_by_tax_id))
+        check_date = fields.Datetime.now()
+        max_retry_hours = self._get_taxpayer_recheck_days() * 24
+        for tax_id, result in results.items():
+            partners = partners_by_tax_id[tax_id]
+            values = {'taxpayer_check_result': result.get('summary')}
+            if not result.get('error'):
+                values.update({
+                    'taxpayer_status': result.get('status'),
+                    'taxpayer_check_date': check_date,
+                    'taxpayer_check_failure_count': 0,
+                    'taxpayer_check_retry_date': False,
+                })
+                partners.write(values)
+                continue
+            for failure_count, failed_partners in partners.grouped('taxpayer_check_failure_count').items():
+                delay = min(TAXPAYER_RETRY_BASE_HOURS * 2 ** failure_count, max_retry_hours)
+                failed_partners.write(dict(
+                    values,
+                    taxpayer_check_failure_count=failure_count + 1,
+                    taxpayer_check_retry_date=check_date + timedelta(hours=delay),
+                ))
+        return results
+
+    @api.model
+    def _get_taxpayer_recheck_days(self):
+        try:
+            return int(self.env['ir.config_parameter'].sudo().get_param(
+                TAXPAYER_RECHECK_DAYS_PARAM,
+                TAXPAYER_RECHECK_DEFAULT_DAYS,
+            ))
+        except (TypeError, ValueError):
+            return TAXPAYER_RECHECK_DEFAULT_DAYS
+
+    def _get_taxpayer_check_integration(self):
+        integration = self.env['edevlet.integration'].search([('type', '=', '1')], limit=1)
+        if not integration:
+            raise UserError(_('Mükelleflik kontrolü için EFATURA tipinde entegrasyon tanımı bulunamadı.'))
+        return integration
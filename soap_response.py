@@ -0,0 +1,185 @@
+"""Incremental reader for the integrator SOAP responses.
+
+Responses are parsed while they are downloaded instead of being buffered and
+decoded first: every result element is handed out as soon as its end tag has
+been read and is detached from the partial tree, so memory stays bounded by
+the size of one record however long the list is. ``ServiceResult``,
+``ServiceResultDescription`` and ``ErrorCode`` are picked up on the way and
+reading stops as soon as the service has reported a failure.
+
+Parsing uses lxml's ``iterparse`` restricted to ``end`` events of the result
+and status tags, so libxml2 skips every other element without a Python
+round trip.
+
+``EmbeddedXmlReader`` covers services that return a whole XML document
+escaped as the text of one element (GİB's ``getApplicationResponse``): the
+text is fed to a second parser while it is read, so the embedded document is
+never held as one string either.
+"""
+
+import io
+import xml.etree.ElementTree as ET
+
+from lxml import etree
+
+TEMPURI_NS = 'http://tempuri.org/'
+SERVICE_RESULT_SUCCESS = 'successful'
+STATUS_TAGS = ('ServiceResult', 'ServiceResultDescription', 'ErrorCode')
+READ_CHUNK_SIZE = 64 * 1024
+
+
+class SoapParseError(Exception):
+    """The response body is not well-formed XML."""
+
+
+class SoapResponseReader:
+    """Iterate over the ``result_tag`` elements of a SOAP response.
+
+    ``source`` is a binary file object (e.g. the raw body of a streamed
+    ``requests`` response) or the response bytes. Yielded elements are
+    already detached from their parent; keep a reference to collect them,
+    drop it to let the record be freed. ``status`` maps the status tag names
+    read so far to their text.
+
+    ``fault_tag`` (a ``{namespace}name`` tag) stops the iteration at a SOAP
+    fault; the fault element is then kept in ``fault``.
+    """
+
+    def __init__(self, source, result_tag, namespace=TEMPURI_NS, fault_tag=None):
+        self.source = io.BytesIO(source) if isinstance(source, bytes) else source
+        self.result_tag = f'{{{namespace}}}{result_tag}'
+        self.status = {}
+        self.fault = None
+        self._status_tags = {f'{{{namespace}}}{name}': name for name in STATUS_TAGS}
+        self._fault_tag = fault_tag
+        self._tags = (self.result_tag, *self._status_tags, *((fault_tag,) if fault_tag else ()))
+
+    @property
+    def failed(self):
+        """Whether the service reported a fault or anything but a successful result."""
+        if self.fault is not None:
+            return True
+        service_result = self.status.get('ServiceResult')
+        return bool(service_result) and service_result.lower() != SERVICE_RESULT_SUCCESS
+
+    @property
+    def error_code(self):
+        return self.status.get('ErrorCode', '')
+
+    @property
+    def description(self):
+        return self.status.get('ServiceResultDescription', '')
+
+    def __iter__(self):
+        result_tag = self.result_tag
+        status_tags = self._status_tags
+        context = etree.iterparse(self.source, events=('end',), tag=self._tags, resolve_entities=False)
+        try:
+            for _event, element in context:
+                if element.tag == result_tag:
+                    if self.failed:
+                        return
+                    parent = element.getparent()
+                    if parent is not None:
+                        # Drop the already handled siblings (status nodes, skipped
+                        # elements) before detaching the record itself.
+                        while element.getprevious() is not None:
+                            del parent[0]
+                        parent.remove(element)
+                    yield element
+                elif element.tag == self._fault_tag:
+                    self.fault = element
+                    return
+                else:
+                    self.status[status_tags[element.tag]] = (element.text or '').strip()
+                    if self.failed and len(self.status) == len(STATUS_TAGS):
+                        return
+        except etree.XMLSyntaxError as error:
+            raise SoapParseError(str(error)) from error
+
+    def read_status(self):
+        """Read the rest of the response, discarding results, and return ``status``."""
+        for _element in self:
+            pass
+        return self.status
+
+
+class EmbeddedXmlReader:
+    """Iterate over the ``element_tag`` elements of the XML document escaped in ``container_tag``.
+
+    ``source`` is a binary file object or bytes, as for
+    ``SoapResponseReader``. Yielded elements belong to the partial tree of
+    the embedded document; clear them once read to keep memory flat.
+    ``fault_tag`` stops the iteration at a SOAP fault, kept in ``fault``.
+    """
+
+    def __init__(self, source, container_tag, element_tag, fault_tag=None):
+        self.source = io.BytesIO(source) if isinstance(source, bytes) else source
+        self.container_tag = container_tag
+        self.element_tag = element_tag
+        self.fault = None
+        self._fault_tag = fault_tag
+        self._fault_builder = None
+        self._fault_depth = 0
+        self._in_container = False
+        self._document = None
+
+    def __iter__(self):
+        parser = ET.XMLParser(target=self)
+        try:
+            for chunk in iter(lambda: self.source.read(READ_CHUNK_SIZE), b''):
+                parser.feed(chunk)
+                yield from self._read_elements()
+                if self.fault is not None:
+                    return
+            parser.close()
+            yield from self._read_elements()
+        except ET.ParseError as error:
+            raise SoapParseError(str(error)) from error
+
+    def _read_elements(self):
+        if self._document is None:
+            return
+        for _event, element in self._document.read_events():
+            if element.tag == self.element_tag:
+                yield element
+
+    # XMLParser target interface.
+
+    def start(self, tag, attrib):
+        if self._fault_builder is not None:
+            self._fault_depth += 1
+            self._fault_builder.start(tag, attrib)
+        elif tag == self._fault_tag:
+            self._fault_builder = ET.TreeBuilder()
+            self._fault_depth = 1
+            self._fault_builder.start(tag, attrib)
+        elif tag == self.container_tag:
+            self._in_container = True
+
+    def end(self, tag):
+        if self._fault_builder is not None:
+            self._fault_builder.end(tag)
+            self._fault_depth -= 1
+            if not self._fault_depth:
+                self.fault = self._fault_builder.close()
+                self._fault_builder = None
+        elif tag == self.container_tag and self._in_container:
+            self._in_container = False
+            if self._document is not None:
+                self._document.close()
+
+    def data(self, text):
+        if self._fault_builder is not None:
+            self._fault_builder.data(text)
+        elif self._in_container:
+            if self._document is None:
+                # The embedded document may not start with whitespace.
+                text = text.lstrip()
+                if not text:
+                    return
+                self._document = ET.XMLPullParser(events=('end',))
+            self._document.feed(text.encode('utf-8'))
+
+    def close(self):
+        return None
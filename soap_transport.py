@@ -0,0 +1,118 @@
+"""Pooled HTTP transport for the integrator SOAP endpoints.
+
+Every web service URL gets its own long-lived ``requests`` session so that
+consecutive calls reuse keep-alive connections instead of paying a new TCP
+and TLS handshake each time. Responses are requested with gzip/deflate
+content encoding and decoded transparently, including streamed ones.
+"""
+
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+
+DEFAULT_CONNECT_TIMEOUT = 10
+DEFAULT_READ_TIMEOUT = 60
+DEFAULT_POOL_SIZE = 10
+ERROR_BODY_LIMIT = 20000
+
+_sessions = {}
+_sessions_lock = threading.Lock()
+
+
+class SoapTransportError(Exception):
+    """Connection level failure: DNS, refused connection, TLS or timeout."""
+
+    def __init__(self, reason):
+        super().__init__(reason)
+        self.reason = reason
+
+
+class SoapHTTPError(SoapTransportError):
+    """The endpoint answered with an HTTP error status."""
+
+    def __init__(self, status, body):
+        super().__init__(f'HTTP {status}')
+        self.status = status
+        self.body = body
+
+
+class RateLimiter:
+    """Space out calls shared by several threads to at most ``rate`` per second."""
+
+    def __init__(self, rate: float):
+        self.interval = 1.0 / rate if rate and rate > 0 else 0.0
+        self._next_slot = 0.0
+        self._lock = threading.Lock()
+
+    def wait(self) -> None:
+        if not self.interval:
+            return
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot)
+            self._next_slot = slot + self.interval
+        if slot > now:
+            time.sleep(slot - now)
+
+
+def get_session(url: str, pool_size: int = DEFAULT_POOL_SIZE) -> requests.Session:
+    """Return the shared session of ``url``, creating it on first use."""
+    key = (url, pool_size)
+    session = _sessions.get(key)
+    if session is not None:
+        return session
+    with _sessions_lock:
+        session = _sessions.get(key)
+        if session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+            session.mount('http://', adapter)
+            session.mount('https://', adapter)
+            session.headers['Accept-Encoding'] = 'gzip, deflate'
+            _sessions[key] = session
+    return session
+
+
+def post(
+    url: str,
+    envelope: str,
+    soap_action: str,
+    *,
+    connect_timeout: float = DEFAULT_CONNECT_TIMEOUT,
+    read_timeout: float = DEFAULT_READ_TIMEOUT,
+    pool_size: int = DEFAULT_POOL_SIZE,
+    stream: bool = False,
+    soap_version: str = '1.1',
+) -> requests.Response:
+    """POST a SOAP envelope over the pooled session of ``url``.
+
+    ``soap_version`` selects how the action is announced: a ``SOAPAction``
+    header for 1.1, the ``action`` parameter of the content type for 1.2.
+    With ``stream=True`` the caller must close the response (or use it as a
+    context manager); ``response.raw`` then yields the decoded body.
+    """
+    if soap_version == '1.2':
+        headers = {'Content-Type': f'application/soap+xml; charset=utf-8; action="{soap_action}"'}
+    else:
+        headers = {'Content-Type': 'text/xml; charset=utf-8', 'SOAPAction': soap_action}
+    session = get_session(url, pool_size=pool_size)
+    try:
+        response = session.post(
+            url,
+            data=envelope.encode('utf-8'),
+            headers=headers,
+            timeout=(connect_timeout, read_timeout),
+            stream=stream,
+        )
+    except requests.RequestException as error:
+        raise SoapTransportError(str(error)) from error
+
+    if response.status_code >= 400:
+        with response:
+            body = response.raw.read(ERROR_BODY_LIMIT, decode_content=True) if stream else response.content
+        raise SoapHTTPError(response.status_code, body[:ERROR_BODY_LIMIT].decode('utf-8', errors='ignore'))
+    if stream:
+        response.raw.decode_content = True
+    return response
@@ -0,0 +1,15 @@
+from . import test_application_response
+from . import test_attachment_from_file
+from . import test_authentication
+from . import test_codelist
+from . import test_company_import
+from . import test_envelope
+from . import test_partner_taxpayer_check
+from . import test_render_workers
+from . import test_send_queue
+from . import test_soap_transport_options
+from . import test_tax_subtotals
+from . import test_taxpayer_cache
+from . import test_taxpayer_import_benchmark
+from . import test_taxpayer_import_resume
+from . import test_withholding_invoice
@@ -0,0 +1,66 @@
+import io
+from xml.sax.saxutils import escape
+
+from odoo.tests import TransactionCase
+
+SOAP_ENV_NS = 'http://schemas.xmlsoap.org/soap/envelope/'
+TEMPURI_NS = 'http://tempuri.org/'
+
+
+def taxpayer_records(count, start=0):
+    """Yield ``count`` synthetic GetTaxIdListbyDate records."""
+    for index in range(start, start + count):
+        yield {
+            'TaxIdOrPersonalId': f'{index:010d}',
+            'Alias': f'urn:mail:defaultpk@firma{index}.com.tr',
+            'Type': 'Ozel',
+            'Name': f'Ornek Ticaret ve Sanayi A.S. {index}',
+            'RegisterTime': '2019-05-14T10:22:31',
+            'AliasCreateDate': '2019-05-14T10:22:31',
+            'IsExist': 'true',
+        }
+
+
+def write_soap_result_list(stream, operation, records, service_result='Successful', error_code='', description=''):
+    """Write a tempuri SOAP response carrying ``records`` as EInvoiceCustomerResult nodes into ``stream``."""
+    stream.write((
+        f'<?xml version="1.0" encoding="utf-8"?>'
+        f'<s:Envelope xmlns:s="{SOAP_ENV_NS}"><s:Body>'
+        f'<{operation}Response xmlns="{TEMPURI_NS}"><{operation}Result>'
+        f'<ServiceResult>{escape(service_result)}</ServiceResult>'
+        f'<ServiceResultDescription>{escape(description)}</ServiceResultDescription>'
+        f'<ErrorCode>{escape(error_code)}</ErrorCode>'
+    ).encode())
+    for record in records:
+        stream.write(('<EInvoiceCustomerResult>' + ''.join(
+            f'<{name}>{escape(value)}</{name}>' for name, value in record.items()
+        ) + '</EInvoiceCustomerResult>\n').encode())
+    stream.write(f'</{operation}Result></{operation}Response></s:Body></s:Envelope>'.encode())
+
+
+def soap_result_list(operation, records, **status):
+    """Return the bytes of ``write_soap_result_list``."""
+    buffer = io.BytesIO()
+    write_soap_result_list(buffer, operation, records, **status)
+    return buffer.getvalue()
+
+
+def create_integration(env, **values):
+    """Create an ``edevlet.integration`` for the current company."""
+    return env['edevlet.integration'].create({
+        'type': '1',
+        'company_code': env.company.id,
+        'api_user_name': 'test',
+        'api_password': 'test',
+        'sirket_kodu': 'TEST',
+        'web_service_url': 'https://integrator.example.com/service.asmx',
+        **values,
+    })
+
+
+class EdevletTestCommon(TransactionCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.integration = create_integration(cls.env)
@@ -0,0 +1,118 @@
+import io
+from unittest.mock import patch
+from xml.sax.saxutils import escape
+
+from odoo.addons.account.tests.common import AccountTestInvoicingCommon
+from odoo.exceptions import UserError
+from odoo.tests import tagged
+
+from .common import create_integration
+
+SOAP12_ENV_NS = 'http://www.w3.org/2003/05/soap-envelope'
+GIB_EFATURA_NS = 'http://gib.gov.tr/vedop3/eFatura'
+
+
+def application_response(response_uuid, document_id, code, description):
+    return (
+        '<ApplicationResponse xmlns="urn:oasis:names:specification:ubl:schema:xsd:ApplicationResponse-2"'
+        ' xmlns:cac="urn:oasis:names:specification:ubl:schema:xsd:CommonAggregateComponents-2"'
+        ' xmlns:cbc="urn:oasis:names:specification:ubl:schema:xsd:CommonBasicComponents-2">'
+        f'<cbc:UUID>{response_uuid}</cbc:UUID>'
+        '<cbc:IssueDate>2024-05-01</cbc:IssueDate><cbc:IssueTime>10:00:00</cbc:IssueTime>'
+        '<cac:DocumentResponse>'
+        f'<cac:Response><cbc:ResponseCode>{code}</cbc:ResponseCode></cac:Response>'
+        f'<cac:DocumentReference><cbc:ID>{document_id}</cbc:ID></cac:DocumentReference>'
+        '<cac:LineResponse><cac:Response>'
+        f'<cbc:ResponseCode>{code}</cbc:ResponseCode><cbc:Description>{description}</cbc:Description>'
+        '</cac:Response></cac:LineResponse>'
+        '</cac:DocumentResponse>'
+        '</ApplicationResponse>'
+    )
+
+
+def get_app_resp_body(*responses):
+    payload = ''.join(responses)
+    if len(responses) > 1:
+        # Several responses come wrapped in a system envelope.
+        payload = f'<Package>{payload}</Package>'
+    return (
+        f'<?xml version="1.0" encoding="utf-8"?><env:Envelope xmlns:env="{SOAP12_ENV_NS}"><env:Body>'
+        f'<ns2:getAppRespResponse xmlns:ns2="{GIB_EFATURA_NS}">'
+        f'<applicationResponse>{escape(payload)}</applicationResponse>'
+        '</ns2:getAppRespResponse></env:Body></env:Envelope>'
+    ).encode()
+
+
+@tagged('post_install', '-at_install')
+class TestApplicationResponse(AccountTestInvoicingCommon):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.integration = create_integration(cls.env, document_service_url='https://gib.example.com/EFatura')
+        cls.Queue = cls.env['einvoice.send.queue']
+
+    def _sent_entry(self, envelope_uuid):
+        return self.Queue.create({
+            'move_id': self.init_invoice('out_invoice', products=self.product_a, post=True).id,
+            'integration_id': self.integration.id,
+            'state': 'sent',
+            'envelope_uuid': envelope_uuid,
+        })
+
+    def test_parse_streams_the_application_responses(self):
+        body = get_app_resp_body(
+            application_response('a1', 'ENV-1', '1300', 'BASARIYLA TAMAMLANDI'),
+            application_response('a2', 'ENV-2', '1220', 'ALICIDAN YANIT BEKLENIYOR'),
+        )
+        values = self.Queue._parse_get_application_response(io.BytesIO(body))
+        self.assertEqual(
+            [(value['uuid'], value['einvoice_id'], value['service_result']) for value in values],
+            [('a1', 'ENV-1', '1300'), ('a2', 'ENV-2', '1220')],
+        )
+        self.assertEqual(values[0]['status_description'], 'BASARIYLA TAMAMLANDI')
+        self.assertEqual(self.Queue._parse_get_application_response(get_app_resp_body()), [])
+
+    def test_status_code_zero_is_stored(self):
+        values = self.Queue._parse_get_application_response(
+            get_app_resp_body(application_response('z1', 'ENV-0', '0', 'KUYRUKTA'))
+        )
+        self.assertEqual(values[0]['status_code'], 0)
+        self.env['einvoice.receiving.detail']._bulk_upsert_receiving_detail_values(values)
+        self.env.cr.execute("SELECT status_code, invoice_type_code FROM einvoice_receiving_detail WHERE uuid = 'z1'")
+        self.assertEqual(self.env.cr.fetchall(), [(0, None)])
+
+    def test_parse_reports_faults(self):
+        body = (
+            f'<env:Envelope xmlns:env="{SOAP12_ENV_NS}"><env:Body><env:Fault>'
+            '<env:Code><env:Value>env:Receiver</env:Value></env:Code>'
+            '<env:Reason><env:Text xml:lang="tr">Zarf bulunamadi</env:Text></env:Reason>'
+            f'<env:Detail><ns2:EFaturaFault xmlns:ns2="{GIB_EFATURA_NS}"><code>2004</code><msg>Zarf bulunamadi</msg>'
+            '</ns2:EFaturaFault></env:Detail>'
+            '</env:Fault></env:Body></env:Envelope>'
+        ).encode()
+        with self.assertRaisesRegex(UserError, '2004 - Zarf bulunamadi'):
+            self.Queue._parse_get_application_response(io.BytesIO(body))
+        with self.assertRaises(UserError):
+            self.Queue._parse_get_application_response(b'<env:Envelope')
+
+    def test_poll_applies_only_the_envelope_own_response(self):
+        answered = self._sent_entry('ENV-1')
+        other = self._sent_entry('ENV-2')
+        responses = {
+            'ENV-1': io.BytesIO(get_app_resp_body(application_response('r1', 'ENV-1', '1300', 'TAMAM'))),
+            # A response about another document must not settle ENV-2.
+            'ENV-2': io.BytesIO(get_app_resp_body(application_response('r2', 'INV-9', '1160', 'HATALI'))),
+        }
+        with patch.object(type(self.Queue), '_post_gib_requests', autospec=True, return_value=responses):
+            self.assertEqual(self.Queue._poll_application_responses(self.integration, 10, 1), 2)
+
+        self.assertEqual(answered.system_response_code, '1300')
+        self.assertEqual(answered.state, 'sent')
+        self.assertFalse(other.system_response_code)
+        self.assertEqual(other.state, 'sent')
+        self.assertEqual(
+            set(self.env['einvoice.receiving.detail'].search([('uuid', 'in', ('r1', 'r2'))]).mapped('uuid')),
+            {'r1', 'r2'},
+        )
+        self.assertTrue(all(response.closed for response in responses.values()))
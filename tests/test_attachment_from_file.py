@@ -0,0 +1,41 @@
+import hashlib
+import tempfile
+
+from odoo.tests import TransactionCase
+
+
+class TestAttachmentFromFile(TransactionCase):
+
+    def _create(self, content, mimetype='application/xml'):
+        with tempfile.TemporaryFile() as file:
+            file.write(content)
+            return self.env['ir.attachment']._create_from_file(file, {
+                'name': 'fatura.xml',
+                'mimetype': mimetype,
+            })
+
+    def test_file_storage(self):
+        self.env['ir.config_parameter'].sudo().set_param('ir_attachment.location', 'file')
+        content = b'<Invoice>' + b'<cac:InvoiceLine/>' * 200000 + b'</Invoice>'
+        attachment = self._create(content)
+        checksum = hashlib.sha1(content).hexdigest()
+        self.assertEqual(attachment.store_fname, f'{checksum[:2]}/{checksum}')
+        self.assertEqual(attachment.checksum, checksum)
+        self.assertEqual(attachment.file_size, len(content))
+        self.assertEqual(attachment.raw, content)
+        self.assertFalse(attachment.db_datas)
+
+        # The same content reuses the stored file.
+        self.assertEqual(self._create(content).store_fname, attachment.store_fname)
+
+    def test_file_storage_indexes_text(self):
+        self.env['ir.config_parameter'].sudo().set_param('ir_attachment.location', 'file')
+        attachment = self._create(b'<Invoice>Ornek fatura</Invoice>', mimetype='text/plain')
+        self.assertIn('Ornek fatura', attachment.index_content)
+        self.assertFalse(self._create(b'').file_size)
+
+    def test_database_storage(self):
+        self.env['ir.config_parameter'].sudo().set_param('ir_attachment.location', 'db')
+        attachment = self._create(b'<Invoice/>')
+        self.assertFalse(attachment.store_fname)
+        self.assertEqual(attachment.raw, b'<Invoice/>')
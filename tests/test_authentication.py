@@ -0,0 +1,85 @@
+import io
+from unittest.mock import patch
+
+from odoo.exceptions import UserError
+
+from .. import soap_transport
+from ..models.edevletintegration import EdevletAuthenticationError
+from .common import TEMPURI_NS, EdevletTestCommon, soap_result_list, taxpayer_records
+
+
+class FakeStreamedResponse:
+
+    def __init__(self, body):
+        self.raw = io.BytesIO(body)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.raw.close()
+
+
+def ticket_response(ticket):
+    return (
+        f'<s:Envelope xmlns:s="http://schemas.xmlsoap.org/soap/envelope/"><s:Body>'
+        f'<GetFormsAuthenticationTicketResponse xmlns="{TEMPURI_NS}">'
+        f'<GetFormsAuthenticationTicketResult>{ticket}</GetFormsAuthenticationTicketResult>'
+        f'</GetFormsAuthenticationTicketResponse></s:Body></s:Envelope>'
+    ).encode()
+
+
+class TestAuthentication(EdevletTestCommon):
+
+    def setUp(self):
+        super().setUp()
+        self.integration._invalidate_forms_authentication_ticket()
+
+    def test_rejected_ticket_logs_in_once_more(self):
+        tickets = []
+
+        def callback(ticket):
+            tickets.append(ticket)
+            if ticket == 'expired':
+                raise EdevletAuthenticationError('rejected')
+            return ticket
+
+        with patch.object(
+            type(self.integration), '_request_forms_authentication_ticket',
+            autospec=True, side_effect=['expired', 'fresh'],
+        ) as login:
+            self.assertEqual(self.integration._with_authentication_ticket(callback), 'fresh')
+        self.assertEqual(login.call_count, 2)
+        self.assertEqual(tickets, ['expired', 'fresh'])
+
+    def test_rejected_login_is_not_retried(self):
+        with patch.object(soap_transport, 'post', side_effect=soap_transport.SoapHTTPError(401, 'Unauthorized')) as post:
+            with self.assertRaises(UserError) as raised:
+                self.integration._with_authentication_ticket(lambda ticket: ticket)
+        self.assertNotIsInstance(raised.exception, EdevletAuthenticationError)
+        self.assertEqual(post.call_count, 1)
+
+    def test_service_errors_match_configured_fault_codes(self):
+        self.env['ir.config_parameter'].sudo().set_param('edevlet.auth_failure_error_codes', 'AUTH01, AUTH02')
+        message = 'Hata Kodu: %(code)s Açıklama: %(desc)s'
+        with self.assertRaises(EdevletAuthenticationError):
+            self.integration._raise_service_error(message, 'AUTH02', 'Oturum geçersiz')
+        with self.assertRaises(UserError) as raised:
+            self.integration._raise_service_error(message, 'E100', 'Ticket alanı boş olamaz')
+        self.assertNotIsInstance(raised.exception, EdevletAuthenticationError)
+
+    def test_expired_ticket_in_service_result_logs_in_again(self):
+        self.assertFalse(self.env['ir.config_parameter'].sudo().get_param('edevlet.auth_failure_error_codes'))
+        responses = [
+            ticket_response('expired'),
+            soap_result_list('GetTaxIdListbyDate', [], service_result='Failed', error_code='-1',
+                             description='Ticket süresi dolmuş, tekrar giriş yapınız.'),
+            ticket_response('fresh'),
+            soap_result_list('GetTaxIdListbyDate', taxpayer_records(2, start=700000)),
+        ]
+        with patch.object(
+            soap_transport, 'post', side_effect=[FakeStreamedResponse(body) for body in responses],
+        ) as post:
+            self.assertEqual(self.integration._import_taxpayer_list('2024-01-01'), 2)
+        self.assertEqual(post.call_count, 4)
+        self.assertIn('<tem:Ticket>fresh</tem:Ticket>', post.call_args.args[1])
@@ -0,0 +1,63 @@
+import importlib.util
+import os
+
+from odoo.addons.account.tests.common import AccountTestInvoicingCommon
+from odoo.tests import tagged
+
+from .. import ubl_codelist
+from ..models.account_move import PROFILE_TYPES
+
+MIGRATION_PATH = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'migrations', '18.0.1.4.0', 'pre-migrate.py')
+
+
+def load_migration():
+    spec = importlib.util.spec_from_file_location('edevlet_migration_18_0_1_4_0', MIGRATION_PATH)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+@tagged('post_install', '-at_install')
+class TestCodelist(AccountTestInvoicingCommon):
+
+    def test_selections_only_offer_listed_codes(self):
+        self.assertLessEqual({code for code, _label in PROFILE_TYPES}, ubl_codelist.get_codes(ubl_codelist.PROFILE_ID))
+        invoice_types = self.env['account.move']._fields['invoice_type_code']._description_selection(self.env)
+        self.assertEqual({code for code, _label in invoice_types}, ubl_codelist.get_codes(ubl_codelist.INVOICE_TYPE_CODE))
+        self.assertIn('TEVKIFAT', {code for code, _label in invoice_types})
+
+        tax_codes = {code for code, _label in self.env['account.tax.group']._fields['tax_code']._description_selection(self.env)}
+        self.assertIn('0015', tax_codes)
+        self.assertIn('603', tax_codes)
+
+    def test_migration_normalizes_stored_codes(self):
+        group = self.env['account.tax.group'].create({'name': 'KDV'})
+        other = self.env['account.tax.group'].create({'name': 'Tevkifat'})
+        move = self.init_invoice('out_invoice', products=self.product_a)
+        self.env.flush_all()
+        self.env.cr.execute(
+            "UPDATE account_tax_group SET tax_code = ' 15', tax_exemption_reason_code = '301 ' WHERE id = %s", (group.id,)
+        )
+        self.env.cr.execute(
+            "UPDATE account_tax_group SET tax_code = 'KDV', tax_exemption_reason_code = '999' WHERE id = %s", (other.id,)
+        )
+        self.env.cr.execute("UPDATE account_move SET profile_type = 'MIKROIHRACAT' WHERE id = %s", (move.id,))
+
+        load_migration().migrate(self.env.cr, '18.0.1.3.0')
+        self.env.invalidate_all()
+
+        self.assertEqual((group.tax_code, group.tax_exemption_reason_code), ('0015', '301'))
+        self.assertEqual((other.tax_code, other.tax_exemption_reason_code), (False, False))
+        self.assertEqual(move.profile_type, 'IHRACAT')
+
+    def test_migration_from_before_the_exemption_code(self):
+        group = self.env['account.tax.group'].create({'name': 'KDV'})
+        self.env.flush_all()
+        # Upgrading from 18.0.1.0.0: the column is only created later in the update.
+        self.env.cr.execute("ALTER TABLE account_tax_group DROP COLUMN tax_exemption_reason_code")
+        self.env.cr.execute("UPDATE account_tax_group SET tax_code = '15' WHERE id = %s", (group.id,))
+
+        load_migration().migrate(self.env.cr, '18.0.1.0.0')
+
+        self.env.cr.execute("SELECT tax_code FROM account_tax_group WHERE id = %s", (group.id,))
+        self.assertEqual(self.env.cr.fetchone()[0], '0015')
@@ -0,0 +1,79 @@
+from psycopg2 import IntegrityError
+
+from odoo.tools import mute_logger
+
+from .common import EdevletTestCommon
+
+
+class TestCompanyImport(EdevletTestCommon):
+
+    def _values(self, tax_no, alias, name='Firma', alias_creation_date='2020-01-01 00:00:00'):
+        return {
+            'tax_no': tax_no,
+            'alias': alias,
+            'type': 'Ozel',
+            'company_fullname': name,
+            'register_date': '2019-01-01 00:00:00',
+            'alias_creation_date': alias_creation_date,
+            'einvoice_type': 1,
+        }
+
+    def _rows(self, tax_no):
+        return self.env['einvoice.company.import'].search([('tax_no', '=', tax_no)], order='id')
+
+    def test_bulk_upsert_matches_on_tax_no_and_alias(self):
+        self.integration._bulk_upsert_taxpayer_values([
+            self._values('1111111111', 'urn:mail:defaultpk@a.com', name='First'),
+            self._values('1111111111', False, name='Without alias'),
+        ])
+        rows = self._rows('1111111111')
+        self.assertEqual(len(rows), 2)
+
+        # Same keys again, a missing alias stands for the same row as before.
+        count = self.integration._bulk_upsert_taxpayer_values([
+            self._values('1111111111', 'urn:mail:defaultpk@a.com', name='Renamed'),
+            self._values('1111111111', False, name='Still without alias'),
+            self._values('1111111111', 'urn:mail:otherpk@a.com', name='New alias'),
+        ])
+        self.assertEqual(count, 3)
+        rows = self._rows('1111111111')
+        self.assertEqual(len(rows), 3)
+        by_alias = {row.alias: row.company_fullname for row in rows}
+        self.assertEqual(by_alias, {
+            'urn:mail:defaultpk@a.com': 'Renamed',
+            False: 'Still without alias',
+            'urn:mail:otherpk@a.com': 'New alias',
+        })
+
+    def test_bulk_upsert_keeps_last_duplicate_of_a_chunk(self):
+        count = self.integration._bulk_upsert_taxpayer_values([
+            self._values('2222222222', 'urn:mail:defaultpk@b.com', name='Old'),
+            self._values('2222222222', 'urn:mail:defaultpk@b.com', name='New'),
+        ])
+        self.assertEqual(count, 1)
+        self.assertEqual(self._rows('2222222222').company_fullname, 'New')
+
+    def test_unique_index_rejects_duplicate_rows(self):
+        CompanyImport = self.env['einvoice.company.import']
+        CompanyImport.create({'tax_no': '3333333333', 'alias': False})
+        with mute_logger('odoo.sql_db'), self.assertRaises(IntegrityError), self.cr.savepoint():
+            CompanyImport.create({'tax_no': '3333333333', 'alias': ''})
+            CompanyImport.flush_model()
+
+    def test_lookup_taxpayer(self):
+        self.integration._bulk_upsert_taxpayer_values([
+            self._values('4444444444', 'urn:mail:oldpk@d.com', alias_creation_date='2018-01-01 00:00:00'),
+            self._values('4444444444', 'urn:mail:newpk@d.com', alias_creation_date='2022-01-01 00:00:00'),
+            self._values('5555555555', 'urn:mail:defaultpk@e.com'),
+        ])
+        CompanyImport = self.env['einvoice.company.import']
+        self.assertEqual(
+            CompanyImport.lookup_taxpayer(' 4444444444 ').mapped('alias'),
+            ['urn:mail:newpk@d.com', 'urn:mail:oldpk@d.com'],
+        )
+        self.assertEqual(
+            set(CompanyImport.lookup_taxpayer(['4444444444', '5555555555', '']).mapped('tax_no')),
+            {'4444444444', '5555555555'},
+        )
+        self.assertFalse(CompanyImport.lookup_taxpayer(''))
+        self.assertFalse(CompanyImport.lookup_taxpayer(['   ']))
@@ -0,0 +1,69 @@
+import io
+
+from lxml import etree
+
+from .. import ubl_envelope, ubl_validation
+from .common import EdevletTestCommon
+
+SBDH = f'{{{ubl_envelope.SBDH_NS}}}'
+INVOICE = b'''<?xml version="1.0" encoding="utf-8"?>
+<Invoice xmlns="urn:oasis:names:specification:ubl:schema:xsd:Invoice-2"/>'''
+
+
+class TestEnvelope(EdevletTestCommon):
+
+    def _header(self):
+        return {
+            'instance_identifier': '6c3d2f8e-0000-4000-8000-000000000001',
+            'creation_datetime': '2024-05-01T10:00:00',
+            'sender': {'identifier': 'urn:mail:defaultgb@satici.com.tr', 'name': 'Satıcı A.Ş.', 'tax_id': '1234567890'},
+            'receiver': {'identifier': 'urn:mail:defaultpk@alici.com.tr', 'name': 'Alıcı A.Ş.', 'tax_id': '9876543210'},
+        }
+
+    def test_envelope_passes_the_schematron_header_rules(self):
+        buffer = io.BytesIO()
+        ubl_envelope.write_envelope(buffer, self._header(), [INVOICE, INVOICE])
+        envelope = buffer.getvalue()
+
+        root = etree.fromstring(envelope)
+        self.assertEqual(root.findtext(f'{SBDH}StandardBusinessDocumentHeader/{SBDH}DocumentIdentification/{SBDH}TypeVersion'), '1.2')
+        self.assertEqual(root.findtext('.//ElementCount'), '2')
+        self.assertEqual(len(root.find('.//ElementList')), 2)
+
+        # The embedded documents are placeholders; only the envelope rules matter here.
+        issues = [
+            issue for issue in ubl_validation.validate_document(envelope)
+            if '/ElementList/' not in issue.location
+        ]
+        self.assertEqual(issues, [])
+
+    def test_receiver_alias_rule(self):
+        self.integration._bulk_upsert_taxpayer_values([
+            {
+                'tax_no': tax_no, 'alias': alias, 'type': 'Ozel', 'company_fullname': 'Firma',
+                'register_date': '2019-01-01 00:00:00', 'alias_creation_date': created, 'einvoice_type': 1,
+            }
+            for tax_no, alias, created in (
+                ('7777777777', 'urn:mail:defaultgb@a.com', '2024-01-01 00:00:00'),
+                ('7777777777', 'urn:mail:satispk@a.com', '2023-01-01 00:00:00'),
+                ('7777777777', 'urn:mail:defaultpk@a.com', '2020-01-01 00:00:00'),
+                ('8888888888', 'urn:mail:eskipk@b.com', '2019-01-01 00:00:00'),
+                ('8888888888', 'urn:mail:yenipk@b.com', '2022-01-01 00:00:00'),
+                # An alias without a creation date never outranks a dated one.
+                ('8888888888', 'urn:mail:tarihsizpk@b.com', None),
+                ('9999999999', 'urn:mail:defaultgb@c.com', '2022-01-01 00:00:00'),
+            )
+        ])
+        Partner = self.env['res.partner']
+        with_default = Partner.create({'name': 'A', 'vat': '7777777777'})
+        newest = Partner.create({'name': 'B', 'vergi_no': ' 8888888888 '})
+        sender_only = Partner.create({'name': 'C', 'vat': '9999999999'})
+        unknown = Partner.create({'name': 'D'})
+
+        aliases = self.env['einvoice.send.queue']._get_partner_receiver_aliases(with_default | newest | sender_only | unknown)
+        self.assertEqual(aliases, {
+            with_default.id: 'urn:mail:defaultpk@a.com',
+            newest.id: 'urn:mail:yenipk@b.com',
+            sender_only.id: None,
+            unknown.id: None,
+        })
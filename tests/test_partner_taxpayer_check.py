@@ -0,0 +1,94 @@
+from datetime import datetime
+from unittest.mock import patch
+
+from freezegun import freeze_time
+
+from .common import EdevletTestCommon
+
+
+def _fake_results(integration, tax_ids):
+    results = {}
+    for tax_id in tax_ids:
+        if tax_id == '2222222222':
+            results[tax_id] = {'summary': 'SOAP bağlantı hatası', 'status': False, 'error': True}
+        else:
+            results[tax_id] = {'summary': f'{tax_id} | Firma | - | Durum: Var', 'status': 'mukellef'}
+    return results
+
+
+class TestPartnerTaxpayerCheck(EdevletTestCommon):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        Partner = cls.env['res.partner']
+        cls.taxpayer = Partner.create({'name': 'Mükellef', 'vat': '1111111111'})
+        cls.same_tax_id = Partner.create({'name': 'Aynı VKN', 'vergi_no': ' 1111111111 '})
+        cls.failing = Partner.create({
+            'name': 'Hatalı',
+            'vergi_no': '2222222222',
+            'taxpayer_status': 'non_mukellef',
+        })
+        cls.blank = Partner.create({'name': 'Boş', 'vat': '   '})
+
+    def _run_cron(self):
+        return self._run_cron_with_limit(None)
+
+    def _run_cron_with_limit(self, limit):
+        with patch.object(
+            type(self.integration), '_resolve_customer_tax_ids', autospec=True, side_effect=_fake_results,
+        ) as resolve:
+            self.env['res.partner']._cron_check_customer_tax_ids(limit=limit)
+        return resolve
+
+    def test_cron_writes_results_per_tax_id(self):
+        resolve = self._run_cron()
+        tax_ids = resolve.call_args.args[1]
+        self.assertEqual(tax_ids.count('1111111111'), 1)
+        self.assertNotIn('', tax_ids)
+
+        for partner in self.taxpayer | self.same_tax_id:
+            self.assertEqual(partner.taxpayer_status, 'mukellef')
+            self.assertTrue(partner.taxpayer_check_date)
+
+    def test_failed_lookup_keeps_status_and_check_date(self):
+        self._run_cron()
+        self.assertEqual(self.failing.taxpayer_status, 'non_mukellef')
+        self.assertEqual(self.failing.taxpayer_check_result, 'SOAP bağlantı hatası')
+        self.assertFalse(self.failing.taxpayer_check_date)
+
+    def test_failed_lookup_backs_off(self):
+        with freeze_time('2024-05-01 10:00:00'):
+            self._run_cron()
+            self.assertEqual(self.failing.taxpayer_check_failure_count, 1)
+            self.assertEqual(self.failing.taxpayer_check_retry_date, datetime(2024, 5, 1, 11, 0, 0))
+
+            # Not retried before its retry date, so it cannot hold the head of the batch.
+            self.assertNotIn('2222222222', self._run_cron().call_args.args[1])
+
+        with freeze_time('2024-05-01 11:00:00'):
+            self.assertIn('2222222222', self._run_cron().call_args.args[1])
+            self.assertEqual(self.failing.taxpayer_check_failure_count, 2)
+            self.assertEqual(self.failing.taxpayer_check_retry_date, datetime(2024, 5, 1, 13, 0, 0))
+
+        # Never checked partners go before failed ones that are due again.
+        never_checked = self.env['res.partner'].create({'name': 'Yeni', 'vat': '3333333333'})
+        with freeze_time('2024-05-01 14:00:00'):
+            resolve = self._run_cron_with_limit(1)
+        self.assertEqual(resolve.call_args.args[1], ['3333333333'])
+        self.assertEqual(never_checked.taxpayer_status, 'mukellef')
+        self.assertEqual(self.failing.taxpayer_check_failure_count, 2)
+
+    def test_blank_tax_ids_are_stamped(self):
+        self._run_cron()
+        self.assertTrue(self.blank.taxpayer_check_date)
+        self.assertFalse(self.blank.taxpayer_status)
+
+        # Stamped partners are not picked up again until they are due.
+        resolve = self._run_cron()
+        self.assertNotIn('1111111111', resolve.call_args.args[1])
+
+    def test_invalid_recheck_days_falls_back_to_default(self):
+        self.env['ir.config_parameter'].sudo().set_param('edevlet.taxpayer_recheck_days', 'otuz')
+        self._run_cron()
+        self.assertEqual(self.taxpayer.taxpayer_status, 'mukellef')
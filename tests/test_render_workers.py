@@ -0,0 +1,55 @@
+import base64
+import io
+import zipfile
+
+from odoo.addons.account.tests.common import AccountTestInvoicingCommon
+from odoo.tests import tagged
+
+from .. import ubl_renderer
+from .common import create_integration
+
+XSLT = b'<xsl:stylesheet version="1.0" xmlns:xsl="http://www.w3.org/1999/XSL/Transform"/>'
+
+
+@tagged('post_install', '-at_install')
+class TestRenderWorkers(AccountTestInvoicingCommon):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.integration = create_integration(
+            cls.env, xslt_file=base64.b64encode(XSLT), xslt_file_name='fatura.xslt',
+        )
+        cls.moves = cls.env['account.move'].concat(*(
+            cls.init_invoice('out_invoice', products=cls.product_a + cls.product_b, amounts=[index + 10.0], post=True)
+            for index in range(5)
+        ))
+
+    def _snapshots(self):
+        return [
+            move._prepare_invoice_xml_snapshot(integration=self.integration, document_uuid=f'uuid-{move.id}')
+            for move in self.moves
+        ]
+
+    def test_workers_render_the_serial_bytes(self):
+        snapshots = self._snapshots()
+        serial = ubl_renderer.render_invoices(snapshots)
+        self.assertEqual(len(serial), len(self.moves))
+        self.assertIn(base64.b64encode(XSLT), serial[0])
+        for workers in (2, 3):
+            self.assertEqual(ubl_renderer.render_invoices(snapshots, workers=workers), serial)
+
+    def test_worker_errors_are_reported(self):
+        snapshots = self._snapshots()
+        snapshots[0]['template_path'] = '/nonexistent/ornek_xml.xml'
+        with self.assertRaisesRegex(ubl_renderer.RenderWorkerError, 'FileNotFoundError'):
+            ubl_renderer.render_invoices(snapshots, workers=2)
+
+    def test_zip_download_uses_the_workers(self):
+        self.env['ir.config_parameter'].sudo().set_param('edevlet.xml_render_workers', '2')
+        action = self.moves.action_download_invoice_xml_zip()
+        attachment = self.env['ir.attachment'].browse(int(action['url'].split('/')[3].split('?')[0]))
+        with zipfile.ZipFile(io.BytesIO(attachment.raw)) as archive:
+            self.assertEqual(len(archive.namelist()), len(self.moves))
+            for name in archive.namelist():
+                self.assertTrue(archive.read(name).startswith(b"<?xml version='1.0' encoding='utf-8'?>"))
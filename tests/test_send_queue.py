@@ -0,0 +1,114 @@
+from datetime import datetime, timedelta
+
+from freezegun import freeze_time
+
+from odoo import SUPERUSER_ID, api, fields, sql_db
+from odoo.addons.account.tests.common import AccountTestInvoicingCommon
+from odoo.tests import TransactionCase, tagged
+
+from .common import create_integration
+
+
+@tagged('post_install', '-at_install')
+class TestSendQueue(AccountTestInvoicingCommon):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.integration = create_integration(cls.env, document_service_url='https://gib.example.com/EFatura')
+        cls.Queue = cls.env['einvoice.send.queue']
+        cls.env['ir.config_parameter'].sudo().set_param('edevlet.send_queue_max_attempts', '4')
+        cls.env['ir.config_parameter'].sudo().set_param('edevlet.send_queue_backoff_seconds', '60')
+
+    def _entry(self, **values):
+        return self.Queue.create({
+            'move_id': self.init_invoice('out_invoice', products=self.product_a, post=True).id,
+            'integration_id': self.integration.id,
+            **values,
+        })
+
+    @freeze_time('2024-05-01 10:00:00')
+    def test_claim_takes_due_pending_entries_in_order(self):
+        self.Queue.search([]).write({'state': 'sent'})
+        now = datetime(2024, 5, 1, 10, 0, 0)
+        later_due = self._entry(next_attempt_date=now - timedelta(minutes=1))
+        first_due = self._entry(next_attempt_date=now - timedelta(minutes=5))
+        not_due = self._entry(next_attempt_date=now + timedelta(minutes=1))
+        self._entry(state='failed', next_attempt_date=now - timedelta(hours=1))
+
+        self.assertEqual(self.Queue._claim_due_entries(1), first_due)
+        self.assertEqual(self.Queue._claim_due_entries(10).ids, [later_due.id])
+        self.assertEqual((first_due | later_due).mapped('state'), ['sending', 'sending'])
+        self.assertEqual(first_due.next_attempt_date, now + timedelta(minutes=30))
+        self.assertFalse(self.Queue._claim_due_entries(10))
+
+        # The lease of a killed worker expires and the entry is claimed again.
+        with freeze_time('2024-05-01 10:31:00'):
+            self.assertEqual(self.Queue._claim_due_entries(10), not_due | first_due | later_due)
+
+    @freeze_time('2024-05-01 10:00:00')
+    def test_failed_attempts_back_off_until_the_limit(self):
+        entry = self._entry()
+        now = datetime(2024, 5, 1, 10, 0, 0)
+        for attempt, delay in ((1, 60), (2, 120), (3, 240)):
+            values = entry._register_attempt(error='Bağlantı hatası', error_code='500')
+            self.assertFalse(values['is_succesfull'])
+            self.assertEqual((entry.state, entry.attempt_count), ('pending', attempt))
+            entry.state = 'sending'
+            self.assertEqual(entry.next_attempt_date, now + timedelta(seconds=delay))
+
+        entry._register_attempt(error='Bağlantı hatası')
+        self.assertEqual((entry.state, entry.attempt_count), ('failed', 4))
+        self.assertEqual(entry.last_error, 'Bağlantı hatası')
+
+        entry.action_retry()
+        self.assertEqual((entry.state, entry.attempt_count), ('pending', 0))
+        entry._register_attempt(message='Başarılı', response_hash='abc')
+        self.assertEqual(entry.state, 'sent')
+        self.assertFalse(entry.last_error)
+
+    def test_non_retryable_error_fails_at_once(self):
+        entry = self._entry()
+        entry._register_attempt(error='Geçersiz belge', retry=False)
+        self.assertEqual((entry.state, entry.attempt_count), ('failed', 1))
+
+
+class TestSendQueueParallelClaims(TransactionCase):
+    """Two cron workers claiming entries at the same time, each on its own connection."""
+
+    def _worker_env(self):
+        cr = sql_db.db_connect(self.env.cr.dbname).cursor()
+        self.addCleanup(cr.close)
+        return api.Environment(cr, SUPERUSER_ID, {})
+
+    def test_parallel_claims_skip_locked_entries(self):
+        # The entries must be committed to be seen by both connections.
+        setup_env = self._worker_env()
+        journal = setup_env['account.journal'].create({'name': 'E-Fatura Kuyruk Testi', 'code': 'EFQT', 'type': 'general'})
+        move = setup_env['account.move'].create({'move_type': 'entry', 'journal_id': journal.id})
+        due = fields.Datetime.now() - timedelta(minutes=1)
+        entries = setup_env['einvoice.send.queue'].create([{'move_id': move.id, 'next_attempt_date': due}] * 4)
+        setup_env.cr.commit()
+
+        def cleanup():
+            move.unlink()
+            journal.unlink()
+            setup_env.cr.commit()
+        self.addCleanup(cleanup)
+
+        first_worker = self._worker_env()
+        second_worker = self._worker_env()
+        # Without SKIP LOCKED the second claim would wait for the first transaction.
+        second_worker.cr.execute("SET lock_timeout = '5s'")
+        first = first_worker['einvoice.send.queue']._claim_due_entries(2)
+        second = second_worker['einvoice.send.queue']._claim_due_entries(2)
+        self.assertEqual((len(first), len(second)), (2, 2))
+        self.assertFalse(set(first.ids) & set(second.ids))
+        self.assertEqual(set(first.ids) | set(second.ids), set(entries.ids))
+
+        first_worker.cr.commit()
+        second_worker.cr.commit()
+        entries.invalidate_recordset()
+        self.assertEqual(entries.mapped('state'), ['sending'] * 4)
+        # Committed claims are leased and not handed out again.
+        self.assertFalse(set(self._worker_env()['einvoice.send.queue']._claim_due_entries(10).ids) & set(entries.ids))
@@ -0,0 +1,31 @@
+from odoo.tools import mute_logger
+
+from .. import soap_transport
+from .common import EdevletTestCommon
+
+
+class TestSoapTransportOptions(EdevletTestCommon):
+
+    def test_parameters_are_parsed_by_type(self):
+        set_param = self.env['ir.config_parameter'].sudo().set_param
+        set_param('edevlet.soap_connect_timeout', '2.5')
+        set_param('edevlet.soap_read_timeout', '90')
+        set_param('edevlet.soap_pool_size', '4')
+        self.assertEqual(self.integration._get_soap_transport_options(), {
+            'connect_timeout': 2.5,
+            'read_timeout': 90.0,
+            'pool_size': 4,
+        })
+
+    def test_invalid_parameters_fall_back_to_defaults(self):
+        set_param = self.env['ir.config_parameter'].sudo().set_param
+        set_param('edevlet.soap_connect_timeout', 'abc')
+        set_param('edevlet.soap_read_timeout', '-1')
+        set_param('edevlet.soap_pool_size', '2.5')
+        with mute_logger('odoo.addons.' + self.integration._module + '.models.edevletintegration'):
+            options = self.integration._get_soap_transport_options()
+        self.assertEqual(options, {
+            'connect_timeout': soap_transport.DEFAULT_CONNECT_TIMEOUT,
+            'read_timeout': soap_transport.DEFAULT_READ_TIMEOUT,
+            'pool_size': soap_transport.DEFAULT_POOL_SIZE,
+        })
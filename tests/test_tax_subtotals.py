@@ -0,0 +1,49 @@
+from odoo.tests import TransactionCase
+
+from .. import ubl_renderer
+from ..ubl_renderer import InvoiceLineSnapshot, TaxSnapshot
+
+
+def _line(taxes, withholding_taxes=()):
+    return InvoiceLineSnapshot(
+        note='', quantity=1.0, unit_code='C62', price_subtotal=taxes[0].taxable_amount,
+        base_amount=taxes[0].taxable_amount, discount_amount=0.0, taxes=tuple(taxes),
+        withholding_taxes=tuple(withholding_taxes), description='', item_name='', price_unit=0.0,
+    )
+
+
+class TestTaxSubtotals(TransactionCase):
+
+    def test_every_tax_of_a_line_is_grouped(self):
+        lines = [
+            _line([
+                TaxSnapshot(20.0, 'KDV', '0015', False, False, 100.0, 20.0),
+                TaxSnapshot(10.0, 'ÖTV', '0071', False, False, 100.0, 10.0),
+            ]),
+            _line([TaxSnapshot(20.0, 'KDV', '0015', False, False, 50.0, 10.0)]),
+        ]
+        groups = ubl_renderer.group_tax_subtotals(lines)
+        self.assertEqual(
+            [(group.code, group.taxable_amount, group.amount) for group in groups],
+            [('0015', 150.0, 30.0), ('0071', 100.0, 10.0)],
+        )
+
+    def test_withholdings_are_grouped_separately(self):
+        withholding = TaxSnapshot(70, 'KDV TEVKIFAT', '603', False, False, 20.0, 14.0)
+        lines = [
+            _line([TaxSnapshot(20.0, 'KDV', '0015', False, False, 100.0, 20.0)], [withholding]),
+            _line([TaxSnapshot(20.0, 'KDV', '0015', False, False, 100.0, 20.0)], [withholding]),
+        ]
+        self.assertEqual(len(ubl_renderer.group_tax_subtotals(lines)), 1)
+        withholdings = ubl_renderer.group_tax_subtotals(lines, 'withholding_taxes')
+        self.assertEqual([(group.code, group.taxable_amount, group.amount) for group in withholdings], [('603', 40.0, 28.0)])
+        self.assertEqual(lines[0].withholding_amount, 14.0)
+
+    def test_rounding_difference_goes_to_the_largest_group(self):
+        groups = [
+            TaxSnapshot(20.0, 'KDV', '0015', False, False, 100.0, 20.0),
+            TaxSnapshot(10.0, 'KDV', '0015', False, False, 10.0, 1.0),
+        ]
+        reconciled = ubl_renderer.reconcile_tax_amounts(groups, 21.01, 2)
+        self.assertEqual([group.amount for group in reconciled], [20.01, 1.0])
+        self.assertIs(ubl_renderer.reconcile_tax_amounts(groups, 21.0, 2), groups)
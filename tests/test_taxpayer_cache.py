@@ -0,0 +1,22 @@
+from unittest.mock import patch
+
+from .common import EdevletTestCommon
+
+
+class TestTaxpayerCache(EdevletTestCommon):
+
+    def _resolve(self, tax_id, answer):
+        Integration = type(self.integration)
+        with patch.object(Integration, '_with_authentication_ticket', autospec=True, return_value=answer) as remote:
+            result = self.integration._resolve_customer_tax_id(tax_id)
+        return result, remote.call_count
+
+    def test_only_positive_answers_are_cached(self):
+        self.env['ir.config_parameter'].sudo().set_param('edevlet.taxpayer_cache_ttl_hours', '24')
+        not_found = {'summary': 'Sorgu başarılı fakat kayıt bulunamadı.', 'status': False}
+        self.assertEqual(self._resolve('6666666666', not_found), (not_found, 1))
+        self.assertEqual(self._resolve('6666666666', not_found), (not_found, 1))
+
+        found = {'summary': '6666666666 | Firma | - | Durum: Var', 'status': 'mukellef'}
+        self.assertEqual(self._resolve('6666666666', found), (found, 1))
+        self.assertEqual(self._resolve('6666666666', not_found), (found, 0))
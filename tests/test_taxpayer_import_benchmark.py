@@ -0,0 +1,62 @@
+import logging
+import os
+import resource
+import tempfile
+import time
+
+from odoo.tests import tagged
+
+from .. import soap_response
+from .common import EdevletTestCommon, taxpayer_records, write_soap_result_list
+
+_logger = logging.getLogger(__name__)
+
+BENCHMARK_ROWS = int(os.environ.get('EDEVLET_BENCHMARK_ROWS', 1000000))
+
+
+@tagged('-standard', 'edevlet_benchmark', 'post_install', '-at_install')
+class TestTaxpayerImportBenchmark(EdevletTestCommon):
+    """Time the streaming taxpayer import on a synthetic GetTaxIdListbyDate response.
+
+    Not part of the standard suite; run it with ``--test-tags edevlet_benchmark``
+    (``EDEVLET_BENCHMARK_ROWS`` changes the size, 1M rows by default).
+    """
+
+    def _log_rate(self, label, rows, started):
+        elapsed = time.monotonic() - started
+        _logger.info(
+            'Taxpayer %s benchmark: %s rows in %.1fs (%.0f rows/s), peak RSS %.0f MB',
+            label, rows, elapsed, rows / elapsed if elapsed else rows,
+            resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+        )
+
+    def _run_import(self, response):
+        response.seek(0)
+        started = time.monotonic()
+        imported = self.integration._upsert_taxpayers_from_xml_stream(response)
+        self._log_rate('import', imported, started)
+        return imported
+
+    def test_parse_synthetic_taxpayer_list(self):
+        # The lxml reader and the record values alone, without database writes.
+        with tempfile.TemporaryFile() as response:
+            write_soap_result_list(response, 'GetTaxIdListbyDate', taxpayer_records(BENCHMARK_ROWS))
+            response.seek(0)
+            started = time.monotonic()
+            parsed = sum(
+                1 for node in soap_response.SoapResponseReader(response, 'EInvoiceCustomerResult')
+                if self.integration._prepare_taxpayer_values(node, 1)
+            )
+            self._log_rate('parse', parsed, started)
+        self.assertEqual(parsed, BENCHMARK_ROWS)
+
+    def test_import_synthetic_taxpayer_list(self):
+        with tempfile.TemporaryFile() as response:
+            write_soap_result_list(response, 'GetTaxIdListbyDate', taxpayer_records(BENCHMARK_ROWS))
+            # First pass inserts every row, the second one updates them in place.
+            self.assertEqual(self._run_import(response), BENCHMARK_ROWS)
+            self.assertEqual(self._run_import(response), BENCHMARK_ROWS)
+        self.assertEqual(
+            self.env['einvoice.company.import'].search_count([('alias', '=like', 'urn:mail:defaultpk@firma%')]),
+            BENCHMARK_ROWS,
+        )
@@ -0,0 +1,74 @@
+import io
+from datetime import timedelta
+from unittest.mock import patch
+
+from odoo import fields
+from odoo.exceptions import UserError
+
+from .common import EdevletTestCommon, soap_result_list, taxpayer_records
+
+
+class TestTaxpayerImportResume(EdevletTestCommon):
+
+    def _company_name(self, index):
+        return self.env['einvoice.company.import'].search([('tax_no', '=', f'{index:010d}')]).company_fullname
+
+    def test_resume_skips_rows_written_by_the_run(self):
+        self.integration._upsert_taxpayers_from_xml_stream(
+            io.BytesIO(soap_result_list('GetTaxIdListbyDate', taxpayer_records(2, start=900000)))
+        )
+        self.env.cr.execute(
+            "UPDATE einvoice_company_import SET company_fullname = 'Bu aktarımda yazıldı' WHERE tax_no = %s",
+            [f'{900000:010d}'],
+        )
+        self.env.cr.execute(
+            "UPDATE einvoice_company_import SET company_fullname = 'Eski', write_date = '2020-01-01' WHERE tax_no = %s",
+            [f'{900001:010d}'],
+        )
+        self.env['einvoice.company.import'].invalidate_model()
+        # The interrupted run started a minute ago and committed one row.
+        self.integration.write({
+            'taxpayer_import_state': 'running',
+            'taxpayer_import_run_date': self.env.cr.now() - timedelta(minutes=1),
+            'taxpayer_import_count': 1,
+        })
+
+        Integration = type(self.integration)
+        with patch.object(
+            Integration, '_save_taxpayer_import_checkpoint', autospec=True,
+            side_effect=lambda integration, count: integration.write({'taxpayer_import_count': count}),
+        ):
+            # The list comes back in another order; positions do not matter.
+            records = list(taxpayer_records(3, start=900000))[::-1]
+            imported = self.integration._upsert_taxpayers_from_xml_stream(
+                io.BytesIO(soap_result_list('GetTaxIdListbyDate', records)), checkpoint=True,
+            )
+
+        self.assertEqual(imported, 3)
+        self.assertEqual(self.integration.taxpayer_import_count, 3)
+        self.assertEqual(self._company_name(900000), 'Bu aktarımda yazıldı')
+        self.assertEqual(self._company_name(900001), 'Ornek Ticaret ve Sanayi A.S. 900001')
+        self.assertEqual(self._company_name(900002), 'Ornek Ticaret ve Sanayi A.S. 900002')
+
+    def test_cron_only_takes_over_stale_running_imports(self):
+        self.env['ir.config_parameter'].sudo().set_param('edevlet.taxpayer_import_stale_minutes', '30')
+        self.env['edevlet.integration'].search([('id', '!=', self.integration.id)]).write({'taxpayer_import_state': 'idle'})
+        self.integration.write({
+            'taxpayer_import_state': 'running',
+            'taxpayer_import_checkpoint_date': fields.Datetime.now() - timedelta(minutes=5),
+        })
+        Integration = type(self.integration)
+        with patch.object(Integration, '_run_taxpayer_import', autospec=True) as run, \
+                patch.object(type(self.env['ir.cron']), '_notify_progress', autospec=True):
+            self.env['edevlet.integration']._cron_import_taxpayer_list()
+            self.assertFalse(run.called)
+            with self.assertRaises(UserError):
+                self.integration.action_import_all_taxpayer_list()
+
+            self.integration.taxpayer_import_checkpoint_date = fields.Datetime.now() - timedelta(hours=1)
+            self.env['edevlet.integration']._cron_import_taxpayer_list()
+            self.assertEqual(run.call_count, 1)
+            self.assertEqual(run.call_args.args[0], self.integration)
+
+            self.integration.action_import_all_taxpayer_list()
+            self.assertEqual(self.integration.taxpayer_import_state, 'queued')
@@ -0,0 +1,52 @@
+from odoo.addons.account.tests.common import AccountTestInvoicingCommon
+from odoo.exceptions import ValidationError
+from odoo.tests import tagged
+
+
+@tagged('post_install', '-at_install')
+class TestWithholdingInvoice(AccountTestInvoicingCommon):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        TaxGroup = cls.env['account.tax.group']
+        cls.vat = cls.env['account.tax'].create({
+            'name': 'KDV %20',
+            'amount': 20.0,
+            'tax_group_id': TaxGroup.create({'name': 'KDV', 'tax_code': '0015'}).id,
+        })
+        cls.withholding = cls.env['account.tax'].create({
+            'name': 'KDV Tevkifatı 7/10',
+            'amount': -14.0,
+            'tax_group_id': TaxGroup.create({'name': 'Tevkifat', 'tax_code': '603'}).id,
+        })
+
+    def _invoice(self, invoice_type_code, taxes, discount=0.0):
+        move = self.init_invoice('out_invoice', products=self.product_a, taxes=taxes)
+        move.invoice_type_code = invoice_type_code
+        move.invoice_line_ids.write({'price_unit': 100.0, 'discount': discount})
+        return move
+
+    def test_withholding_needs_a_withholding_invoice_type(self):
+        move = self._invoice('SATIS', self.vat + self.withholding)
+        with self.assertRaisesRegex(ValidationError, "Uyumsuz fatura tipi: 'SATIS'"):
+            move.action_post()
+
+        move.invoice_type_code = 'TEVKIFAT'
+        move.action_post()
+        self.assertEqual(move.state, 'posted')
+
+        plain = self._invoice('SATIS', self.vat)
+        plain.action_post()
+        self.assertEqual(plain.state, 'posted')
+
+    def test_taxes_use_the_discounted_line_subtotal(self):
+        move = self._invoice('TEVKIFAT', self.vat + self.withholding, discount=10.0)
+        line = move.invoice_line_ids
+        taxes, withholding_taxes = move._prepare_ubl_line_taxes(line, move.currency_id.round, {})
+        self.assertEqual(line.price_subtotal, 90.0)
+        self.assertEqual([(tax.code, tax.taxable_amount, tax.amount) for tax in taxes], [('0015', 90.0, 18.0)])
+        self.assertEqual(
+            [(tax.code, tax.percent, tax.taxable_amount, tax.amount) for tax in withholding_taxes],
+            [('603', 70, 18.0, 12.6)],
+        )
@@ -0,0 +1,65 @@
+"""Code lists of the GİB UBL-TR schematron as in-memory indexes.
+
+``UBL-TR_Codelist.xml`` declares every code list as a ``sch:let`` whose value
+is a comma separated XPath string literal (``',SATIS,IADE,'``). The file is
+parsed once per process into frozensets, so checking a generated code is a
+set lookup and the same index can feed selection fields.
+"""
+
+import os
+import threading
+
+from lxml import etree
+
+CODELIST_PATH = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), 'e-FaturaPaketi', 'schematron', 'UBL-TR_Codelist.xml'
+)
+SCHEMATRON_NS = 'http://purl.oclc.org/dsdl/schematron'
+
+PROFILE_ID = 'ProfileIDType'
+INVOICE_TYPE_CODE = 'InvoiceTypeCodeList'
+CURRENCY_CODE = 'CurrencyCodeList'
+UNIT_CODE = 'UnitCodeList'
+TAX_TYPE = 'TaxType'
+WITHHOLDING_TAX_TYPE = 'WithholdingTaxType'
+TAX_EXEMPTION_REASON_CODE = 'TaxExemptionReasonCodeType'
+
+# code list path -> {list name: frozenset of codes}
+_codelists = {}
+_codelists_lock = threading.Lock()
+
+
+def parse_codelists(path=CODELIST_PATH):
+    """Parse the ``sch:let`` code lists of ``path`` into ``{name: frozenset}``."""
+    codelists = {}
+    for node in etree.parse(path).getroot().iter(f'{{{SCHEMATRON_NS}}}let'):
+        value = (node.get('value') or '').strip()
+        if len(value) < 2 or value[0] != value[-1] or value[0] not in '\'"':
+            # Not a string literal (an XPath expression), nothing to index.
+            continue
+        codelists[node.get('name')] = frozenset(code for code in value[1:-1].split(',') if code)
+    return codelists
+
+
+def load_codelists(path=CODELIST_PATH):
+    """Return the code lists of ``path``, parsing the file at most once per process."""
+    codelists = _codelists.get(path)
+    if codelists is not None:
+        return codelists
+    codelists = parse_codelists(path)
+    with _codelists_lock:
+        return _codelists.setdefault(path, codelists)
+
+
+def get_codes(name, path=CODELIST_PATH):
+    """Return the frozenset of codes of the list ``name`` (empty for an unknown list)."""
+    return load_codelists(path).get(name, frozenset())
+
+
+def is_valid_code(name, code, path=CODELIST_PATH):
+    return code in get_codes(name, path)
+
+
+def selection(name, path=CODELIST_PATH):
+    """Return the codes of ``name`` as a sorted ``fields.Selection`` list."""
+    return [(code, code) for code in sorted(get_codes(name, path))]
@@ -0,0 +1,127 @@
+"""GİB ``sh:StandardBusinessDocument`` envelopes (ZARF) carrying many UBL documents.
+
+One envelope lists up to ``max_count`` documents of the same receiver in its
+``ElementList``, so a bulk issuance needs a few large uploads instead of one
+request per invoice. Envelopes are written the same way as the invoices
+themselves: the header is serialized once around a placeholder comment and the
+already rendered documents are copied in between, without re-parsing them.
+"""
+
+import io
+import xml.etree.ElementTree as ET
+import zipfile
+
+SBDH_NS = 'http://www.unece.org/cefact/namespaces/StandardBusinessDocumentHeader'
+PACKAGE_NS = 'http://www.efatura.gov.tr/package-namespace'
+XSI_NS = 'http://www.w3.org/2001/XMLSchema-instance'
+SCHEMA_LOCATION = f'{SBDH_NS} PackageProxy_1_2.xsd'
+
+ELEMENT_TYPE_INVOICE = 'INVOICE'
+ENVELOPE_TYPE_SENDER = 'SENDERENVELOPE'
+# UBL-TR_Common_Schematron only accepts '1.2' as DocumentIdentification/TypeVersion.
+TYPE_VERSION = '1.2'
+HEADER_VERSION = '1.0'
+
+DEFAULT_MAX_DOCUMENTS = 100
+DEFAULT_MAX_BYTES = 10 * 1024 * 1024
+
+ELEMENT_LIST_PLACEHOLDER = 'edevlet-element-list'
+
+ET.register_namespace('sh', SBDH_NS)
+ET.register_namespace('ef', PACKAGE_NS)
+
+
+def strip_xml_declaration(document: bytes) -> bytes:
+    """Return ``document`` without its ``<?xml ...?>`` declaration."""
+    if document.startswith(b'<?xml'):
+        document = document[document.index(b'?>') + 2:].lstrip()
+    return document
+
+
+def pack_documents(documents, max_count: int = DEFAULT_MAX_DOCUMENTS, max_bytes: int = DEFAULT_MAX_BYTES):
+    """Split ``documents`` (bytes) into envelope-sized lists.
+
+    A list holds at most ``max_count`` documents and, unless a single document
+    is larger on its own, at most ``max_bytes`` of document content.
+    """
+    batch = []
+    batch_bytes = 0
+    for document in documents:
+        if batch and (len(batch) >= max_count or batch_bytes + len(document) > max_bytes):
+            yield batch
+            batch = []
+            batch_bytes = 0
+        batch.append(document)
+        batch_bytes += len(document)
+    if batch:
+        yield batch
+
+
+def _sub_element(parent, tag, text=None):
+    element = ET.SubElement(parent, tag)
+    if text is not None:
+        element.text = text
+    return element
+
+
+def _append_party(header, tag, party):
+    node = _sub_element(header, f'{{{SBDH_NS}}}{tag}')
+    _sub_element(node, f'{{{SBDH_NS}}}Identifier', party['identifier'])
+    for contact, contact_type in ((party.get('name'), 'UNVAN'), (party.get('tax_id'), 'VKN_TCKN')):
+        if not contact:
+            continue
+        contact_information = _sub_element(node, f'{{{SBDH_NS}}}ContactInformation')
+        _sub_element(contact_information, f'{{{SBDH_NS}}}Contact', contact)
+        _sub_element(contact_information, f'{{{SBDH_NS}}}ContactTypeIdentifier', contact_type)
+
+
+def build_envelope_skeleton(header: dict, element_count: int, element_type: str = ELEMENT_TYPE_INVOICE):
+    """Build the envelope with a placeholder comment where the documents go.
+
+    ``header`` holds ``instance_identifier``, ``creation_datetime`` (ISO text)
+    and the ``sender`` and ``receiver`` parties, each a dict with
+    ``identifier`` (the ``urn:mail:`` alias), ``name`` and ``tax_id``.
+    """
+    root = ET.Element(f'{{{SBDH_NS}}}StandardBusinessDocument', {f'{{{XSI_NS}}}schemaLocation': SCHEMA_LOCATION})
+    document_header = _sub_element(root, f'{{{SBDH_NS}}}StandardBusinessDocumentHeader')
+    _sub_element(document_header, f'{{{SBDH_NS}}}HeaderVersion', HEADER_VERSION)
+    _append_party(document_header, 'Sender', header['sender'])
+    _append_party(document_header, 'Receiver', header['receiver'])
+    identification = _sub_element(document_header, f'{{{SBDH_NS}}}DocumentIdentification')
+    _sub_element(identification, f'{{{SBDH_NS}}}Standard')
+    _sub_element(identification, f'{{{SBDH_NS}}}TypeVersion', TYPE_VERSION)
+    _sub_element(identification, f'{{{SBDH_NS}}}InstanceIdentifier', header['instance_identifier'])
+    _sub_element(identification, f'{{{SBDH_NS}}}Type', ENVELOPE_TYPE_SENDER)
+    _sub_element(identification, f'{{{SBDH_NS}}}CreationDateAndTime', header['creation_datetime'])
+
+    package = _sub_element(root, f'{{{PACKAGE_NS}}}Package')
+    elements = _sub_element(package, 'Elements')
+    _sub_element(elements, 'ElementType', element_type)
+    _sub_element(elements, 'ElementCount', str(element_count))
+    _sub_element(elements, 'ElementList').append(ET.Comment(ELEMENT_LIST_PLACEHOLDER))
+    return root
+
+
+def write_envelope(stream, header: dict, documents, element_type: str = ELEMENT_TYPE_INVOICE) -> None:
+    """Write an envelope holding ``documents`` (serialized UBL bytes) into ``stream``."""
+    root = build_envelope_skeleton(header, len(documents), element_type=element_type)
+    head, tail = ET.tostring(root, encoding='utf-8', xml_declaration=True).split(
+        f'<!--{ELEMENT_LIST_PLACEHOLDER}-->'.encode()
+    )
+    stream.write(head)
+    for document in documents:
+        stream.write(strip_xml_declaration(document))
+    stream.write(tail)
+
+
+def build_envelope_zip(header: dict, documents, element_type: str = ELEMENT_TYPE_INVOICE) -> bytes:
+    """Return the zip archive transmitted for one envelope.
+
+    The archive holds a single ``<instance identifier>.xml`` member, as
+    expected by ``sendDocument``.
+    """
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, 'w', compression=zipfile.ZIP_DEFLATED) as archive:
+        with archive.open(f"{header['instance_identifier']}.xml", 'w') as member:
+            write_envelope(member, header, documents, element_type=element_type)
+    return buffer.getvalue()
@@ -0,0 +1,707 @@
+"""ORM-free rendering of UBL-TR invoices.
+
+``account.move`` extracts a plain-data snapshot of an invoice (dicts, lists,
+strings and floats only) and this module turns it into the UBL XML document.
+Keeping the tree building free of ORM objects makes the rendered bytes a pure
+function of the snapshot, which is what lets previews be reused by
+fingerprint and large batches be rendered by worker processes.
+
+The module only depends on the standard library and lxml, so it also runs as
+a script: ``render_invoices`` starts it with the current interpreter and
+hands it pickled snapshots on stdin. The workers are fresh interpreters, they
+inherit neither the database connections nor the threads of the Odoo worker.
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+import collections
+import copy
+import functools
+import hashlib
+import io
+import os
+import pickle
+import re
+import subprocess
+import sys
+import threading
+import xml.etree.ElementTree as ET
+
+from lxml import etree as lxml_etree
+
+UBL_XML_NAMESPACES = {
+    '': 'urn:oasis:names:specification:ubl:schema:xsd:Invoice-2',
+    'cbc': 'urn:oasis:names:specification:ubl:schema:xsd:CommonBasicComponents-2',
+    'cac': 'urn:oasis:names:specification:ubl:schema:xsd:CommonAggregateComponents-2',
+    'ext': 'urn:oasis:names:specification:ubl:schema:xsd:CommonExtensionComponents-2',
+    'xades': 'http://uri.etsi.org/01903/v1.3.2#',
+    'udt': 'urn:un:unece:uncefact:data:specification:UnqualifiedDataTypesSchemaModule:2',
+    'ccts': 'urn:un:unece:uncefact:documentation:2',
+    'ubltr': 'urn:oasis:names:specification:ubl:schema:xsd:TurkishCustomizationExtensionComponents',
+    'qdt': 'urn:oasis:names:specification:ubl:schema:xsd:QualifiedDatatypes-2',
+    'ds': 'http://www.w3.org/2000/09/xmldsig#',
+    'xsi': 'http://www.w3.org/2001/XMLSchema-instance',
+}
+CAC = f"{{{UBL_XML_NAMESPACES['cac']}}}"
+CBC = f"{{{UBL_XML_NAMESPACES['cbc']}}}"
+
+# Invoice lines serialized per write in streaming mode.
+LINE_CHUNK_SIZE = 500
+LINE_PLACEHOLDER = 'edevlet-invoice-lines'
+
+# The schematron matches TaxTypeCode + Percent against '60290'-like codes,
+# so withholding percents are printed without decimals.
+WITHHOLDING_PERCENT_DIGITS = 0
+
+# Snapshot values that differ on every render of the same invoice.
+VOLATILE_SNAPSHOT_KEYS = frozenset({'uuid', 'issue_time', 'issue_time_note'})
+
+_UBL_PREFIX_RE = re.compile(r'(^|/)(\w+):')
+
+# Per-process cache of the parsed sample invoice: (path, backend) -> ((mtime_ns, size), root).
+_invoice_template_cache = {}
+_invoice_template_lock = threading.Lock()
+
+for _prefix, _uri in UBL_XML_NAMESPACES.items():
+    ET.register_namespace(_prefix, _uri)
+
+
+@functools.lru_cache(maxsize=None)
+def ubl_path(path: str) -> str:
+    """Expand a ``cac:``/``cbc:`` prefixed find path to Clark notation.
+
+    ElementTree can then reuse its compiled selector without re-resolving the
+    namespace map on every ``find`` call.
+    """
+    return _UBL_PREFIX_RE.sub(
+        lambda match: f"{match.group(1)}{{{UBL_XML_NAMESPACES[match.group(2)]}}}",
+        path,
+    )
+
+
+def load_invoice_template(path: str, backend: str = 'etree'):
+    """Return a private copy of the parsed template, re-parsing only when the file changed.
+
+    ``backend`` is ``'etree'`` for the stdlib tree used to write documents, or
+    ``'lxml'`` for a tree that can be fed to lxml (XSLT) without serializing.
+    """
+    stat = os.stat(path)
+    signature = (stat.st_mtime_ns, stat.st_size)
+    cache_key = (path, backend)
+    cached = _invoice_template_cache.get(cache_key)
+    if cached is None or cached[0] != signature:
+        if backend == 'lxml':
+            # ElementTree drops comments and processing instructions; do the same.
+            parser = lxml_etree.XMLParser(remove_comments=True, remove_pis=True)
+            root = lxml_etree.parse(path, parser).getroot()
+        else:
+            root = ET.parse(path).getroot()
+        with _invoice_template_lock:
+            _invoice_template_cache[cache_key] = (signature, root)
+    else:
+        root = cached[1]
+    return copy.deepcopy(root)
+
+
+def sub_element(parent, tag, **attrib):
+    """``SubElement`` that works for both stdlib and lxml parents."""
+    element = parent.makeelement(tag, attrib)
+    parent.append(element)
+    return element
+
+
+class TaxSnapshot(collections.namedtuple('TaxSnapshot', (
+    'percent', 'name', 'code', 'exemption_reason_code', 'exemption_reason', 'taxable_amount', 'amount',
+))):
+    """One TaxSubtotal: the TaxCategory values and the already rounded amounts."""
+
+    __slots__ = ()
+
+    def category_values(self):
+        return self[:5]
+
+
+class InvoiceLineSnapshot:
+    """Values of one invoice line, computed once and read by line rendering and totals.
+
+    ``taxes`` holds a ``TaxSnapshot`` per tax of the line (at least one) and
+    ``withholding_taxes`` the tevkifat entries, which go to the
+    WithholdingTaxTotal instead of the TaxTotal.
+    """
+
+    __slots__ = (
+        'note', 'quantity', 'unit_code', 'price_subtotal', 'base_amount', 'discount_amount',
+        'taxes', 'withholding_taxes', 'description', 'item_name', 'price_unit',
+    )
+
+    def __init__(self, note, quantity, unit_code, price_subtotal, base_amount, discount_amount,
+                 taxes, withholding_taxes, description, item_name, price_unit):
+        self.note = note
+        self.quantity = quantity
+        self.unit_code = unit_code
+        self.price_subtotal = price_subtotal
+        self.base_amount = base_amount
+        self.discount_amount = discount_amount
+        self.taxes = taxes
+        self.withholding_taxes = withholding_taxes
+        self.description = description
+        self.item_name = item_name
+        self.price_unit = price_unit
+
+    @property
+    def tax_amount(self):
+        return sum(tax.amount for tax in self.taxes)
+
+    @property
+    def withholding_amount(self):
+        return sum(tax.amount for tax in self.withholding_taxes)
+
+    def __reduce__(self):
+        # Reduced to a plain tuple of values, also used for fingerprinting.
+        return self.__class__, tuple(getattr(self, name) for name in self.__slots__)
+
+
+def snapshot_fingerprint(snapshot: dict) -> str:
+    """Hash everything that shapes the rendered invoice except its UUID and clock time.
+
+    Two snapshots with the same fingerprint render to the same document up to
+    those volatile values, so a rendering can be reused.
+    """
+    digest = hashlib.sha256()
+    for key in sorted(snapshot):
+        if key in VOLATILE_SNAPSHOT_KEYS:
+            continue
+        value = snapshot[key]
+        if key == 'lines':
+            value = [line.__reduce__()[1] for line in value]
+        elif key == 'xslt' and value:
+            value = dict(value, content=hashlib.sha256((value['content'] or '').encode()).hexdigest())
+        digest.update(f'{key}={value!r}\n'.encode())
+    return digest.hexdigest()
+
+
+def render_invoice(snapshot: dict) -> bytes:
+    """Render one invoice snapshot to UBL XML bytes."""
+    buffer = io.BytesIO()
+    write_invoice(snapshot, buffer)
+    return buffer.getvalue()
+
+
+def render_invoices(snapshots: list, workers: int = 0) -> list:
+    """Render ``snapshots`` and return the documents in input order.
+
+    With ``workers`` above one the snapshots are split into that many chunks,
+    each rendered by a worker process running this module as a script. The
+    output is byte-identical to the serial path since both run the very same
+    functions.
+    """
+    if workers <= 1 or len(snapshots) < 2:
+        return [render_invoice(snapshot) for snapshot in snapshots]
+
+    # The embedded XSLT is the same for all invoices of a company, so it is
+    # sent once per worker instead of with every snapshot.
+    payloads = {}
+    light_snapshots = []
+    for snapshot in snapshots:
+        xslt = snapshot.get('xslt')
+        if xslt and xslt.get('content'):
+            payloads[xslt['key']] = xslt['content']
+            snapshot = dict(snapshot, xslt=dict(xslt, content=None))
+        light_snapshots.append(snapshot)
+
+    chunk_size = -(-len(light_snapshots) // workers)
+    chunks = [light_snapshots[start:start + chunk_size] for start in range(0, len(light_snapshots), chunk_size)]
+    with ThreadPoolExecutor(max_workers=len(chunks)) as executor:
+        results = executor.map(lambda chunk: _render_in_worker(payloads, chunk), chunks)
+        return [document for documents in results for document in documents]
+
+
+def _render_in_worker(payloads, snapshots):
+    process = subprocess.run(
+        [sys.executable, os.path.abspath(__file__), __name__],
+        input=pickle.dumps((payloads, snapshots), protocol=pickle.HIGHEST_PROTOCOL),
+        capture_output=True,
+        check=False,
+    )
+    if process.returncode:
+        raise RenderWorkerError(process.stderr.decode(errors='replace').strip())
+    return pickle.loads(process.stdout)
+
+
+class RenderWorkerError(Exception):
+    """A render worker process exited with an error; the message is its stderr."""
+
+
+class _WorkerUnpickler(pickle.Unpickler):
+    """Resolve the snapshot classes of the parent's module to this script."""
+
+    def __init__(self, file, parent_module):
+        super().__init__(file)
+        self.parent_module = parent_module
+
+    def find_class(self, module, name):
+        if module == self.parent_module:
+            module = __name__
+        return super().find_class(module, name)
+
+
+def _worker_main(parent_module):
+    payloads, snapshots = _WorkerUnpickler(sys.stdin.buffer, parent_module).load()
+    documents = []
+    for snapshot in snapshots:
+        xslt = snapshot.get('xslt')
+        if xslt and xslt['key'] in payloads:
+            snapshot = dict(snapshot, xslt=dict(xslt, content=payloads[xslt['key']]))
+        documents.append(render_invoice(snapshot))
+    pickle.dump(documents, sys.stdout.buffer, protocol=pickle.HIGHEST_PROTOCOL)
+
+
+def build_invoice_tree(snapshot: dict, backend: str = 'etree'):
+    """Build the complete invoice tree; see ``load_invoice_template`` for ``backend``."""
+    root = build_invoice_header(snapshot, backend=backend)
+    populate_invoice_lines(root, snapshot['lines'], snapshot)
+    return root
+
+
+def write_invoice(snapshot: dict, stream, chunk_size: int = LINE_CHUNK_SIZE) -> None:
+    """Serialize one invoice snapshot into the binary file object ``stream``.
+
+    The header is serialized once around a placeholder comment and the lines
+    are rendered and written ``chunk_size`` at a time, so memory use does not
+    grow with the number of invoice lines. The bytes are the same as
+    ``ET.tostring(build_invoice_tree(snapshot))``.
+    """
+    root = build_invoice_header(snapshot)
+    template, allowance_position = detach_line_template(root, snapshot['currency_code'])
+    root.insert(line_insert_position(root), ET.Comment(LINE_PLACEHOLDER))
+    head, tail = ET.tostring(root, encoding='utf-8', xml_declaration=True).split(
+        f'<!--{LINE_PLACEHOLDER}-->'.encode()
+    )
+    stream.write(head)
+    root_tag = root.tag
+    del root
+
+    # Lines are serialized inside an element carrying the root tag so they get
+    # exactly the namespace prefixes of the full document; the wrapper's own
+    # start and end tags are cut off.
+    wrapper = ET.Element(root_tag)
+    for line_element in iter_invoice_lines(template, allowance_position, snapshot['lines'], snapshot):
+        wrapper.append(line_element)
+        if len(wrapper) >= chunk_size:
+            _write_wrapped_children(wrapper, stream)
+    if len(wrapper):
+        _write_wrapped_children(wrapper, stream)
+    stream.write(tail)
+
+
+def _write_wrapped_children(wrapper, stream):
+    data = ET.tostring(wrapper, encoding='utf-8', xml_declaration=False)
+    stream.write(memoryview(data)[data.index(b'>') + 1:data.rindex(b'</')])
+    wrapper.clear()
+
+
+def build_invoice_header(snapshot: dict, backend: str = 'etree'):
+    """Fill everything but the invoice lines into a copy of the template."""
+    root = load_invoice_template(snapshot['template_path'], backend=backend)
+    currency_code = snapshot['currency_code']
+    issue_date = snapshot['issue_date']
+    lines = snapshot['lines']
+
+    set_text(root, 'cbc:ID', snapshot['name'])
+    set_text(root, 'cbc:ProfileID', snapshot['profile_type'])
+    set_text(root, 'cbc:InvoiceTypeCode', snapshot['invoice_type_code'])
+    set_text(root, 'cbc:DocumentCurrencyCode', currency_code)
+    set_text(root, 'cbc:PaymentCurrencyCode', currency_code)
+    set_text(root, 'cbc:UUID', snapshot['uuid'])
+    set_text(root, 'cbc:IssueDate', issue_date)
+    set_text(root, 'cbc:IssueTime', snapshot['issue_time'])
+    set_text(root, 'cbc:LineCountNumeric', str(len(lines)))
+
+    order_ref = root.find(ubl_path('cac:OrderReference'))
+    if snapshot['invoice_origin']:
+        set_text(order_ref, 'cbc:ID', snapshot['invoice_origin'])
+        set_text(order_ref, 'cbc:IssueDate', issue_date)
+    elif order_ref is not None:
+        root.remove(order_ref)
+
+    note_nodes = root.findall(ubl_path('cbc:Note'))
+    if note_nodes:
+        note_nodes[0].text = snapshot['issue_time_note']
+        if len(note_nodes) > 1:
+            note_nodes[1].text = snapshot['issue_date_note']
+        if len(note_nodes) > 2:
+            note_nodes[2].text = snapshot['user_name']
+        if len(note_nodes) > 3:
+            for extra_node in note_nodes[3:]:
+                root.remove(extra_node)
+
+    if snapshot['amount_in_words']:
+        for doc_ref in root.findall(ubl_path('cac:AdditionalDocumentReference')):
+            doc_type = doc_ref.find(ubl_path('cbc:DocumentType'))
+            if doc_type is None or not doc_type.text:
+                continue
+            doc_type_value = doc_type.text.strip()
+            if doc_type_value in ('TR_NET_STR', 'TOTAL_NET_STR'):
+                set_text(doc_ref, 'cbc:ID', snapshot['amount_in_words'])
+                set_text(doc_ref, 'cbc:IssueDate', issue_date)
+            elif doc_type_value == 'PAYABLEAMOUNT':
+                set_text(doc_ref, 'cbc:ID', float_to_str(snapshot['amount_total_raw'], digits=2))
+                set_text(doc_ref, 'cbc:IssueDate', issue_date)
+
+    populate_party_block(root.find(ubl_path('cac:AccountingSupplierParty')), snapshot['supplier'])
+    populate_party_block(root.find(ubl_path('cac:AccountingCustomerParty')), snapshot['customer'])
+
+    update_totals(root, lines, snapshot)
+    apply_xslt_attachment(root, snapshot['xslt'])
+    return root
+
+
+def populate_party_block(party_record, partner):
+    if party_record is None or not partner:
+        return
+    party = party_record.find(ubl_path('cac:Party'))
+    if party is None:
+        party = party_record
+    set_text(party, 'cbc:WebsiteURI', partner['website'])
+
+    identification = party.find(ubl_path('cac:PartyIdentification'))
+    if identification is not None:
+        id_node = identification.find(ubl_path('cbc:ID'))
+        if id_node is not None:
+            id_node.text = partner['tax_id']
+            if partner['tax_id']:
+                id_node.set('schemeID', partner['tax_scheme'])
+
+    set_text(party, 'cac:PartyName/cbc:Name', partner['name'])
+
+    address = party.find(ubl_path('cac:PostalAddress'))
+    if address is not None:
+        set_text(address, 'cbc:StreetName', partner['street'])
+        set_text(address, 'cbc:BuildingNumber', partner['building_number'])
+        set_text(address, 'cbc:CitySubdivisionName', partner['city'])
+        set_text(address, 'cbc:CityName', partner['city'])
+        set_text(address, 'cbc:PostalZone', partner['zip'])
+        set_text(address, 'cbc:Region', partner['region'])
+        set_text(address.find(ubl_path('cac:Country')), 'cbc:Name', partner['country'])
+
+    tax_scheme = party.find(ubl_path('cac:PartyTaxScheme/cac:TaxScheme'))
+    set_text(tax_scheme, 'cbc:Name', partner['tax_office'])
+
+    contact = party.find(ubl_path('cac:Contact'))
+    if contact is not None:
+        set_text(contact, 'cbc:Telephone', partner['phone'])
+        set_text(contact, 'cbc:ElectronicMail', partner['email'])
+
+
+def populate_invoice_lines(root, lines, snapshot):
+    template, allowance_position = detach_line_template(root, snapshot['currency_code'])
+    if not lines:
+        return
+    # Satırları LegalMonetaryTotal'dan sonra ekle (UBL standart sırasına göre),
+    # tek bir dilim ataması ile; satır başına insert listeyi her seferinde kaydırır.
+    insert_position = line_insert_position(root)
+    root[insert_position:insert_position] = list(iter_invoice_lines(template, allowance_position, lines, snapshot))
+
+
+def detach_line_template(root, currency_code):
+    """Remove the sample lines from ``root`` and return the line template.
+
+    Every line gets its own AllowanceCharge (or none), so the template is
+    stripped of it once and the index where a discount block goes is returned
+    along with it.
+    """
+    template = root.find(ubl_path('cac:InvoiceLine'))
+    if template is not None:
+        template = copy.deepcopy(template)
+    else:
+        template = build_invoice_line_template(root, currency_code)
+
+    # İlk olarak mevcut satırları temizle
+    for existing in root.findall(ubl_path('cac:InvoiceLine')):
+        root.remove(existing)
+
+    for allowance_node in template.findall(ubl_path('cac:AllowanceCharge')):
+        template.remove(allowance_node)
+    line_extension = template.find(ubl_path('cbc:LineExtensionAmount'))
+    allowance_position = list(template).index(line_extension) + 1 if line_extension is not None else None
+    return template, allowance_position
+
+
+def line_insert_position(root):
+    monetary_total = root.find(ubl_path('cac:LegalMonetaryTotal'))
+    if monetary_total is not None:
+        return list(root).index(monetary_total) + 1
+    return len(root)
+
+
+def iter_invoice_lines(template, allowance_position, lines, snapshot):
+    for index, line in enumerate(lines, start=1):
+        line_element = copy.deepcopy(template)
+        fill_invoice_line(line_element, line, index, snapshot, allowance_position)
+        yield line_element
+
+
+def build_invoice_line_template(root, currency_code):
+    line_el = root.makeelement(f"{CAC}InvoiceLine", {})
+    sub_element(line_el, f"{CBC}ID")
+    sub_element(line_el, f"{CBC}Note")
+    sub_element(line_el, f"{CBC}InvoicedQuantity", unitCode='C62')
+    sub_element(line_el, f"{CBC}LineExtensionAmount", currencyID=currency_code)
+    allowance_charge = sub_element(line_el, f"{CAC}AllowanceCharge")
+    sub_element(allowance_charge, f"{CBC}ChargeIndicator")
+    sub_element(allowance_charge, f"{CBC}MultiplierFactorNumeric")
+    sub_element(allowance_charge, f"{CBC}Amount", currencyID=currency_code)
+    sub_element(allowance_charge, f"{CBC}BaseAmount", currencyID=currency_code)
+    tax_total = sub_element(line_el, f"{CAC}TaxTotal")
+    sub_element(tax_total, f"{CBC}TaxAmount", currencyID=currency_code)
+    tax_subtotal = sub_element(tax_total, f"{CAC}TaxSubtotal")
+    sub_element(tax_subtotal, f"{CBC}TaxableAmount", currencyID=currency_code)
+    sub_element(tax_subtotal, f"{CBC}TaxAmount", currencyID=currency_code)
+    sub_element(tax_subtotal, f"{CBC}CalculationSequenceNumeric")
+    sub_element(tax_subtotal, f"{CBC}Percent")
+    tax_category = sub_element(tax_subtotal, f"{CAC}TaxCategory")
+    tax_scheme = sub_element(tax_category, f"{CAC}TaxScheme")
+    sub_element(tax_scheme, f"{CBC}Name")
+    sub_element(tax_scheme, f"{CBC}TaxTypeCode")
+    item = sub_element(line_el, f"{CAC}Item")
+    sub_element(item, f"{CBC}Description")
+    sub_element(item, f"{CBC}Name")
+    price = sub_element(line_el, f"{CAC}Price")
+    sub_element(price, f"{CBC}PriceAmount", currencyID=currency_code)
+    return line_el
+
+
+def fill_invoice_line(node, line, index, snapshot, allowance_position=None):
+    currency_code = snapshot['currency_code']
+    currency_digits = snapshot['currency_digits']
+
+    set_text(node, 'cbc:ID', str(index))
+    # Note alanına ürün açıklamasını ekle
+    set_text(node, 'cbc:Note', line.note)
+
+    qty_node = node.find(ubl_path('cbc:InvoicedQuantity'))
+    if qty_node is not None:
+        qty_node.text = float_to_str(line.quantity, digits=4)
+        qty_node.set('unitCode', line.unit_code)
+
+    set_amount(node, 'cbc:LineExtensionAmount', line.price_subtotal, currency_digits, currency_code)
+
+    base_amount = line.base_amount
+    discount_amount = line.discount_amount
+    if discount_amount > 0:
+        allowance_node = node.makeelement(f"{CAC}AllowanceCharge", {})
+        charge_indicator = sub_element(allowance_node, f"{CBC}ChargeIndicator")
+        charge_indicator.text = 'false'
+        multiplier_node = sub_element(allowance_node, f"{CBC}MultiplierFactorNumeric")
+        discount_ratio = (discount_amount / base_amount) if base_amount else 0.0
+        multiplier_node.text = float_to_str(discount_ratio, digits=4)
+        amount_node = sub_element(allowance_node, f"{CBC}Amount", currencyID=currency_code)
+        amount_node.text = float_to_str(discount_amount, digits=currency_digits)
+        base_node = sub_element(allowance_node, f"{CBC}BaseAmount", currencyID=currency_code)
+        base_node.text = float_to_str(base_amount, digits=currency_digits)
+        if allowance_position is not None:
+            node.insert(allowance_position, allowance_node)
+        else:
+            node.append(allowance_node)
+
+    tax_total_node = node.find(ubl_path('cac:TaxTotal'))
+    if tax_total_node is not None:
+        withholding_node = copy.deepcopy(tax_total_node) if line.withholding_taxes else None
+        fill_tax_total(tax_total_node, line.taxes, line.tax_amount, currency_digits, currency_code, sequence=index)
+        if withholding_node is not None:
+            withholding_node.tag = f"{CAC}WithholdingTaxTotal"
+            fill_tax_total(
+                withholding_node, line.withholding_taxes, line.withholding_amount,
+                currency_digits, currency_code, sequence=index, percent_digits=WITHHOLDING_PERCENT_DIGITS,
+            )
+            node.insert(list(node).index(tax_total_node) + 1, withholding_node)
+
+    item = node.find(ubl_path('cac:Item'))
+    if item is not None:
+        set_text(item, 'cbc:Description', line.description)
+        set_text(item, 'cbc:Name', line.item_name)
+
+    price = node.find(ubl_path('cac:Price'))
+    if price is not None:
+        set_amount(price, 'cbc:PriceAmount', line.price_unit, 5, currency_code)
+
+
+def fill_tax_total(tax_total, taxes, amount, currency_digits, currency_code, sequence=None, percent_digits=2):
+    """Fill a TaxTotal or WithholdingTaxTotal with one TaxSubtotal per ``TaxSnapshot`` of ``taxes``.
+
+    The first TaxSubtotal of ``tax_total`` is the template of all of them.
+    """
+    set_amount(tax_total, 'cbc:TaxAmount', amount, currency_digits, currency_code)
+    template = tax_total.find(ubl_path('cac:TaxSubtotal'))
+    if template is None or not taxes:
+        return
+    subtotals = [template] + [copy.deepcopy(template) for _tax in taxes[1:]]
+    for subtotal, tax in zip(subtotals, taxes):
+        set_amount(subtotal, 'cbc:TaxableAmount', tax.taxable_amount, currency_digits, currency_code)
+        set_amount(subtotal, 'cbc:TaxAmount', tax.amount, currency_digits, currency_code)
+        if sequence is not None:
+            sequence_node = subtotal.find(ubl_path('cbc:CalculationSequenceNumeric'))
+            if sequence_node is not None:
+                sequence_node.text = str(sequence)
+        fill_tax_category(subtotal, *tax.category_values(), percent_digits=percent_digits)
+    if len(subtotals) > 1:
+        position = list(tax_total).index(template)
+        tax_total[position:position + 1] = subtotals
+
+
+def fill_tax_category(tax_subtotal, percent_value, tax_name, tax_code,
+                      exemption_reason_code=False, exemption_reason=False, percent_digits=2):
+    percent_node = tax_subtotal.find(ubl_path('cbc:Percent'))
+    if percent_node is not None:
+        percent_node.text = float_to_str(percent_value or 0.0, digits=percent_digits)
+    tax_category = tax_subtotal.find(ubl_path('cac:TaxCategory'))
+    if tax_category is None:
+        return
+    for path in ('cbc:TaxExemptionReasonCode', 'cbc:TaxExemptionReason'):
+        for existing in tax_category.findall(ubl_path(path)):
+            tax_category.remove(existing)
+    tax_scheme = tax_category.find(ubl_path('cac:TaxScheme'))
+    if exemption_reason_code:
+        # UBL sırası: TaxExemptionReasonCode, TaxExemptionReason, TaxScheme
+        position = list(tax_category).index(tax_scheme) if tax_scheme is not None else len(tax_category)
+        indent = '\n' + tax_category.text.rsplit('\n', 1)[-1] if tax_category.text else None
+        code_node = tax_category.makeelement(f"{CBC}TaxExemptionReasonCode", {})
+        code_node.text = exemption_reason_code
+        code_node.tail = indent
+        reason_node = tax_category.makeelement(f"{CBC}TaxExemptionReason", {})
+        reason_node.text = exemption_reason or ''
+        reason_node.tail = indent
+        tax_category[position:position] = [code_node, reason_node]
+    if tax_scheme is not None:
+        set_text(tax_scheme, 'cbc:Name', tax_name)
+        set_text(tax_scheme, 'cbc:TaxTypeCode', tax_code)
+
+
+def group_tax_subtotals(lines, attribute='taxes'):
+    """Sum taxable and tax amounts per (tax code, percent, exemption reason) in one pass.
+
+    ``attribute`` selects the ``taxes`` or the ``withholding_taxes`` of the
+    lines. Returns ``TaxSnapshot`` entries in order of first appearance.
+    """
+    groups = {}
+    for line in lines:
+        for tax in getattr(line, attribute):
+            key = (tax.code, tax.percent, tax.exemption_reason_code)
+            group = groups.get(key)
+            if group is None:
+                groups[key] = [tax, tax.taxable_amount, tax.amount]
+            else:
+                group[1] += tax.taxable_amount
+                group[2] += tax.amount
+    return [
+        tax._replace(taxable_amount=taxable_amount, amount=amount)
+        for tax, taxable_amount, amount in groups.values()
+    ]
+
+
+def reconcile_tax_amounts(groups, amount, digits):
+    """Return ``groups`` with the rounding difference to ``amount`` added to the largest one.
+
+    The line taxes are rounded one by one while the move total may be rounded
+    globally, but the subtotals must add up to the TaxTotal amount.
+    """
+    difference = round(amount - sum(group.amount for group in groups), digits)
+    if not difference or not groups:
+        return groups
+    groups = list(groups)
+    largest = max(range(len(groups)), key=lambda index: abs(groups[index].amount))
+    groups[largest] = groups[largest]._replace(amount=round(groups[largest].amount + difference, digits))
+    return groups
+
+
+def update_totals(root, lines, snapshot):
+    currency_code = snapshot['currency_code']
+    currency_digits = snapshot['currency_digits']
+    totals = snapshot['totals']
+
+    withholding_groups = group_tax_subtotals(lines, 'withholding_taxes')
+    withholding_amount = round(sum(group.amount for group in withholding_groups), currency_digits)
+    # amount_tax and amount_total of the move are already net of the withheld VAT.
+    tax_amount = round(totals['amount_tax'] + withholding_amount, currency_digits)
+
+    tax_total = root.find(ubl_path('cac:TaxTotal'))
+    if tax_total is not None:
+        withholding_total = copy.deepcopy(tax_total) if withholding_groups else None
+        groups = group_tax_subtotals(lines)
+        if len(groups) <= 1:
+            # Tek vergi grubu: belge toplamları kullanılır
+            tax_values = groups[0].category_values() if groups else snapshot['default_tax']
+            groups = [TaxSnapshot(*tax_values, totals['amount_untaxed'], tax_amount)]
+        else:
+            groups = reconcile_tax_amounts(groups, tax_amount, currency_digits)
+        fill_tax_total(tax_total, groups, tax_amount, currency_digits, currency_code)
+        if withholding_total is not None:
+            withholding_total.tag = f"{CAC}WithholdingTaxTotal"
+            fill_tax_total(
+                withholding_total, withholding_groups, withholding_amount, currency_digits, currency_code,
+                percent_digits=WITHHOLDING_PERCENT_DIGITS,
+            )
+            root.insert(list(root).index(tax_total) + 1, withholding_total)
+
+    monetary_total = root.find(ubl_path('cac:LegalMonetaryTotal'))
+    if monetary_total is not None:
+        tax_inclusive_amount = round(totals['amount_total'] + withholding_amount, currency_digits)
+        set_amount(monetary_total, 'cbc:LineExtensionAmount', totals['amount_untaxed'], currency_digits, currency_code)
+        set_amount(monetary_total, 'cbc:TaxExclusiveAmount', totals['amount_untaxed'], currency_digits, currency_code)
+        set_amount(monetary_total, 'cbc:TaxInclusiveAmount', tax_inclusive_amount, currency_digits, currency_code)
+        set_amount(monetary_total, 'cbc:AllowanceTotalAmount', totals['discount_total'], currency_digits, currency_code)
+        set_amount(monetary_total, 'cbc:PayableAmount', totals['amount_total'], currency_digits, currency_code)
+
+
+def apply_xslt_attachment(root, xslt):
+    if not xslt:
+        return
+    content = xslt['content']
+    for doc_ref in root.findall(ubl_path('cac:AdditionalDocumentReference')):
+        doc_type = doc_ref.find(ubl_path('cbc:DocumentType'))
+        if doc_type is None or not doc_type.text:
+            continue
+        if doc_type.text.strip().upper() != 'XSLT':
+            continue
+        # ID ve IssueDate alanlarını doldur
+        set_text(doc_ref, 'cbc:ID', xslt['invoice_number'])
+        set_text(doc_ref, 'cbc:IssueDate', xslt['issue_date'])
+        # Base64 içeriğini ekle
+        embedded = doc_ref.find(ubl_path('cac:Attachment/cbc:EmbeddedDocumentBinaryObject'))
+        if embedded is None:
+            continue
+        if content:
+            embedded.text = content
+            if xslt['file_name']:
+                embedded.set('filename', xslt['file_name'])
+
+
+def set_amount(element, xpath, amount, digits, currency_code):
+    """Write an already rounded amount; ``digits`` is the number of decimals to print."""
+    if element is None:
+        return
+    node = element.find(ubl_path(xpath))
+    if node is None:
+        return
+    node.text = float_to_str(amount, digits=digits)
+    if currency_code:
+        node.set('currencyID', currency_code)
+
+
+def set_text(element, xpath, value):
+    if element is None:
+        return
+    target = element.find(ubl_path(xpath)) if xpath else element
+    if target is None:
+        return
+    if value in (None, False):
+        target.text = ''
+    else:
+        target.text = str(value)
+
+
+def float_to_str(value, digits=2):
+    return f"{float(value or 0):.{digits}f}"
+
+
+if __name__ == '__main__':
+    _worker_main(sys.argv[1])
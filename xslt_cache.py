@@ -0,0 +1,70 @@
+"""Per-process caches of the integration XSLT stylesheets.
+
+Every generated invoice embeds the uploaded stylesheet as base64, so that text
+is kept in memory per integration, keyed by the checksum of its attachment,
+instead of being read from the database for each invoice.
+
+Compiling a GİB invoice stylesheet takes far longer than applying it, so the
+compiled ``etree.XSLT`` objects are kept in a small LRU keyed by the owner of
+the stylesheet (database and integration id) and a hash of its content. A
+changed upload therefore never hits a stale entry; ``invalidate`` only frees
+the memory of the replaced one.
+"""
+
+from collections import OrderedDict
+import hashlib
+import threading
+
+from lxml import etree
+
+XSLT_CACHE_SIZE = 16
+
+# (owner key, sha256 of the stylesheet) -> (etree.XSLT, lock serializing its use)
+_compiled_xslt = OrderedDict()
+_compiled_xslt_lock = threading.Lock()
+
+# owner key -> (attachment checksum, base64 text)
+_xslt_payloads = {}
+
+
+def get_payload(owner_key, checksum: str, loader) -> str:
+    """Return the base64 stylesheet of ``owner_key``, calling ``loader()`` only when ``checksum`` changed."""
+    cached = _xslt_payloads.get(owner_key)
+    if cached is not None and cached[0] == checksum:
+        return cached[1]
+    payload = loader()
+    with _compiled_xslt_lock:
+        _xslt_payloads[owner_key] = (checksum, payload)
+    return payload
+
+
+def get_transform(owner_key, xslt_content: bytes):
+    """Return ``(transform, lock)`` for the stylesheet, compiling it on a miss.
+
+    The lock must be held while calling the transform: one compiled
+    stylesheet is shared by every thread of the process.
+    """
+    key = (owner_key, hashlib.sha256(xslt_content).hexdigest())
+    with _compiled_xslt_lock:
+        entry = _compiled_xslt.get(key)
+        if entry is not None:
+            _compiled_xslt.move_to_end(key)
+            return entry
+
+    entry = (etree.XSLT(etree.fromstring(xslt_content)), threading.Lock())
+    with _compiled_xslt_lock:
+        entry = _compiled_xslt.setdefault(key, entry)
+        _compiled_xslt.move_to_end(key)
+        while len(_compiled_xslt) > XSLT_CACHE_SIZE:
+            _compiled_xslt.popitem(last=False)
+    return entry
+
+
+def invalidate(owner_keys) -> None:
+    """Drop the cached payload and compiled stylesheets of ``owner_keys``."""
+    owner_keys = set(owner_keys)
+    with _compiled_xslt_lock:
+        for owner_key in owner_keys:
+            _xslt_payloads.pop(owner_key, None)
+        for key in [key for key in _compiled_xslt if key[0] in owner_keys]:
+            del _compiled_xslt[key]